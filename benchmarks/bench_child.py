@@ -0,0 +1,102 @@
+"""Run one example's entry point repeatedly and print a JSON line per run.
+
+Started by ``run_benchmarks.py`` in the example's directory and Python
+environment. Not meant to be run by hand.
+
+Examples with an ``async_main`` run every iteration in one event loop, as a
+long-lived service would. Calling ``main()`` each time would start a new loop
+per run, and clients that LangChain caches across runs would still be bound
+to the first, closed loop. ``--stub-url`` points at this worker's
+``/__run/<id>`` prefix on the stub, so the counters read before and after a
+run only include this worker's requests.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import io
+import json
+import os
+import sys
+import time
+import urllib.request
+
+
+def stub_stats(stub_url: str) -> dict:
+    with urllib.request.urlopen(f'{stub_url}/__stats') as response:
+        return json.load(response)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('module')
+    parser.add_argument('--runs', type=int, required=True)
+    parser.add_argument('--stub-url', required=True)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        module = importlib.import_module(args.module)
+    import_ms = (time.perf_counter() - start) * 1000
+
+    # Record the SDK init time of each run so it can be separated from request time.
+    init_times = []
+    original_bootstrap = module.bootstrap
+
+    def timed_bootstrap(*bootstrap_args, **bootstrap_kwargs):
+        result = original_bootstrap(*bootstrap_args, **bootstrap_kwargs)
+        init_times.append(result.init_ms)
+        return result
+
+    module.bootstrap = timed_bootstrap
+
+    def report(ok: bool, output: str, wall_ms: float, before: dict) -> None:
+        after = stub_stats(args.stub_url)
+        # The examples report failures by printing rather than raising.
+        ok = ok and not any(line.startswith('Error') for line in output.splitlines())
+        print(json.dumps({
+            'ok': ok,
+            'import_ms': import_ms,
+            'wall_ms': wall_ms,
+            'init_ms': sum(init_times),
+            'model_calls': after['requests'] - before['requests'],
+            'model_errors': after['errors'] - before['errors'],
+            'upstream_ms': after['upstream_ms'] - before['upstream_ms'],
+        }), flush=True)
+
+    async def run_async(async_main) -> None:
+        for _ in range(args.runs):
+            init_times.clear()
+            before = stub_stats(args.stub_url)
+            output = io.StringIO()
+            ok = True
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(output):
+                try:
+                    await async_main()
+                except (Exception, SystemExit):
+                    ok = False
+            report(ok, output.getvalue(), (time.perf_counter() - start) * 1000, before)
+
+    if hasattr(module, 'async_main'):
+        asyncio.run(run_async(module.async_main))
+        return
+
+    for _ in range(args.runs):
+        init_times.clear()
+        before = stub_stats(args.stub_url)
+        output = io.StringIO()
+        ok = True
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            try:
+                module.main()
+            except (Exception, SystemExit):
+                ok = False
+        report(ok, output.getvalue(), (time.perf_counter() - start) * 1000, before)
+
+
+if __name__ == "__main__":
+    main()
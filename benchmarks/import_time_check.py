@@ -0,0 +1,147 @@
+"""Check that importing each example stays within a startup time budget.
+
+Imports each entry point module in a fresh interpreter with
+``python -X importtime`` and fails when the module's cumulative import time
+goes over its budget. Run it in CI to catch a heavy import creeping back to
+module level.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from run_benchmarks import ENTRY_POINTS, REPO_ROOT
+
+IMPORT_BUDGETS_MS: Dict[str, float] = {
+    'langchain': 750,
+    'langgraph-agent': 750,
+    'langgraph-multi-agent': 750,
+}
+"""Default import budget per entry point, in milliseconds.
+
+These entry points load LangChain and LangGraph on first use, so importing
+them should cost little more than the LaunchDarkly SDK.
+"""
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+@dataclass
+class ImportProfile:
+    total_ms: float
+    """Cumulative time to import the module, including everything it imports."""
+    children: List[Tuple[str, float]] = field(default_factory=list)
+    """Modules imported directly by the module, with their cumulative time in ms."""
+
+    def heaviest(self, count: int) -> List[Tuple[str, float]]:
+        return sorted(self.children, key=lambda child: child[1], reverse=True)[:count]
+
+
+def parse_importtime(output: str, module: str) -> Optional[ImportProfile]:
+    """
+    Extract the profile of ``module`` from ``-X importtime`` output.
+
+    Each imported module is reported after the modules it imports, indented by
+    two spaces per level, so the direct children of ``module`` are the level-one
+    lines between the previous top-level line and the line for ``module``.
+
+    :return: The profile, or ``None`` if ``module`` was not imported.
+    """
+    children: List[Tuple[str, float]] = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative_us, indent, name = match.groups()
+        level = len(indent) // 2
+        if level == 0:
+            if name == module:
+                return ImportProfile(total_ms=int(cumulative_us) / 1000, children=children)
+            children = []
+        elif level == 1:
+            children.append((name, int(cumulative_us) / 1000))
+    return None
+
+
+def import_command(example_dir: str, module: str, python: Optional[str]) -> List[str]:
+    args = ['-X', 'importtime', '-c', f'import {module}']
+    if python:
+        return [python, *args]
+    # Use the example's own Poetry environment so its dependencies are installed.
+    return ['poetry', '-C', example_dir, 'run', 'python', *args]
+
+
+def measure_import(name: str, repeat: int, python: Optional[str]) -> ImportProfile:
+    """
+    Import an entry point module ``repeat`` times and keep the fastest run.
+
+    The fastest run is the least affected by a cold disk cache and by bytecode
+    being written on the first import.
+
+    :raises RuntimeError: If the module fails to import.
+    """
+    example_dir, module = ENTRY_POINTS[name]
+    example_dir = os.path.join(REPO_ROOT, example_dir)
+    best: Optional[ImportProfile] = None
+    for _ in range(repeat):
+        result = subprocess.run(
+            import_command(example_dir, module, python),
+            cwd=example_dir, capture_output=True, text=True,
+        )
+        profile = parse_importtime(result.stderr, module)
+        if result.returncode != 0 or profile is None:
+            errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+            raise RuntimeError(errors[-1] if errors else f'exit code {result.returncode}')
+        if best is None or profile.total_ms < best.total_ms:
+            best = profile
+    return best
+
+
+def main():
+    """Synchronous entry point for Poetry script."""
+    parser = argparse.ArgumentParser(description='Fail when importing an example goes over its time budget.')
+    parser.add_argument('entry_points', nargs='*',
+                        help=f"Entry points to check (default: {', '.join(IMPORT_BUDGETS_MS)})")
+    parser.add_argument('--budget-ms', type=float,
+                        help='Import budget for every entry point, overriding the defaults')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Imports per entry point; the fastest counts (default: %(default)s)')
+    parser.add_argument('--top', type=int, default=3,
+                        help='Heaviest direct imports to list per entry point (default: %(default)s)')
+    parser.add_argument('--python', help="Interpreter to import examples with instead of each example's Poetry env")
+    args = parser.parse_args()
+    unknown = [name for name in args.entry_points if name not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry points: {', '.join(unknown)}")
+    names = args.entry_points or list(IMPORT_BUDGETS_MS)
+    if args.budget_ms is None and any(name not in IMPORT_BUDGETS_MS for name in names):
+        parser.error('--budget-ms is required for entry points without a default budget')
+
+    failures = 0
+    print(f"{'entry point':<22} {'import':>8} {'budget':>8}  heaviest imports")
+    for name in names:
+        budget_ms = args.budget_ms if args.budget_ms is not None else IMPORT_BUDGETS_MS[name]
+        try:
+            profile = measure_import(name, max(args.repeat, 1), args.python)
+        except RuntimeError as e:
+            print(f"{name:<22} failed to import: {e}")
+            failures += 1
+            continue
+
+        heaviest = ', '.join(f"{module} {ms:.0f}ms" for module, ms in profile.heaviest(args.top))
+        status = 'OVER ' if profile.total_ms > budget_ms else ''
+        print(f"{name:<22} {profile.total_ms:>6.0f}ms {budget_ms:>6.0f}ms  {status}{heaviest}")
+        if profile.total_ms > budget_ms:
+            failures += 1
+
+    if failures:
+        print(f"\n*** {failures} entry point(s) failed the import time check")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+"""Open-loop load test of the AI service's completion, agent, graph and judge endpoints."""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from mock_provider_server import add_settings_arguments, settings_from_args, start_server
+from run_benchmarks import FLAG_DATA, REPO_ROOT, percentile, provider_env
+
+SERVICE_DIR = os.path.join(REPO_ROOT, 'features', 'ai_service')
+PROFILES = ('constant', 'ramp', 'step')
+
+FLOWS: Dict[str, Dict[str, Any]] = {
+    'completion': {'input': 'What can you help me with?'},
+    'agent': {'input': 'What is the weather in Paris?'},
+    'graph': {'input': 'Plan a weekend trip to Lisbon.'},
+    'judge': {'input': 'What can you help me with?', 'output': 'I can answer questions about LaunchDarkly.'},
+}
+"""Endpoint name to its default request body, without the context."""
+
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+
+
+@dataclass
+class Arrival:
+    """One request, scheduled ``at`` seconds after the test starts."""
+
+    at: float
+    flow: str
+    phase: str
+    body: Dict[str, Any]
+
+
+@dataclass
+class Result:
+    arrival: Arrival
+    status: int
+    """HTTP status, or 0 if the request failed without a response."""
+    service_ms: float
+    """From sending the request to receiving the full response."""
+    corrected_ms: float
+    """From the scheduled start to receiving the full response."""
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+# Arrival schedules
+
+
+def arrival_times(
+    rate: float, duration_s: float, poisson: bool, rng: random.Random, start: float = 0.0
+) -> Iterator[float]:
+    """Arrival times for a constant rate, evenly spaced or as a Poisson process."""
+    if rate <= 0:
+        return
+    t = start
+    end = start + duration_s
+    while True:
+        t += rng.expovariate(rate) if poisson else 1 / rate
+        if t >= end:
+            return
+        yield t
+
+
+def ramp_times(from_rate: float, to_rate: float, duration_s: float) -> Iterator[float]:
+    """
+    Evenly spaced arrivals with a rate rising linearly from ``from_rate`` to ``to_rate``.
+
+    The n-th arrival is at the time t where the expected count
+    ``from_rate * t + (to_rate - from_rate) * t**2 / (2 * duration_s)`` reaches n.
+    """
+    slope = (to_rate - from_rate) / duration_s
+    n = 1
+    while True:
+        if abs(slope) < 1e-12:
+            t = n / from_rate
+        else:
+            t = (-from_rate + math.sqrt(from_rate ** 2 + 2 * slope * n)) / slope
+        if t >= duration_s:
+            return
+        yield t
+        n += 1
+
+
+def make_body(flow: str, n: int, unique_inputs: bool, contexts: int) -> Dict[str, Any]:
+    body = {'context': {'key': f'load-test-user-{n % contexts}'}, **FLOWS[flow]}
+    if unique_inputs:
+        # Distinct inputs keep request coalescing and the semantic cache from absorbing the load.
+        body['input'] = f"{body['input']} (request {n})"
+    return body
+
+
+def schedule(args: argparse.Namespace) -> List[Arrival]:
+    """Every request of the test, in start order."""
+    rng = random.Random(args.seed)
+    if args.trace:
+        return load_trace(args.trace, args.trace_speed, args.unique_inputs, args.contexts)
+
+    flows, weights = zip(*args.mix)
+    timed: List[Tuple[float, str]] = []
+    if args.profile == 'constant':
+        timed = [(t, f'{args.rate:g}/s') for t in arrival_times(args.rate, args.duration, args.poisson, rng)]
+    elif args.profile == 'ramp':
+        windows = 5
+        for t in ramp_times(args.rate, args.to_rate, args.duration):
+            window = min(int(t / args.duration * windows), windows - 1)
+            low = args.rate + (args.to_rate - args.rate) * window / windows
+            high = args.rate + (args.to_rate - args.rate) * (window + 1) / windows
+            timed.append((t, f'{low:g}-{high:g}/s'))
+    else:
+        for index, rate in enumerate(args.steps):
+            start = index * args.step_duration
+            timed += [(t, f'{rate:g}/s') for t in arrival_times(rate, args.step_duration, args.poisson, rng, start)]
+
+    return [
+        Arrival(at, flow, phase, make_body(flow, n, args.unique_inputs, args.contexts))
+        for n, ((at, phase), flow) in enumerate(zip(timed, rng.choices(flows, weights, k=len(timed))))
+    ]
+
+
+def load_trace(path: str, speed: float, unique_inputs: bool, contexts: int) -> List[Arrival]:
+    """
+    Read a trace of JSON lines: ``{"t": 12.5, "flow": "completion", "input": "...", "context": {...}}``.
+
+    ``t`` is a time in seconds, relative or absolute; the first request is
+    sent at the start of the test and the rest keep their spacing, divided by
+    ``speed``. ``flow`` defaults to ``completion``. Any other fields replace
+    the flow's default body fields.
+    """
+    records = []
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                records.append(json.loads(line))
+    if not records:
+        return []
+    first = min(record['t'] for record in records)
+    arrivals = []
+    for n, record in enumerate(sorted(records, key=lambda r: r['t'])):
+        flow = record.get('flow', 'completion')
+        if flow not in FLOWS:
+            raise ValueError(f"Unknown flow '{flow}' in {path}; use one of {', '.join(FLOWS)}")
+        body = make_body(flow, n, unique_inputs and 'input' not in record, contexts)
+        body.update({key: value for key, value in record.items() if key not in ('t', 'flow')})
+        arrivals.append(Arrival((record['t'] - first) / speed, flow, 'trace', body))
+    return arrivals
+
+
+# HTTP client
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP/1.1 connections to the service, at most ``size`` at once.
+
+    A request that finds every connection busy waits for one; with the
+    open-loop schedule that wait counts toward its corrected latency.
+    """
+
+    def __init__(self, url: str, size: int, timeout_s: float):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(size)
+        self._timeout_s = timeout_s
+
+    async def post(self, path: str, body: Dict[str, Any]) -> Tuple[int, float]:
+        """Send a JSON request. Returns the status and the time from send to full response in ms."""
+        data = json.dumps(body).encode('utf-8')
+        request = (
+            f'POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n'
+        ).encode('ascii') + data
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else await asyncio.open_connection(self.host, self.port)
+            start = time.perf_counter()
+            try:
+                status, keep_alive = await asyncio.wait_for(self._exchange(connection, request), self._timeout_s)
+            except BaseException:
+                connection[1].close()
+                raise
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if keep_alive:
+                self._idle.append(connection)
+            else:
+                connection[1].close()
+            return status, elapsed_ms
+
+    @staticmethod
+    async def _exchange(connection, request: bytes) -> Tuple[int, bool]:
+        reader, writer = connection
+        writer.write(request)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await reader.readexactly(int(headers.get('content-length', 0)))
+        return status, headers.get('connection', '').lower() != 'close'
+
+    def close(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+# Running the test
+
+
+async def run_schedule(arrivals: List[Arrival], pool: ConnectionPool, drain_timeout_s: float) -> List[Result]:
+    """
+    Send every request at its scheduled time, whether or not earlier ones have finished.
+
+    Latency is measured twice: from sending the request (service time), and
+    from the time it was scheduled to start (corrected). When the service or
+    the client falls behind, requests queue; a closed-loop tester would send
+    them later and never see that wait, which is coordinated omission. The
+    corrected latency includes it.
+    """
+    loop = asyncio.get_running_loop()
+    results: List[Result] = []
+    start = loop.time()
+
+    async def send(arrival: Arrival) -> None:
+        intended = start + arrival.at
+        try:
+            status, service_ms = await pool.post(f'/v1/{arrival.flow}', arrival.body)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError, asyncio.IncompleteReadError):
+            status, service_ms = 0, math.nan
+        results.append(Result(arrival, status, service_ms, (loop.time() - intended) * 1000))
+
+    tasks = []
+    for arrival in arrivals:
+        delay = start + arrival.at - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(arrival)))
+    if tasks:
+        _, pending = await asyncio.wait(tasks, timeout=drain_timeout_s)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    pool.close()
+    return results
+
+
+@dataclass
+class Summary:
+    phase: str
+    flow: str
+    sent: int = 0
+    ok: int = 0
+    statuses: Dict[int, int] = field(default_factory=dict)
+    span_s: float = 0.0
+    """Seconds from the phase's first scheduled start to its last."""
+    completed_span_s: float = 0.0
+    """Seconds from the phase's first scheduled start to its last successful response."""
+    service_ms: List[float] = field(default_factory=list)
+    corrected_ms: List[float] = field(default_factory=list)
+
+    @property
+    def errors(self) -> int:
+        return self.sent - self.ok
+
+    @property
+    def offered_rps(self) -> float:
+        return self.sent / self.span_s if self.span_s else 0.0
+
+    @property
+    def achieved_rps(self) -> float:
+        return self.ok / self.completed_span_s if self.completed_span_s else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'phase': self.phase,
+            'flow': self.flow,
+            'sent': self.sent,
+            'ok': self.ok,
+            'errors': self.errors,
+            'error_rate': round(self.errors / self.sent, 4) if self.sent else 0.0,
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'offered_rps': round(self.offered_rps, 2),
+            'achieved_rps': round(self.achieved_rps, 2),
+            'latency_ms': {f'p{pct:g}': round(percentile(self.service_ms, pct), 1) for pct in LATENCY_PERCENTILES},
+            'corrected_latency_ms': {
+                f'p{pct:g}': round(percentile(self.corrected_ms, pct), 1) for pct in LATENCY_PERCENTILES
+            },
+            'max_corrected_ms': round(max(self.corrected_ms, default=0.0), 1),
+        }
+
+
+def summarize(results: List[Result], arrivals: List[Arrival]) -> List[Summary]:
+    """Group results by phase and flow, plus an ``all`` row per phase when several flows ran."""
+    # Each phase spans from its first scheduled start to the next phase's first start (or the last start).
+    phase_bounds: Dict[str, List[float]] = {}
+    for arrival in arrivals:
+        bounds = phase_bounds.setdefault(arrival.phase, [arrival.at, arrival.at])
+        bounds[1] = max(bounds[1], arrival.at)
+    phases = list(phase_bounds)
+    for current, following in zip(phases, phases[1:]):
+        phase_bounds[current][1] = phase_bounds[following][0]
+
+    flows = sorted({arrival.flow for arrival in arrivals})
+    groups: Dict[Tuple[str, str], Summary] = {}
+    for result in results:
+        keys = [(result.arrival.phase, result.arrival.flow)]
+        if len(flows) > 1:
+            keys.append((result.arrival.phase, 'all'))
+        for key in keys:
+            summary = groups.setdefault(key, Summary(*key))
+            summary.sent += 1
+            summary.statuses[result.status] = summary.statuses.get(result.status, 0) + 1
+            if result.ok:
+                summary.ok += 1
+                done_s = result.arrival.at + result.corrected_ms / 1000
+                summary.completed_span_s = max(summary.completed_span_s, done_s)
+                summary.service_ms.append(result.service_ms)
+            summary.corrected_ms.append(result.corrected_ms)
+    # Requests cut off by the drain timeout have no result; count them as errors.
+    for arrival in arrivals:
+        groups.setdefault((arrival.phase, arrival.flow), Summary(arrival.phase, arrival.flow))
+    sent_by_key: Dict[Tuple[str, str], int] = {}
+    for arrival in arrivals:
+        sent_by_key[(arrival.phase, arrival.flow)] = sent_by_key.get((arrival.phase, arrival.flow), 0) + 1
+        if len(flows) > 1:
+            sent_by_key[(arrival.phase, 'all')] = sent_by_key.get((arrival.phase, 'all'), 0) + 1
+    for key, summary in groups.items():
+        low, high = phase_bounds[key[0]]
+        summary.span_s = max(high - low, 1e-9)
+        summary.completed_span_s = max(summary.completed_span_s - low, summary.span_s) if summary.ok else 0.0
+        missing = sent_by_key.get(key, 0) - summary.sent
+        if missing > 0:
+            summary.sent += missing
+            summary.statuses[0] = summary.statuses.get(0, 0) + missing
+
+    order = {phase: index for index, phase in enumerate(phases)}
+    return sorted(groups.values(), key=lambda s: (order[s.phase], s.flow == 'all', s.flow))
+
+
+def print_report(summaries: List[Summary]) -> None:
+    print(f"\n{'phase':<16} {'flow':<11} {'sent':>7} {'err%':>6} {'offered/s':>10} {'achieved/s':>11} "
+          f"{'p50':>8} {'p99':>8} {'p99.9':>8} {'cor p50':>8} {'cor p99':>8} {'cor p99.9':>9}")
+    for summary in summaries:
+        data = summary.to_dict()
+        latency, corrected = data['latency_ms'], data['corrected_latency_ms']
+        print(
+            f"{summary.phase:<16} {summary.flow:<11} {summary.sent:>7} {data['error_rate'] * 100:>5.1f}% "
+            f"{summary.offered_rps:>10.1f} {summary.achieved_rps:>11.1f} "
+            f"{latency['p50']:>6.0f}ms {latency['p99']:>6.0f}ms {latency['p99.9']:>6.0f}ms "
+            f"{corrected['p50']:>6.0f}ms {corrected['p99']:>6.0f}ms {corrected['p99.9']:>7.0f}ms"
+        )
+        failed = {status: count for status, count in summary.statuses.items() if not 200 <= status < 300}
+        if failed:
+            print(f"{'':<28} errors by status: "
+                  + ', '.join(f"{status or 'no response'}={count}" for status, count in sorted(failed.items())))
+
+
+# Local service
+
+
+def start_service(port: int, stub_url: str, flag_data: str, python: Optional[str], log_path: str) -> subprocess.Popen:
+    """
+    Run the AI service against the stub providers and offline flags, and wait until it is healthy.
+
+    The service's output goes to ``log_path``; a pipe nobody reads would fill
+    up under load and block the service on its next log line.
+    """
+    env = {**os.environ, **provider_env(stub_url, flag_data), 'SERVICE_PORT': str(port)}
+    command = [python, 'ai_service.py'] if python else ['poetry', '-C', SERVICE_DIR, 'run', 'service']
+    with open(log_path, 'wb') as log:
+        process = subprocess.Popen(command, cwd=SERVICE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            with open(log_path, encoding='utf-8', errors='replace') as log:
+                raise RuntimeError(f"The service exited: {log.read().strip()}")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/healthz', timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    stop_service(process)
+    raise RuntimeError(f'The service did not become healthy within 60s; see {log_path}')
+
+
+def stop_service(process: subprocess.Popen, timeout_s: float = 30) -> None:
+    """Ask the service to shut down, and kill it if it has not exited within ``timeout_s``."""
+    process.terminate()
+    try:
+        process.wait(timeout=timeout_s)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def parse_mix(value: str) -> List[Tuple[str, float]]:
+    """``completion=3,judge=1`` or ``completion,agent`` (equal weights)."""
+    mix = []
+    for item in value.split(','):
+        flow, _, weight = item.partition('=')
+        if flow.strip() not in FLOWS:
+            raise argparse.ArgumentTypeError(f"unknown flow '{flow}'; use {', '.join(FLOWS)}")
+        mix.append((flow.strip(), float(weight) if weight else 1.0))
+    return mix
+
+
+def parse_steps(value: str) -> List[float]:
+    return [float(rate) for rate in value.split(',')]
+
+
+def main():
+    """Synchronous entry point for Poetry script."""
+    parser = argparse.ArgumentParser(
+        description='Open-loop load test of the AI service, against local stub providers by default.')
+    parser.add_argument('--profile', choices=PROFILES, default='constant',
+                        help='Arrival rate profile (default: %(default)s)')
+    parser.add_argument('--rate', type=float, default=50, help='Requests per second; the starting rate for ramp')
+    parser.add_argument('--to-rate', type=float, default=500, help='Ramp: final requests per second')
+    parser.add_argument('--steps', type=parse_steps, default=[50, 100, 200, 500],
+                        help='Step: comma-separated requests per second (default: 50,100,200,500)')
+    parser.add_argument('--step-duration', type=float, default=20, help='Step: seconds per step (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=30,
+                        help='Seconds of load for constant and ramp (default: %(default)s)')
+    parser.add_argument('--poisson', action='store_true', help='Poisson arrivals instead of evenly spaced ones')
+    parser.add_argument('--trace', help='Replay the arrivals in this JSON lines trace instead of a profile')
+    parser.add_argument('--trace-speed', type=float, default=1.0, help='Trace: playback speed (default: %(default)s)')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('completion'),
+                        help='Flows and weights, e.g. completion=3,agent=1,graph=1,judge=1 (default: completion)')
+    parser.add_argument('--contexts', type=int, default=1000, help='Distinct context keys (default: %(default)s)')
+    parser.add_argument('--repeat-inputs', dest='unique_inputs', action='store_false',
+                        help='Send the same input in every request instead of numbering them')
+    parser.add_argument('--url', help='Load an already running service instead of starting one with stub providers')
+    parser.add_argument('--port', type=int, default=8089, help='Port for the local service (default: %(default)s)')
+    parser.add_argument('--python', help="Interpreter for the local service instead of its Poetry env")
+    parser.add_argument('--flag-data', default=FLAG_DATA, help='Offline flag data file (default: %(default)s)')
+    parser.add_argument('--max-connections', type=int, default=1024,
+                        help='Maximum open connections to the service (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=60,
+                        help='Per-request timeout in seconds (default: %(default)s)')
+    parser.add_argument('--drain-timeout', type=float, default=60,
+                        help='Seconds to wait for requests still running after the last is sent (default: %(default)s)')
+    parser.add_argument('--json', dest='json_path', help='Also write the report to this JSON file')
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    arrivals = schedule(args)
+    if not arrivals:
+        parser.error('the schedule has no requests')
+
+    stub = service = None
+    url = args.url
+    try:
+        if url is None:
+            stub = start_server(settings_from_args(args))
+            log_path = os.path.join(tempfile.gettempdir(), f'ai-service-{args.port}.log')
+            service = start_service(args.port, stub.url, args.flag_data, args.python, log_path)
+            url = f'http://127.0.0.1:{args.port}'
+            print(f"*** Service on {url}, stub providers on {stub.url} "
+                  f"({args.latency_distribution} latency, median {args.latency_ms:.0f}ms); log in {log_path}")
+        print(f"*** Sending {len(arrivals)} requests over {arrivals[-1].at:.1f}s")
+        pool = ConnectionPool(url, args.max_connections, args.timeout)
+        started = time.perf_counter()
+        results = asyncio.run(run_schedule(arrivals, pool, args.drain_timeout))
+        print(f"*** Finished in {time.perf_counter() - started:.1f}s")
+    finally:
+        if service is not None:
+            stop_service(service)
+        if stub is not None:
+            stub.shutdown()
+            stub.server_close()
+
+    summaries = summarize(results, arrivals)
+    print_report(summaries)
+    print("\nLatency is measured from sending each request; corrected (cor) latency from its scheduled start,"
+          " so it includes time queued behind a slow service.")
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as file:
+            json.dump({'url': url, 'phases': [summary.to_dict() for summary in summaries]}, file, indent=2)
+    if any(summary.errors for summary in summaries):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+"""Local stub of the OpenAI, Gemini and Bedrock APIs used by the examples."""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+
+@dataclass
+class StubSettings:
+    """How the stub responds. Every response uses the same settings."""
+
+    latency_ms: float = 300.0
+    """Median injected latency per request."""
+
+    latency_distribution: str = 'lognormal'
+    """One of ``fixed``, ``uniform`` or ``lognormal``."""
+
+    latency_spread: float = 0.5
+    """Relative spread for ``uniform``; sigma of the log for ``lognormal``."""
+
+    output_tokens: int = 64
+    """Output tokens reported, and words generated, per response."""
+
+    error_rate: float = 0.0
+    """Fraction of requests answered with ``error_status`` instead of a completion."""
+
+    error_status: int = 500
+    """HTTP status used for injected errors, e.g. 429 or 500."""
+
+    seed: Optional[int] = None
+    """Seed for latency and error sampling, for repeatable runs."""
+
+    def sample_latency_ms(self, rng: random.Random) -> float:
+        if self.latency_distribution == 'fixed':
+            return self.latency_ms
+        if self.latency_distribution == 'uniform':
+            return max(self.latency_ms * rng.uniform(1 - self.latency_spread, 1 + self.latency_spread), 0.0)
+        return self.latency_ms * math.exp(rng.gauss(0, self.latency_spread))
+
+
+@dataclass
+class StubStats:
+    """Counters exposed at ``GET /__stats``, for all requests or for one worker."""
+
+    requests: int = 0
+    errors: int = 0
+    upstream_ms: float = 0.0
+    """Total injected latency across all requests."""
+    by_api: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, api: str, failed: bool, upstream_ms: float) -> None:
+        self.requests += 1
+        self.errors += int(failed)
+        self.upstream_ms += upstream_ms
+        self.by_api[api] = self.by_api.get(api, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'upstream_ms': round(self.upstream_ms, 3),
+            'by_api': dict(self.by_api),
+        }
+
+
+RUN_PATH = re.compile(r'^/__run/(?P<run>[^/]+)(?P<path>/.*)$')
+
+
+def split_run_path(path: str) -> Tuple[Optional[str], str]:
+    """
+    Split a ``/__run/<id>`` prefix off a request path.
+
+    A benchmark worker points its provider clients at ``<stub>/__run/<id>``.
+    Its requests are then served as usual and also counted under ``<id>``,
+    and ``GET <stub>/__run/<id>/__stats`` reports only those requests, so
+    concurrent workers can each measure their own runs.
+
+    :return: The run id, or ``None`` without a prefix, and the path without it.
+    """
+    match = RUN_PATH.match(path)
+    if match is None:
+        return None, path
+    return match.group('run'), match.group('path')
+
+
+def estimate_tokens(body: Any) -> int:
+    """Rough input token count: four characters of request JSON per token."""
+    return max(len(json.dumps(body)) // 4, 1)
+
+
+def generate_text(tokens: int) -> str:
+    return ' '.join(['stub'] * max(tokens, 1))
+
+
+def fill_schema(schema: Dict[str, Any]) -> Any:
+    """Build a value that satisfies a JSON schema, for structured output requests."""
+    kind = schema.get('type')
+    if 'enum' in schema:
+        return schema['enum'][0]
+    if kind == 'object' or 'properties' in schema:
+        return {name: fill_schema(prop) for name, prop in schema.get('properties', {}).items()}
+    if kind == 'array':
+        return [fill_schema(schema.get('items', {}))]
+    if kind in ('number', 'integer'):
+        low = schema.get('minimum', 0)
+        high = schema.get('maximum', 1)
+        value = (low + high) / 2
+        return int(value) if kind == 'integer' else value
+    if kind == 'boolean':
+        return True
+    return 'stub'
+
+
+def openai_chat_completion(body: Dict[str, Any], settings: StubSettings) -> Dict[str, Any]:
+    response_format = body.get('response_format') or {}
+    if response_format.get('type') == 'json_schema':
+        content = json.dumps(fill_schema(response_format.get('json_schema', {}).get('schema', {})))
+    else:
+        content = generate_text(settings.output_tokens)
+    input_tokens = estimate_tokens(body.get('messages'))
+    return {
+        'id': f'chatcmpl-{uuid.uuid4().hex}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': body.get('model', 'stub-model'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop',
+        }],
+        'usage': {
+            'prompt_tokens': input_tokens,
+            'completion_tokens': settings.output_tokens,
+            'total_tokens': input_tokens + settings.output_tokens,
+        },
+    }
+
+
+def openai_response(body: Dict[str, Any], settings: StubSettings) -> Dict[str, Any]:
+    input_tokens = estimate_tokens(body.get('input'))
+    return {
+        'id': f'resp_{uuid.uuid4().hex}',
+        'object': 'response',
+        'created_at': int(time.time()),
+        'status': 'completed',
+        'model': body.get('model', 'stub-model'),
+        'output': [{
+            'type': 'message',
+            'id': f'msg_{uuid.uuid4().hex}',
+            'status': 'completed',
+            'role': 'assistant',
+            'content': [{'type': 'output_text', 'text': generate_text(settings.output_tokens), 'annotations': []}],
+        }],
+        'parallel_tool_calls': True,
+        'tool_choice': 'auto',
+        'tools': [],
+        'usage': {
+            'input_tokens': input_tokens,
+            'input_tokens_details': {'cached_tokens': 0},
+            'output_tokens': settings.output_tokens,
+            'output_tokens_details': {'reasoning_tokens': 0},
+            'total_tokens': input_tokens + settings.output_tokens,
+        },
+    }
+
+
+def split_text(text: str) -> List[str]:
+    """Split text into the pieces a streamed response sends, one word each."""
+    return re.findall(r'\S+\s*', text) or [text]
+
+
+def openai_chat_completion_stream(body: Dict[str, Any], settings: StubSettings) -> List[Dict[str, Any]]:
+    """Chat Completions chunks for a ``stream: true`` request, ending with usage if it was asked for."""
+    completion = openai_chat_completion(body, settings)
+    base = {key: completion[key] for key in ('id', 'created', 'model')}
+    base['object'] = 'chat.completion.chunk'
+    content = completion['choices'][0]['message']['content']
+    deltas = [{'role': 'assistant', 'content': ''}] + [{'content': piece} for piece in split_text(content)]
+    chunks = [
+        {**base, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]}
+        for delta in deltas
+    ]
+    chunks.append({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})
+    if (body.get('stream_options') or {}).get('include_usage'):
+        chunks.append({**base, 'choices': [], 'usage': completion['usage']})
+    return chunks
+
+
+def openai_response_stream(body: Dict[str, Any], settings: StubSettings) -> List[Dict[str, Any]]:
+    """Responses API events for a ``stream: true`` request, from ``response.created`` to ``response.completed``."""
+    response = openai_response(body, settings)
+    message = response['output'][0]
+    text = message['content'][0]['text']
+    ids = {'item_id': message['id'], 'output_index': 0, 'content_index': 0}
+    in_progress = {**response, 'status': 'in_progress', 'output': [], 'usage': None}
+    events = [
+        {'type': 'response.created', 'response': in_progress},
+        {'type': 'response.in_progress', 'response': in_progress},
+        {'type': 'response.output_item.added', 'output_index': 0,
+         'item': {**message, 'status': 'in_progress', 'content': []}},
+        {'type': 'response.content_part.added', **ids,
+         'part': {'type': 'output_text', 'text': '', 'annotations': []}},
+    ]
+    events += [
+        {'type': 'response.output_text.delta', **ids, 'delta': piece, 'logprobs': []}
+        for piece in split_text(text)
+    ]
+    events += [
+        {'type': 'response.output_text.done', **ids, 'text': text, 'logprobs': []},
+        {'type': 'response.content_part.done', **ids, 'part': message['content'][0]},
+        {'type': 'response.output_item.done', 'output_index': 0, 'item': message},
+        {'type': 'response.completed', 'response': response},
+    ]
+    return [{**event, 'sequence_number': number} for number, event in enumerate(events)]
+
+
+def gemini_generate_content(model: str, body: Dict[str, Any], settings: StubSettings) -> Dict[str, Any]:
+    input_tokens = estimate_tokens(body.get('contents'))
+    return {
+        'candidates': [{
+            'content': {'role': 'model', 'parts': [{'text': generate_text(settings.output_tokens)}]},
+            'finishReason': 'STOP',
+            'index': 0,
+        }],
+        'usageMetadata': {
+            'promptTokenCount': input_tokens,
+            'candidatesTokenCount': settings.output_tokens,
+            'totalTokenCount': input_tokens + settings.output_tokens,
+        },
+        'modelVersion': model,
+    }
+
+
+def bedrock_converse(body: Dict[str, Any], settings: StubSettings, latency_ms: float) -> Dict[str, Any]:
+    input_tokens = estimate_tokens(body.get('messages'))
+    return {
+        'output': {'message': {'role': 'assistant', 'content': [{'text': generate_text(settings.output_tokens)}]}},
+        'stopReason': 'end_turn',
+        'usage': {
+            'inputTokens': input_tokens,
+            'outputTokens': settings.output_tokens,
+            'totalTokens': input_tokens + settings.output_tokens,
+        },
+        'metrics': {'latencyMs': int(latency_ms)},
+    }
+
+
+def error_body(api: str, status: int) -> Dict[str, Any]:
+    message = f'Injected error from the stub server ({status})'
+    if api == 'gemini':
+        return {'error': {'code': status, 'message': message, 'status': 'UNAVAILABLE'}}
+    if api == 'bedrock':
+        return {'message': message}
+    return {'error': {'message': message, 'type': 'server_error', 'code': None}}
+
+
+GEMINI_PATH = re.compile(r'^/v1(?:beta)?/models/(?P<model>[^/:]+):generateContent$')
+BEDROCK_PATH = re.compile(r'^/model/(?P<model>[^/]+)/converse$')
+
+
+class StubProviderServer(ThreadingHTTPServer):
+    """HTTP server answering provider requests with synthetic completions."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], settings: StubSettings):
+        super().__init__(address, _StubHandler)
+        self.settings = settings
+        self.stats = StubStats()
+        self.run_stats: Dict[str, StubStats] = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(settings.seed)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def stats_for(self, run_id: Optional[str]) -> StubStats:
+        """Counters of one run id, or of all requests for ``None``."""
+        if run_id is None:
+            return self.stats
+        with self._lock:
+            return self.run_stats.setdefault(run_id, StubStats())
+
+    def reset_stats(self, run_id: Optional[str] = None) -> None:
+        """Clear the counters of one run id, or all counters for ``None``."""
+        with self._lock:
+            if run_id is None:
+                self.stats = StubStats()
+                self.run_stats = {}
+            else:
+                self.run_stats.pop(run_id, None)
+
+    def plan_request(self, api: str, run_id: Optional[str] = None) -> Tuple[float, bool]:
+        """Sample latency and whether to fail, and record the request."""
+        with self._lock:
+            latency_ms = self.settings.sample_latency_ms(self._rng)
+            failed = self._rng.random() < self.settings.error_rate
+            self.stats.add(api, failed, latency_ms)
+            if run_id is not None:
+                self.run_stats.setdefault(run_id, StubStats()).add(api, failed, latency_ms)
+        return latency_ms, failed
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: StubProviderServer
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        run_id, path = split_run_path(self.path.split('?', 1)[0])
+        if path == '/__stats':
+            self._send(200, self.server.stats_for(run_id).to_dict())
+        else:
+            self._send(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        run_id, path = split_run_path(self.path.split('?', 1)[0])
+
+        if path == '/__reset':
+            self.server.reset_stats(run_id)
+            self._send(200, {})
+            return
+
+        try:
+            body = json.loads(raw or b'{}')
+        except json.JSONDecodeError:
+            self._send(400, {'error': {'message': 'Request body is not JSON'}})
+            return
+
+        gemini = GEMINI_PATH.match(path)
+        bedrock = BEDROCK_PATH.match(path)
+        if path.endswith('/chat/completions'):
+            api = 'openai-chat'
+        elif path.endswith('/responses'):
+            api = 'openai-responses'
+        elif gemini:
+            api = 'gemini'
+        elif bedrock:
+            api = 'bedrock'
+        else:
+            self._send(404, {'error': {'message': f'Unknown path {path}'}})
+            return
+
+        stream = bool(body.get('stream'))
+        if stream and api not in ('openai-chat', 'openai-responses'):
+            self._send(400, {'error': {'message': 'The stub server only streams OpenAI responses'}})
+            return
+
+        settings = self.server.settings
+        latency_ms, failed = self.server.plan_request(api, run_id)
+        if stream and not failed:
+            if api == 'openai-chat':
+                events = [(None, chunk) for chunk in openai_chat_completion_stream(body, settings)]
+                events.append((None, '[DONE]'))
+                first_text = 1
+            else:
+                events = [(event['type'], event) for event in openai_response_stream(body, settings)]
+                first_text = next(i for i, (name, _) in enumerate(events) if name == 'response.output_text.delta')
+            self._send_events(events, latency_ms, first_text)
+            return
+        time.sleep(latency_ms / 1000)
+
+        if failed:
+            self._send(settings.error_status, error_body(api, settings.error_status))
+        elif api == 'openai-chat':
+            self._send(200, openai_chat_completion(body, settings))
+        elif api == 'openai-responses':
+            self._send(200, openai_response(body, settings))
+        elif api == 'gemini':
+            self._send(200, gemini_generate_content(gemini.group('model'), body, settings))
+        else:
+            self._send(200, bedrock_converse(body, settings, latency_ms))
+
+    def _send_events(self, events: List[Tuple[Optional[str], Any]], latency_ms: float, first_text: int) -> None:
+        """
+        Stream server-sent events over ``latency_ms``.
+
+        The response starts after half the latency with every event up to
+        the first text delta at index ``first_text``, so the time to first
+        token is about half the total. The other events follow evenly over
+        the second half.
+        """
+        time.sleep(latency_ms / 2000)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        interval_s = latency_ms / 2000 / max(len(events) - first_text - 1, 1)
+        for number, (name, data) in enumerate(events):
+            if number > first_text:
+                time.sleep(interval_s)
+            text = data if isinstance(data, str) else json.dumps(data)
+            chunk = (f'event: {name}\n' if name else '') + f'data: {text}\n\n'
+            encoded = chunk.encode('utf-8')
+            self.wfile.write(f'{len(encoded):x}\r\n'.encode('ascii') + encoded + b'\r\n')
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_server(settings: StubSettings, host: str = '127.0.0.1', port: int = 0) -> StubProviderServer:
+    """
+    Start the stub server on a background thread.
+
+    :param settings: Response settings.
+    :param host: Interface to bind.
+    :param port: Port to bind; 0 picks a free port.
+    :return: The running server. Call ``shutdown()`` to stop it.
+    """
+    server = StubProviderServer((host, port), settings)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = StubSettings()
+    parser.add_argument('--latency-ms', type=float, default=defaults.latency_ms,
+                        help='Median injected latency per request (default: %(default)s)')
+    parser.add_argument('--latency-distribution', choices=LATENCY_DISTRIBUTIONS, default=defaults.latency_distribution,
+                        help='Latency distribution (default: %(default)s)')
+    parser.add_argument('--latency-spread', type=float, default=defaults.latency_spread,
+                        help='Relative spread (uniform) or log sigma (lognormal) (default: %(default)s)')
+    parser.add_argument('--output-tokens', type=int, default=defaults.output_tokens,
+                        help='Output tokens per response (default: %(default)s)')
+    parser.add_argument('--error-rate', type=float, default=defaults.error_rate,
+                        help='Fraction of requests that fail (default: %(default)s)')
+    parser.add_argument('--error-status', type=int, default=defaults.error_status,
+                        help='HTTP status of injected errors (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for repeatable runs')
+
+
+def settings_from_args(args: argparse.Namespace) -> StubSettings:
+    return StubSettings(
+        latency_ms=args.latency_ms,
+        latency_distribution=args.latency_distribution,
+        latency_spread=args.latency_spread,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+
+
+def main():
+    """Synchronous entry point for Poetry script."""
+    parser = argparse.ArgumentParser(description='Serve stub OpenAI, Gemini and Bedrock APIs.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    server = StubProviderServer((args.host, args.port), settings_from_args(args))
+    print(f"*** Stub provider server listening on {server.url}")
+    print(f"    OPENAI_BASE_URL={server.url}/v1")
+    print(f"    GOOGLE_GEMINI_BASE_URL={server.url}")
+    print(f"    AWS_ENDPOINT_URL_BEDROCK_RUNTIME={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+"""Record provider traffic to a cassette file and replay it with the original timing."""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import IO, Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from mock_provider_server import StubStats, split_run_path
+
+CASSETTE_VERSION = 1
+MATCH_MODES = ('body', 'path')
+
+GEMINI_PATH = re.compile(r'^/v1(?:beta)?/models/(?P<model>[^/:]+):(?:stream)?[gG]enerateContent$')
+BEDROCK_PATH = re.compile(r'^/model/(?P<model>[^/]+)/converse(?:-stream)?$')
+
+# Never written to a cassette: credentials and per-connection headers.
+SECRET_QUERY_PARAMS = {'key', 'api_key'}
+FORWARDED_RESPONSE_HEADERS = ('content-type',)
+SKIPPED_REQUEST_HEADERS = {'host', 'content-length', 'connection', 'accept-encoding', 'transfer-encoding'}
+
+
+def api_for(path: str) -> Optional[str]:
+    """Which provider API a request path belongs to, or ``None`` if it is not a provider path."""
+    if GEMINI_PATH.match(path):
+        return 'gemini'
+    if BEDROCK_PATH.match(path):
+        return 'bedrock'
+    if path.startswith('/v1/'):
+        return 'openai'
+    return None
+
+
+def clean_path(path: str) -> str:
+    """Request path and query with API keys removed, as recorded and matched."""
+    parts = urlsplit(path)
+    query = [(name, value) for name, value in parse_qsl(parts.query) if name not in SECRET_QUERY_PARAMS]
+    return parts.path + (f'?{urlencode(query)}' if query else '')
+
+
+def body_digest(raw: bytes) -> str:
+    """Digest of a request body; JSON bodies are canonicalized so key order does not matter."""
+    try:
+        raw = json.dumps(json.loads(raw), sort_keys=True, separators=(',', ':')).encode('utf-8')
+    except ValueError:
+        pass
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+@dataclass
+class Interaction:
+    """One recorded request and its response, chunk by chunk."""
+
+    api: str
+    method: str
+    path: str
+    request_digest: str
+    status: int
+    headers: Dict[str, str]
+    chunks: List[Tuple[float, bytes]] = field(default_factory=list)
+    """Response body chunks with their arrival time in ms after the request was sent."""
+    headers_ms: float = 0.0
+    """Time from sending the request to receiving the response headers."""
+
+    @property
+    def duration_ms(self) -> float:
+        return self.chunks[-1][0] if self.chunks else self.headers_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        chunks = []
+        for offset_ms, data in self.chunks:
+            try:
+                chunks.append([round(offset_ms, 2), data.decode('utf-8')])
+            except UnicodeDecodeError:
+                # Binary event streams, such as Bedrock's converse-stream.
+                chunks.append([round(offset_ms, 2), {'b64': base64.b64encode(data).decode('ascii')}])
+        return {
+            'api': self.api,
+            'method': self.method,
+            'path': self.path,
+            'request_digest': self.request_digest,
+            'status': self.status,
+            'headers': self.headers,
+            'headers_ms': round(self.headers_ms, 2),
+            'chunks': chunks,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Interaction':
+        chunks = [
+            (offset_ms, base64.b64decode(chunk['b64']) if isinstance(chunk, dict) else chunk.encode('utf-8'))
+            for offset_ms, chunk in data['chunks']
+        ]
+        return cls(
+            api=data['api'],
+            method=data['method'],
+            path=data['path'],
+            request_digest=data['request_digest'],
+            status=data['status'],
+            headers=data['headers'],
+            chunks=chunks,
+            headers_ms=data.get('headers_ms', 0.0),
+        )
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class Cassette:
+    """
+    Recorded interactions, stored as JSON lines and gzipped if the path ends in ``.gz``.
+
+    The first line is a header; each following line is one interaction,
+    written as soon as its response has been read, so a recording that is
+    interrupted keeps everything recorded so far.
+    """
+
+    def __init__(self, interactions: Optional[List[Interaction]] = None, match: str = 'body'):
+        self.interactions = interactions or []
+        self.match = match
+        self._cursors: Dict[Tuple[str, ...], int] = {}
+        self._index: Dict[Tuple[str, ...], List[Interaction]] = {}
+        for interaction in self.interactions:
+            key = self._key(interaction.method, interaction.path, interaction.request_digest)
+            self._index.setdefault(key, []).append(interaction)
+        self._lock = threading.Lock()
+        self._file: Optional[IO[str]] = None
+
+    def _key(self, method: str, path: str, digest: str) -> Tuple[str, ...]:
+        return (method, path, digest) if self.match == 'body' else (method, path)
+
+    @classmethod
+    def load(cls, path: str, match: str = 'body') -> 'Cassette':
+        with _open(path, 'r') as file:
+            lines = [json.loads(line) for line in file if line.strip()]
+        if not lines or lines[0].get('cassette') != CASSETTE_VERSION:
+            raise ValueError(f'{path} is not a version {CASSETTE_VERSION} cassette')
+        return cls([Interaction.from_dict(line) for line in lines[1:]], match)
+
+    def open_for_recording(self, path: str) -> None:
+        self._file = _open(path, 'w')
+        self._write({'cassette': CASSETTE_VERSION, 'recorded_at': datetime.now(timezone.utc).isoformat()})
+
+    def _write(self, data: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(data, separators=(',', ':')) + '\n')
+        self._file.flush()
+
+    def add(self, interaction: Interaction) -> None:
+        with self._lock:
+            self.interactions.append(interaction)
+            if self._file is not None:
+                self._write(interaction.to_dict())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def find(self, method: str, path: str, digest: str) -> Optional[Interaction]:
+        """
+        The next recorded response for a request.
+
+        Identical requests recorded several times are served in recorded
+        order, and the sequence starts again when it runs out, so a
+        benchmark can make more calls than were recorded.
+        """
+        key = self._key(method, path, digest)
+        candidates = self._index.get(key)
+        if not candidates:
+            return None
+        with self._lock:
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+        return candidates[cursor % len(candidates)]
+
+
+@dataclass
+class Upstreams:
+    """Where recording forwards each provider's requests."""
+
+    openai: str = 'https://api.openai.com'
+    gemini: str = 'https://generativelanguage.googleapis.com'
+    bedrock_region: str = field(default_factory=lambda: os.getenv('AWS_REGION') or os.getenv('AWS_DEFAULT_REGION')
+                                or 'us-east-1')
+
+    def url(self, api: str) -> str:
+        if api == 'gemini':
+            return self.gemini
+        if api == 'bedrock':
+            return f'https://bedrock-runtime.{self.bedrock_region}.amazonaws.com'
+        return self.openai
+
+
+class CassetteServer(ThreadingHTTPServer):
+    """
+    Provider endpoint that records traffic to, or replays it from, a cassette.
+
+    Point the provider clients at it the same way as the stub server. In
+    ``record`` mode each request is forwarded to the real provider and the
+    response is streamed back to the client while it is written to the
+    cassette. In ``replay`` mode no network call is made: the matching
+    recorded response is sent back, each chunk at its recorded offset
+    multiplied by ``time_scale``.
+
+    Serves ``GET /__stats`` and the ``/__run/<id>`` prefixes like the stub
+    server, so ``run_benchmarks.py`` can use either.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        cassette: Cassette,
+        mode: str,
+        time_scale: float = 1.0,
+        upstreams: Optional[Upstreams] = None,
+    ):
+        super().__init__(address, _CassetteHandler)
+        self.cassette = cassette
+        self.mode = mode
+        self.time_scale = time_scale
+        self.upstreams = upstreams or Upstreams()
+        self.stats = StubStats()
+        self.run_stats: Dict[str, StubStats] = {}
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count(self, api: str, status: int, upstream_ms: float, run_id: Optional[str] = None) -> None:
+        with self._lock:
+            self.stats.add(api, status >= 400, upstream_ms)
+            if run_id is not None:
+                self.run_stats.setdefault(run_id, StubStats()).add(api, status >= 400, upstream_ms)
+
+    def stats_dict(self, run_id: Optional[str] = None) -> Dict[str, Any]:
+        if run_id is not None:
+            with self._lock:
+                return self.run_stats.setdefault(run_id, StubStats()).to_dict()
+        return {**self.stats.to_dict(), 'misses': self.misses, 'recorded': len(self.cassette.interactions)}
+
+    def reset_stats(self, run_id: Optional[str] = None) -> None:
+        with self._lock:
+            if run_id is not None:
+                self.run_stats.pop(run_id, None)
+                return
+            self.stats = StubStats()
+            self.run_stats = {}
+            self.misses = 0
+
+
+def _sign_bedrock(method: str, url: str, raw: bytes, headers: Dict[str, str], region: str) -> Dict[str, str]:
+    """Sign a Bedrock request for the real endpoint; the client signed it for the recorder's address."""
+    from botocore.auth import SigV4Auth
+    from botocore.awsrequest import AWSRequest
+    from botocore.session import get_session
+
+    unsigned = {name: value for name, value in headers.items()
+                if name.lower() not in ('authorization', 'x-amz-date', 'x-amz-security-token', 'x-amz-content-sha256')}
+    request = AWSRequest(method=method, url=url, data=raw, headers=unsigned)
+    SigV4Auth(get_session().get_credentials(), 'bedrock', region).add_auth(request)
+    return dict(request.headers.items())
+
+
+class _CassetteHandler(BaseHTTPRequestHandler):
+    server: CassetteServer
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.run_id, self.request_path = split_run_path(self.path)
+        if self.request_path == '/__stats':
+            self._send_json(200, self.server.stats_dict(self.run_id))
+        else:
+            self._handle()
+
+    def do_POST(self):
+        self.run_id, self.request_path = split_run_path(self.path)
+        if self.request_path.split('?', 1)[0] == '/__reset':
+            self.server.reset_stats(self.run_id)
+            self._send_json(200, {})
+        else:
+            self._handle()
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        path = clean_path(self.request_path)
+        api = api_for(path.split('?', 1)[0])
+        if api is None:
+            self._send_json(404, {'error': {'message': f'Unknown path {path}'}})
+            return
+        if self.server.mode == 'record':
+            self._record(api, path, raw)
+        else:
+            self._replay(api, path, raw)
+
+    def _record(self, api: str, path: str, raw: bytes) -> None:
+        url = self.server.upstreams.url(api) + self.request_path
+        parts = urlsplit(url)
+        headers = {name: value for name, value in self.headers.items() if name.lower() not in SKIPPED_REQUEST_HEADERS}
+        # Recorded bodies must be readable, so ask for them uncompressed.
+        headers['Accept-Encoding'] = 'identity'
+        if api == 'bedrock':
+            headers = _sign_bedrock(self.command, url, raw, headers, self.server.upstreams.bedrock_region)
+
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        connection = connection_class(parts.netloc, timeout=300)
+        start = time.perf_counter()
+        try:
+            try:
+                connection.request(self.command, parts.path + (f'?{parts.query}' if parts.query else ''), raw, headers)
+                response = connection.getresponse()
+            except OSError as err:
+                self._send_json(502, {'error': {'message': f'Upstream request failed: {err}'}})
+                return
+            interaction = Interaction(
+                api=api, method=self.command, path=path, request_digest=body_digest(raw),
+                status=response.status,
+                headers={name: response.getheader(name) for name in FORWARDED_RESPONSE_HEADERS
+                         if response.getheader(name)},
+                headers_ms=(time.perf_counter() - start) * 1000,
+            )
+            self.send_response(response.status)
+            for name, value in interaction.headers.items():
+                self.send_header(name, value)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            while True:
+                data = response.read1(65536)
+                if not data:
+                    break
+                interaction.chunks.append(((time.perf_counter() - start) * 1000, data))
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+            self.wfile.write(b'0\r\n\r\n')
+        finally:
+            connection.close()
+        self.server.cassette.add(interaction)
+        self.server.count(api, interaction.status, interaction.duration_ms, self.run_id)
+
+    def _replay(self, api: str, path: str, raw: bytes) -> None:
+        interaction = self.server.cassette.find(self.command, path, body_digest(raw))
+        if interaction is None:
+            with self.server._lock:
+                self.server.misses += 1
+            self._send_json(404, {'error': {'message': f'No recorded response for {self.command} {path}'}})
+            return
+
+        scale = self.server.time_scale
+        start = time.perf_counter()
+
+        def wait_until(offset_ms: float) -> None:
+            delay = offset_ms * scale / 1000 - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        wait_until(interaction.headers_ms)
+        self.send_response(interaction.status)
+        for name, value in interaction.headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(sum(len(data) for _, data in interaction.chunks)))
+        self.end_headers()
+        for offset_ms, data in interaction.chunks:
+            wait_until(offset_ms)
+            self.wfile.write(data)
+            self.wfile.flush()
+        self.server.count(api, interaction.status, interaction.duration_ms * scale, self.run_id)
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_replay_server(
+    path: str,
+    time_scale: float = 1.0,
+    match: str = 'body',
+    host: str = '127.0.0.1',
+    port: int = 0,
+) -> CassetteServer:
+    """
+    Start a server replaying a cassette on a background thread.
+
+    :param path: Cassette file.
+    :param time_scale: Multiplier for recorded timing: 1 for the original
+        timing, 0.5 for twice as fast, 0 for no delay.
+    :param match: ``body`` matches on method, path and request body;
+        ``path`` ignores the body, for clients whose requests vary between runs.
+    :return: The running server. Call ``shutdown()`` to stop it.
+    """
+    server = CassetteServer((host, port), Cassette.load(path, match), 'replay', time_scale)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """Synchronous entry point for Poetry script."""
+    parser = argparse.ArgumentParser(description='Record provider traffic to a cassette, or replay a cassette.')
+    parser.add_argument('mode', choices=('record', 'replay'))
+    parser.add_argument('cassette', help='Cassette file; use a .gz suffix to compress it')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help='Replay: multiplier for recorded timing, 0 for none (default: %(default)s)')
+    parser.add_argument('--match', choices=MATCH_MODES, default='body',
+                        help='Replay: match requests on path and body, or path only (default: %(default)s)')
+    parser.add_argument('--openai-upstream', default=Upstreams.openai,
+                        help='Record: OpenAI base URL (default: %(default)s)')
+    parser.add_argument('--gemini-upstream', default=Upstreams.gemini,
+                        help='Record: Gemini base URL (default: %(default)s)')
+    parser.add_argument('--bedrock-region', default=None,
+                        help='Record: Bedrock region (default: AWS_REGION or AWS_DEFAULT_REGION)')
+    args = parser.parse_args()
+
+    if args.mode == 'record':
+        cassette = Cassette()
+        cassette.open_for_recording(args.cassette)
+        upstreams = Upstreams(openai=args.openai_upstream, gemini=args.gemini_upstream)
+        if args.bedrock_region:
+            upstreams.bedrock_region = args.bedrock_region
+        server = CassetteServer((args.host, args.port), cassette, 'record', upstreams=upstreams)
+    else:
+        cassette = Cassette.load(args.cassette, args.match)
+        server = CassetteServer((args.host, args.port), cassette, 'replay', args.time_scale)
+        print(f"*** Replaying {len(cassette.interactions)} interactions at {args.time_scale}x timing")
+
+    print(f"*** Cassette {args.mode} server listening on {server.url}")
+    print(f"    OPENAI_BASE_URL={server.url}/v1")
+    print(f"    GOOGLE_GEMINI_BASE_URL={server.url}")
+    print(f"    AWS_ENDPOINT_URL_BEDROCK_RUNTIME={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        cassette.close()
+        if args.mode == 'record':
+            print(f"*** Recorded {len(cassette.interactions)} interactions to {args.cassette}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""End-to-end benchmark of the examples against the stub provider server."""
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from mock_provider_server import add_settings_arguments, settings_from_args, start_server
+from provider_cassette import MATCH_MODES, start_replay_server
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CHILD = os.path.join(BENCH_DIR, 'bench_child.py')
+FLAG_DATA = os.path.join(BENCH_DIR, 'benchmark_flag_data.json')
+
+ENTRY_POINTS: Dict[str, tuple] = {
+    'openai': ('getting_started/openai/chat_completions', 'openai_example'),
+    'gemini': ('getting_started/gemini/generate_content', 'gemini_example'),
+    'bedrock': ('getting_started/bedrock/converse', 'bedrock_example'),
+    'langchain': ('getting_started/langchain/invoke', 'langchain_example'),
+    'langgraph-agent': ('getting_started/langgraph/react_agent', 'langgraph_agent_example'),
+    'langgraph-multi-agent': ('getting_started/langgraph/state_graph', 'langgraph_multi_agent_example'),
+    'create-model': ('features/create_model', 'create_model_example'),
+    'create-agent': ('features/create_agent', 'create_agent_example'),
+    'create-agent-graph': ('features/create_agent_graph', 'create_agent_graph_example'),
+    'create-judge': ('features/create_judge', 'create_judge_example'),
+}
+"""Benchmark name to (example directory, module with ``main``)."""
+
+
+@dataclass
+class RunSample:
+    ok: bool
+    import_ms: float
+    wall_ms: float
+    init_ms: float
+    model_calls: int
+    model_errors: int
+    upstream_ms: float
+
+    @property
+    def request_ms(self) -> float:
+        """Time spent on the request itself, excluding SDK initialization."""
+        return self.wall_ms - self.init_ms
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def provider_env(stub_url: str, flag_data: str) -> Dict[str, str]:
+    """Environment pointing every provider client at the stub and flags at local data."""
+    return {
+        'LAUNCHDARKLY_FLAG_DATA_FILE': flag_data,
+        'OPENAI_BASE_URL': f'{stub_url}/v1',
+        'OPENAI_API_KEY': 'stub-key',
+        'OPENAI_AGENTS_DISABLE_TRACING': '1',
+        'GOOGLE_API_KEY': 'stub-key',
+        'GOOGLE_GEMINI_BASE_URL': stub_url,
+        'AWS_ENDPOINT_URL_BEDROCK_RUNTIME': stub_url,
+        'AWS_ACCESS_KEY_ID': 'stub',
+        'AWS_SECRET_ACCESS_KEY': 'stub',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        'JUDGE_CACHE_BYPASS': 'true',
+    }
+
+
+def child_command(example_dir: str, module: str, runs: int, stub_url: str, python: Optional[str]) -> List[str]:
+    args = [CHILD, module, '--runs', str(runs), '--stub-url', stub_url]
+    if python:
+        return [python, *args]
+    # Use the example's own Poetry environment so its dependencies are installed.
+    return ['poetry', '-C', example_dir, 'run', 'python', *args]
+
+
+def run_entry_point(
+    name: str,
+    runs: int,
+    concurrency: int,
+    stub_url: str,
+    flag_data: str,
+    python: Optional[str],
+) -> tuple:
+    example_dir, module = ENTRY_POINTS[name]
+    example_dir = os.path.join(REPO_ROOT, example_dir)
+
+    per_worker = [runs // concurrency + (1 if i < runs % concurrency else 0) for i in range(concurrency)]
+    start = time.perf_counter()
+    workers = []
+    for i, count in enumerate(per_worker):
+        if not count:
+            continue
+        # Each worker gets its own counters on the stub, so concurrent workers
+        # can tell their requests apart.
+        worker_url = f'{stub_url}/__run/{name}-{i}'
+        workers.append(subprocess.Popen(
+            child_command(example_dir, module, count, worker_url, python),
+            cwd=example_dir, env={**os.environ, **provider_env(worker_url, flag_data)},
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        ))
+    samples: List[RunSample] = []
+    errors: List[str] = []
+    for worker in workers:
+        stdout, stderr = worker.communicate()
+        samples.extend(RunSample(**json.loads(line)) for line in stdout.splitlines() if line.startswith('{'))
+        if worker.returncode != 0:
+            errors.append(stderr.strip().splitlines()[-1] if stderr.strip() else f'exit code {worker.returncode}')
+    elapsed_s = time.perf_counter() - start
+    return samples, elapsed_s, errors
+
+
+def main():
+    """Synchronous entry point for Poetry script."""
+    parser = argparse.ArgumentParser(description='Benchmark the examples against local stub providers.')
+    parser.add_argument('entry_points', nargs='*',
+                        help=f"Entry points to run: {', '.join(ENTRY_POINTS)} (default: all)")
+    parser.add_argument('--runs', type=int, default=20, help='Runs per entry point (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Worker processes per entry point (default: %(default)s)')
+    parser.add_argument('--python', help="Interpreter to run examples with instead of each example's Poetry env")
+    parser.add_argument('--flag-data', default=FLAG_DATA, help='Offline flag data file (default: %(default)s)')
+    parser.add_argument('--cassette', help='Replay recorded provider traffic from this cassette instead of the stub')
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help='Multiplier for the cassette\'s recorded timing (default: %(default)s)')
+    parser.add_argument('--match', choices=MATCH_MODES, default='body',
+                        help='Match cassette requests on path and body, or path only (default: %(default)s)')
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+    unknown = [name for name in args.entry_points if name not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry points: {', '.join(unknown)}")
+
+    if args.cassette:
+        server = start_replay_server(args.cassette, args.time_scale, args.match)
+        print(f"*** Replaying {len(server.cassette.interactions)} recorded interactions from {args.cassette} "
+              f"on {server.url} at {args.time_scale}x timing")
+    else:
+        server = start_server(settings_from_args(args))
+        print(f"*** Stub provider server on {server.url} "
+              f"({args.latency_distribution} latency, median {args.latency_ms:.0f}ms, error rate {args.error_rate})")
+    header = (f"\n{'entry point':<22} {'runs':>5} {'fail':>5} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} "
+              f"{'init':>7} {'import':>8} {'calls':>6} {'overhead/call':>14}")
+    print(header)
+    try:
+        for name in args.entry_points or list(ENTRY_POINTS):
+            samples, elapsed_s, errors = run_entry_point(
+                name, args.runs, max(args.concurrency, 1), server.url, args.flag_data, args.python,
+            )
+            if not samples:
+                print(f"{name:<22} failed to run: {errors[0] if errors else 'no output'}")
+                continue
+
+            latencies = [s.request_ms for s in samples]
+            calls = sum(s.model_calls for s in samples)
+            overhead = '-'
+            if calls:
+                overhead_ms = sum(s.request_ms - s.upstream_ms for s in samples) / calls
+                overhead = f"{overhead_ms:.1f}ms"
+            print(
+                f"{name:<22} {len(samples):>5} {sum(not s.ok for s in samples):>5} "
+                f"{len(samples) / elapsed_s:>7.2f} "
+                f"{percentile(latencies, 50):>6.0f}ms {percentile(latencies, 95):>6.0f}ms "
+                f"{percentile(latencies, 99):>6.0f}ms "
+                f"{sum(s.init_ms for s in samples) / len(samples):>5.0f}ms "
+                f"{percentile([s.import_ms for s in samples], 50):>6.0f}ms "
+                f"{calls / len(samples):>6.1f} {overhead:>14}"
+            )
+    finally:
+        if args.cassette and server.misses:
+            print(f"*** {server.misses} requests had no recorded response; re-record the cassette or use --match path")
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,668 @@
+"""Long-running HTTP service for the completion, agent, agent graph and judge flows."""
+
+import dataclasses
+import math
+import os
+import logging
+from dotenv import load_dotenv
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from ldclient import Context
+from ldai import Judge, ManagedAgent, ManagedAgentGraph, ManagedModel, log
+from ldai.providers import RunnerFactory
+from ld_bootstrap import bootstrap, resumption_data
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from concurrency_limits import ConcurrencyLimiter, EndpointBusy
+from config_cache import DEFAULT_MAX_ENTRIES, ConfigCache, fingerprint
+from conversation_store import DEFAULT_HOT_TURNS, DEFAULT_MAX_TURNS, ConversationStore
+from hedging import HedgedModel, HedgePolicy, HedgeTarget, backup_config
+from otel_metrics import TrackerMetricsExporter, prometheus_meter_provider
+from provider_adapters import DEFAULT_MAX_CONNECTIONS
+from provider_clients import ProviderClients
+from rate_limits import (
+    Admission, Priority, ProviderRateLimiter, RateLimited, estimate_tokens, parse_limits, track_queue_wait,
+)
+from semantic_cache import DEFAULT_THRESHOLD, SemanticCache
+from singleflight import CoalescingRunner, SingleFlight
+from summary_metrics import SummaryAggregator
+
+load_dotenv()
+
+logging.basicConfig()
+logging.getLogger('ldclient').setLevel(logging.WARNING)
+logging.getLogger('summary_metrics').setLevel(logging.INFO)
+
+# Default AI Config keys; a request can name a different key with "config_key".
+completion_config_key = os.getenv('LAUNCHDARKLY_COMPLETION_KEY', 'sample-completion')
+agent_config_key = os.getenv('LAUNCHDARKLY_AGENT_KEY', 'sample-agent')
+graph_config_key = os.getenv('LAUNCHDARKLY_AGENT_GRAPH_KEY', 'sample-agent-graph')
+judge_config_key = os.getenv('LAUNCHDARKLY_JUDGE_KEY', 'sample-judge')
+
+# Requests taking longer than this are cancelled and answered with 504.
+request_timeout_ms = int(os.getenv('SERVICE_REQUEST_TIMEOUT_MS', '60000'))
+
+# How long a request waits for a free slot on a full endpoint before a 503.
+queue_timeout_ms = int(os.getenv('SERVICE_QUEUE_TIMEOUT_MS', '1000'))
+
+# Evaluated configs cached per context and variables; 0 evaluates on every request.
+config_cache_size = int(os.getenv('SERVICE_CONFIG_CACHE_SIZE', str(DEFAULT_MAX_ENTRIES)))
+
+# Completion responses cached per config variation and matched by similarity
+# of the user input; 0 disables the semantic cache. A lookup is a hit when the
+# cosine similarity reaches SERVICE_SEMANTIC_CACHE_THRESHOLD.
+semantic_cache_size = int(os.getenv('SERVICE_SEMANTIC_CACHE_SIZE', '0'))
+semantic_cache_threshold = float(os.getenv('SERVICE_SEMANTIC_CACHE_THRESHOLD', str(DEFAULT_THRESHOLD)))
+
+# Completion requests with a "session_id" continue that session's conversation.
+# Up to SERVICE_SESSIONS sessions are kept in memory, least recently used
+# dropped first, each with its last SERVICE_SESSION_MAX_TURNS turns. Turns
+# older than the last SERVICE_SESSION_HOT_TURNS are compressed unless
+# SERVICE_SESSION_COMPRESS=false. 0 sessions disables conversations.
+session_count = int(os.getenv('SERVICE_SESSIONS', '10000'))
+session_max_turns = int(os.getenv('SERVICE_SESSION_MAX_TURNS', str(DEFAULT_MAX_TURNS)))
+session_hot_turns = int(os.getenv('SERVICE_SESSION_HOT_TURNS', str(DEFAULT_HOT_TURNS)))
+session_compress = os.getenv('SERVICE_SESSION_COMPRESS', 'true').lower() in ('1', 'true', 'yes')
+
+# Identical completions (same provider, model, parameters, messages and input)
+# that arrive while one is in flight share its provider call. Set
+# SERVICE_COALESCE_REQUESTS=false to send every request upstream.
+coalesce_requests = os.getenv('SERVICE_COALESCE_REQUESTS', 'true').lower() in ('1', 'true', 'yes')
+
+# Latency and token percentiles cover this many trailing seconds, and are
+# logged every SERVICE_METRICS_LOG_INTERVAL_S seconds (0 to disable the log).
+metrics_window_s = float(os.getenv('SERVICE_METRICS_WINDOW_S', '300'))
+metrics_log_interval_s = float(os.getenv('SERVICE_METRICS_LOG_INTERVAL_S', '60'))
+
+# Set SERVICE_PROMETHEUS_METRICS=true to serve tracker metrics at /metrics for
+# Prometheus. Otherwise they go to the global OpenTelemetry meter provider.
+prometheus_metrics = os.getenv('SERVICE_PROMETHEUS_METRICS', 'false').lower() in ('1', 'true', 'yes')
+
+# Completions whose config defines a backup model under custom "hedge" data
+# send the request to the backup once the primary runs longer than its recent
+# p95 latency. Until SERVICE_HEDGE_MIN_SAMPLES runs have been seen, the
+# threshold is SERVICE_HEDGE_DEFAULT_DELAY_MS.
+hedge_default_delay_ms = float(os.getenv('SERVICE_HEDGE_DEFAULT_DELAY_MS', '2000'))
+hedge_min_samples = int(os.getenv('SERVICE_HEDGE_MIN_SAMPLES', '20'))
+
+# Requests and tokens per minute per provider or provider/model, as JSON, for
+# example {"openai": {"rpm": 500, "tpm": 30000}}. Requests over the limit queue,
+# interactive before batch; one expected to wait longer than
+# SERVICE_RATE_LIMIT_MAX_WAIT_MS is rejected with a 503.
+rate_limits = parse_limits(os.getenv('SERVICE_RATE_LIMITS', ''))
+rate_limit_max_wait_ms = int(os.getenv('SERVICE_RATE_LIMIT_MAX_WAIT_MS', str(request_timeout_ms)))
+
+# Keep-alive connections each provider client keeps open, shared by every
+# completion and judge request for that provider.
+provider_max_connections = int(os.getenv('SERVICE_PROVIDER_MAX_CONNECTIONS', str(DEFAULT_MAX_CONNECTIONS)))
+
+# How long shutdown waits for judge evaluations still running in the background.
+shutdown_timeout_ms = int(os.getenv('SERVICE_SHUTDOWN_TIMEOUT_MS', '10000'))
+
+ENDPOINT_CONCURRENCY = {
+    'completion': int(os.getenv('SERVICE_COMPLETION_CONCURRENCY', '32')),
+    'agent': int(os.getenv('SERVICE_AGENT_CONCURRENCY', '16')),
+    'graph': int(os.getenv('SERVICE_GRAPH_CONCURRENCY', '4')),
+    'judge': int(os.getenv('SERVICE_JUDGE_CONCURRENCY', '16')),
+}
+"""Maximum concurrent requests per endpoint; 0 means unlimited."""
+
+DISABLED_MESSAGE = (
+    "AI config '{key}' is disabled. Verify the config key exists in your LaunchDarkly "
+    "project and is not targeting a disabled variation."
+)
+
+
+class BadRequest(Exception):
+    """Raised when a request body is missing fields or has the wrong types."""
+
+
+class ConfigDisabled(Exception):
+    """Raised when the requested AI Config is disabled for the context."""
+
+
+def get_weather(city: str) -> str:
+    """Get the weather for a given city."""
+    return f"The weather in {city} is sunny."
+
+
+def search_flights(destination: str) -> str:
+    """Search for available flights to a destination."""
+    return f"Found 3 flights to {destination}: Economy $450, Premium Economy $850, Business $2100."
+
+
+def search_hotels(city: str) -> str:
+    """Search for available hotels in a city."""
+    return f"Found 5 hotels in {city}: Budget Inn $80/night, City Center Hotel $180/night, Grand Palace $420/night."
+
+
+AGENT_TOOLS = {'get_weather': get_weather}
+GRAPH_TOOLS = {
+    'search_flights': search_flights,
+    'search_hotels': search_hotels,
+    'get_weather': get_weather,
+}
+
+
+def metrics_to_dict(summary) -> Dict[str, Any]:
+    """Render a tracker or graph metric summary as JSON-friendly data."""
+    result: Dict[str, Any] = {
+        'duration_ms': summary.duration_ms,
+        'success': summary.success,
+    }
+    if summary.tokens:
+        result['tokens'] = {
+            'input': summary.tokens.input,
+            'output': summary.tokens.output,
+            'total': summary.tokens.total,
+        }
+    if getattr(summary, 'time_to_first_token', None) is not None:
+        result['time_to_first_token'] = summary.time_to_first_token
+    if getattr(summary, 'tool_calls', None):
+        result['tool_calls'] = list(summary.tool_calls)
+    if getattr(summary, 'path', None):
+        result['path'] = list(summary.path)
+    return result
+
+
+class AIService:
+    """
+    State shared by every request: the AI client, provider clients and limits.
+
+    One ``LDAIClient`` is created at startup and kept for the life of the
+    process, so SDK initialization and flag streaming happen once rather than
+    per request. Judge evaluations attached to completion, agent and graph
+    responses run in the background; they are tracked here so shutdown can
+    wait for them before flushing events.
+    """
+
+    def __init__(self):
+        self.limiters = {
+            name: ConcurrencyLimiter(name, limit, queue_timeout_ms)
+            for name, limit in ENDPOINT_CONCURRENCY.items()
+        }
+        self.providers = ProviderClients(provider_max_connections)
+        self.rate_limits = ProviderRateLimiter(rate_limits, rate_limit_max_wait_ms)
+        self.flights = SingleFlight()
+        self._bootstrap = None
+        self.configs: Optional[ConfigCache] = None
+        self.responses: Optional[SemanticCache] = None
+        if semantic_cache_size > 0:
+            self.responses = SemanticCache(semantic_cache_size, semantic_cache_threshold)
+        self.conversations: Optional[ConversationStore] = None
+        if session_count > 0:
+            self.conversations = ConversationStore(
+                session_count, session_max_turns, session_hot_turns, compress=session_compress,
+            )
+        self.summaries = SummaryAggregator(window_s=metrics_window_s)
+        self._meter_provider = prometheus_meter_provider() if prometheus_metrics else None
+        self.exporter = TrackerMetricsExporter(self._meter_provider)
+        self.hedging = HedgePolicy(
+            metrics_window_s, default_delay_ms=hedge_default_delay_ms, min_samples=hedge_min_samples,
+        )
+        self._background: Set[asyncio.Task] = set()
+
+    @property
+    def aiclient(self):
+        return self._bootstrap.aiclient
+
+    def start(self) -> None:
+        self._bootstrap = bootstrap('hello-python-ai-service')
+        self.configs = ConfigCache(self.aiclient, self._bootstrap.ld_client, config_cache_size)
+        self.providers.warm_up()
+        if metrics_log_interval_s > 0:
+            self.summaries.start_periodic_log(metrics_log_interval_s)
+
+    async def stop(self) -> None:
+        """Wait for background evaluations, close provider clients, then flush and close the SDK."""
+        if self._background:
+            print(f"*** Waiting for {len(self._background)} background judge evaluation(s)")
+            _, pending = await asyncio.wait(self._background, timeout=shutdown_timeout_ms / 1000)
+            for task in pending:
+                task.cancel()
+        self.summaries.stop_periodic_log()
+        self.summaries.log_stats()
+        if self._meter_provider is not None:
+            self._meter_provider.shutdown()
+        await self.providers.aclose()
+        if self.configs is not None:
+            self.configs.close()
+        if self._bootstrap is not None:
+            # Flush pending events and close the client.
+            self._bootstrap.ld_client.flush()
+            self._bootstrap.ld_client.close()
+        print("*** Service stopped")
+
+    async def evaluations(self, task: Optional[asyncio.Task], wait: bool) -> Optional[list]:
+        """Return judge results if ``wait`` is set; otherwise let them finish in the background."""
+        if task is None:
+            return None
+        if wait:
+            return [result.to_dict() for result in await task]
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return None
+
+    def coalesce(self, config, runner):
+        """Wrap a completion runner so identical in-flight requests share one provider call."""
+        if not coalesce_requests:
+            return runner
+        return CoalescingRunner(runner, self.flights, request_fingerprint(config))
+
+    async def admit(self, config, priority: Priority, *texts: str) -> Admission:
+        """Wait for rate-limit capacity for a run of ``config`` on the given input."""
+        messages = [message.content for message in (getattr(config, 'messages', None) or [])]
+        return await self.rate_limits.admit(
+            config.provider.name if config.provider else '',
+            config.model.name if config.model else '',
+            estimate_tokens([*messages, *texts]),
+            priority,
+        )
+
+    async def admit_nodes(self, definition, priority: Priority, prompt: str) -> Dict[str, Admission]:
+        """
+        Wait for rate-limit capacity for every enabled node of a graph.
+
+        Which nodes a graph run reaches is only known once it finishes, so
+        each is admitted up front; the caller refunds the ones that did not run.
+        """
+        node_configs: Dict[str, Any] = {}
+        definition.traverse(lambda node, _: node.get_config(), node_configs)
+        admissions: Dict[str, Admission] = {}
+        try:
+            for node_key, node_config in node_configs.items():
+                if node_config.enabled:
+                    admissions[node_key] = await self.admit(
+                        node_config, priority, node_config.instructions or '', prompt,
+                    )
+        except BaseException:
+            for admission in admissions.values():
+                admission.refund()
+            raise
+        return admissions
+
+    def settle(self, admission: Admission, context: Context, summary) -> None:
+        """Charge the run's actual token usage and record its queue wait."""
+        admission.settle(summary)
+        track_queue_wait(self._bootstrap.ld_client, context, summary, admission)
+
+    def finish(self, admission: Admission, context: Context, trackers: List[Any], shared: bool = False) -> None:
+        """
+        Settle an admission once its run is over, however the run ended.
+
+        Called from a ``finally`` block. A run that created a tracker sent its
+        model call and is settled with the tracker's summary; if it failed or
+        was cancelled the summary has no usage and the estimate stays charged.
+        A run that created no tracker never sent anything and is refunded.
+        A ``shared`` run joined an identical call that was already in flight,
+        which was charged on its own admission, so it is refunded and only
+        its queue wait is recorded.
+        """
+        if not trackers:
+            admission.refund()
+            return
+        summary = trackers[-1].get_summary()
+        if shared:
+            admission.refund()
+            track_queue_wait(self._bootstrap.ld_client, context, summary, admission)
+            return
+        self.settle(admission, context, summary)
+
+    def record(self, config, summary) -> None:
+        """Feed a run's tracker summary to the rolling percentiles and the metrics exporter."""
+        self.summaries.record_config(config, summary)
+        self.exporter.record_config(config, summary)
+
+    def with_history(self, config, context: Context, session_id: Optional[str]):
+        """``config`` with the session's earlier turns appended to its messages."""
+        if session_id is None or not config.enabled:
+            return config
+        history = self.conversations.history((context.fully_qualified_key, session_id))
+        if not history:
+            return config
+        return dataclasses.replace(config, messages=[*(config.messages or []), *history])
+
+    def remember(
+        self, context: Context, session_id: Optional[str], prompt: str, content: str,
+    ) -> Optional[Dict[str, Any]]:
+        """Add an exchange to the session and describe the session for the response."""
+        if session_id is None:
+            return None
+        # Sessions belong to a context, so one user cannot continue another's conversation by its ID.
+        key = (context.fully_qualified_key, session_id)
+        self.conversations.append(key, 'user', prompt)
+        turns = self.conversations.append(key, 'assistant', content)
+        return {'id': session_id, 'turns': turns}
+
+    async def completion(self, body: Dict[str, Any], context: Context) -> Dict[str, Any]:
+        prompt = require_str(body, 'input')
+        priority = parse_priority(body)
+        session_id = parse_session(body, self.conversations is not None)
+        key = body.get('config_key') or completion_config_key
+        config = self.configs.completion_config(key, context, variables=body.get('variables'))
+        # Earlier turns become part of the messages, so the caches and coalescing below only match the same history.
+        config = self.with_history(config, context, session_id)
+        runner = self.providers.create_model(config) if config.enabled else None
+        if runner is None:
+            raise ConfigDisabled(DISABLED_MESSAGE.format(key=key))
+
+        scope = response_scope(config)
+        cached = self.responses.lookup(scope, prompt) if self.responses else None
+        if cached is not None:
+            return {
+                'content': cached.content,
+                'metrics': None,
+                'evaluations': None,
+                'cache': {'similarity': round(cached.similarity, 4), 'input': cached.prompt},
+                'session': self.remember(context, session_id, prompt, cached.content),
+            }
+
+        target = HedgeTarget.from_config(config)
+        backup = backup_config(config, target, self._bootstrap.ld_client, context) if target else None
+        backup_runner = self.providers.create_model(backup) if backup else None
+        runner = self.coalesce(config, runner)
+        if backup_runner is not None:
+            response, config = await HedgedModel(
+                (config, runner), (backup, self.coalesce(backup, backup_runner)), self.hedging, target,
+                self._bootstrap.ld_client, context,
+                admit=lambda attempt_config: self.admit(attempt_config, priority, prompt),
+            ).run(prompt)
+        elif isinstance(runner, CoalescingRunner) and runner.pending(prompt):
+            # Joins a call that was already admitted; nothing more is sent upstream.
+            response = await ManagedModel(config, runner).run(prompt)
+        else:
+            admission = await self.admit(config, priority, prompt)
+            tracked_config, trackers = capture_trackers(config)
+            try:
+                response = await ManagedModel(tracked_config, runner).run(prompt)
+            finally:
+                # An identical call may have started while this one was queued, in which case it joined that call.
+                self.finish(admission, context, trackers, shared=isinstance(runner, CoalescingRunner) and runner.shared)
+        self.record(config, response.metrics)
+        succeeded = response.metrics.success and response.content
+        if self.responses and succeeded:
+            self.responses.store(scope, prompt, response.content)
+        return {
+            'content': response.content,
+            'metrics': metrics_to_dict(response.metrics),
+            'evaluations': await self.evaluations(response.evaluations, bool(body.get('wait_for_evaluations'))),
+            'cache': None,
+            'session': self.remember(context, session_id, prompt, response.content) if succeeded else None,
+        }
+
+    async def agent(self, body: Dict[str, Any], context: Context) -> Dict[str, Any]:
+        prompt = require_str(body, 'input')
+        priority = parse_priority(body)
+        key = body.get('config_key') or agent_config_key
+        config = self.configs.agent_config(key, context, variables=body.get('variables'))
+        runner = RunnerFactory.create_agent(config, AGENT_TOOLS) if config.enabled else None
+        if runner is None:
+            raise ConfigDisabled(DISABLED_MESSAGE.format(key=key))
+
+        admission = await self.admit(config, priority, config.instructions or '', prompt)
+        tracked_config, trackers = capture_trackers(config)
+        try:
+            response = await ManagedAgent(tracked_config, runner).run(prompt)
+        finally:
+            self.finish(admission, context, trackers)
+        self.record(config, response.metrics)
+        return {
+            'content': response.content,
+            'metrics': metrics_to_dict(response.metrics),
+            'evaluations': await self.evaluations(response.evaluations, bool(body.get('wait_for_evaluations'))),
+        }
+
+    async def graph(self, body: Dict[str, Any], context: Context) -> Dict[str, Any]:
+        prompt = require_str(body, 'input')
+        priority = parse_priority(body)
+        key = body.get('config_key') or graph_config_key
+        # Built from the definition, rather than with create_agent_graph, so each node's config is at hand.
+        definition = self.aiclient.agent_graph(key, context)
+        runner = RunnerFactory.create_agent_graph(definition, GRAPH_TOOLS) if definition.enabled else None
+        if runner is None:
+            raise ConfigDisabled(DISABLED_MESSAGE.format(key=key))
+
+        admissions = await self.admit_nodes(definition, priority, prompt)
+        try:
+            result = await ManagedAgentGraph(definition, runner).run(prompt)
+        except BaseException:
+            # A failed run does not report which nodes it reached. It always
+            # calls the root first, so only the root's admission stays charged.
+            root = definition.root()
+            for node_key, admission in admissions.items():
+                if root is None or node_key != root.get_key():
+                    admission.refund()
+            raise
+        for node_key, admission in admissions.items():
+            node_summary = result.metrics.node_metrics.get(node_key)
+            if node_summary is None:
+                admission.refund()
+            else:
+                self.settle(admission, context, node_summary)
+        for node_key, node_summary in result.metrics.node_metrics.items():
+            self.record(definition.get_node(node_key).get_config(), node_summary)
+        return {
+            'content': result.content,
+            'metrics': metrics_to_dict(result.metrics),
+            'evaluations': await self.evaluations(result.evaluations, bool(body.get('wait_for_evaluations'))),
+        }
+
+    async def judge(self, body: Dict[str, Any], context: Context) -> Dict[str, Any]:
+        input_text, output_text = require_str(body, 'input'), require_str(body, 'output')
+        priority = parse_priority(body)
+        key = body.get('config_key') or judge_config_key
+        config = self.configs.judge_config(key, context, variables=body.get('variables'))
+        runner = self.providers.create_model(config, multi_turn=False) if config.enabled else None
+        if runner is None:
+            raise ConfigDisabled(DISABLED_MESSAGE.format(key=key))
+
+        admission = await self.admit(config, priority, input_text, output_text)
+        config, trackers = capture_trackers(config)
+        try:
+            result = await Judge(config, runner).evaluate(input_text, output_text)
+        finally:
+            # No tracker means the judge returned before calling the model, such as for a config without a metric key.
+            self.finish(admission, context, trackers)
+        for tracker in trackers:
+            self.record(config, tracker.get_summary())
+        return {'result': result.to_dict()}
+
+
+def capture_trackers(config) -> Tuple[Any, List[Any]]:
+    """
+    A copy of ``config`` that keeps every tracker it creates, and the list they are kept in.
+
+    ``Judge.evaluate`` creates and uses its tracker internally and returns
+    only the verdict; the captured tracker gives the run's summary.
+    """
+    trackers: List[Any] = []
+    create_tracker = config.create_tracker
+
+    def create_and_keep():
+        tracker = create_tracker()
+        trackers.append(tracker)
+        return tracker
+
+    return dataclasses.replace(config, create_tracker=create_and_keep), trackers
+
+
+def response_scope(config) -> tuple:
+    """
+    Semantic cache scope for a completion config: its key, variation, model
+    and rendered messages, so a cached response is only served for the same
+    prompt template, variables and model.
+    """
+    variation_key = resumption_data(config.create_tracker().resumption_token).get('variationKey', '')
+    messages = [message.to_dict() for message in (config.messages or [])]
+    return config.key, variation_key, fingerprint([config.model.name if config.model else '', messages])
+
+
+def request_fingerprint(config) -> str:
+    """Digest of everything besides the input that determines a completion: provider, model, parameters and messages."""
+    return fingerprint([
+        config.provider.name if config.provider else '',
+        config.model.to_dict() if config.model else None,
+        [message.to_dict() for message in (config.messages or [])],
+    ])
+
+
+def require_str(body: Dict[str, Any], field: str) -> str:
+    value = body.get(field)
+    if not isinstance(value, str) or not value:
+        raise BadRequest(f"'{field}' must be a non-empty string")
+    return value
+
+
+def parse_priority(body: Dict[str, Any]) -> Priority:
+    """Rate-limit priority from the request's optional ``priority`` field: ``interactive`` or ``batch``."""
+    value = body.get('priority')
+    if value is not None and not isinstance(value, str):
+        raise BadRequest("'priority' must be 'interactive' or 'batch'")
+    try:
+        return Priority.parse(value)
+    except ValueError as err:
+        raise BadRequest(str(err)) from None
+
+
+def parse_session(body: Dict[str, Any], enabled: bool) -> Optional[str]:
+    """The request's optional ``session_id``, naming the conversation it continues."""
+    value = body.get('session_id')
+    if value is None:
+        return None
+    if not isinstance(value, str) or not value:
+        raise BadRequest("'session_id' must be a non-empty string")
+    if not enabled:
+        raise BadRequest('Conversations are disabled; set SERVICE_SESSIONS above 0')
+    return value
+
+
+def parse_context(body: Dict[str, Any]) -> Context:
+    """
+    Build the evaluation context from the request's ``context`` field.
+
+    The field uses the SDK's context JSON format, for example
+    ``{"kind": "user", "key": "user-123", "name": "Sandy"}``.
+    """
+    data = body.get('context')
+    if not isinstance(data, dict):
+        raise BadRequest("'context' must be an object, for example {\"kind\": \"user\", \"key\": \"user-123\"}")
+    context = Context.from_dict({'kind': 'user', **data})
+    if not context.valid:
+        raise BadRequest(f"Invalid context: {context.error}")
+    return context
+
+
+def endpoint(name: str, handler: Callable[[AIService, Dict[str, Any], Context], Awaitable[Dict[str, Any]]]):
+    """Wrap a flow in request parsing, its endpoint's concurrency limit, the request timeout and error mapping."""
+
+    async def route(request: Request) -> JSONResponse:
+        service: AIService = request.app.state.service
+        try:
+            body = await request.json()
+        except ValueError as err:
+            return JSONResponse({'error': f'Invalid JSON body: {err}'}, status_code=400)
+        try:
+            if not isinstance(body, dict):
+                raise BadRequest('Request body must be a JSON object')
+            context = parse_context(body)
+            async with service.limiters[name].slot():
+                timeout = request_timeout_ms / 1000 if request_timeout_ms > 0 else None
+                return JSONResponse(await asyncio.wait_for(handler(service, body, context), timeout))
+        except BadRequest as err:
+            return JSONResponse({'error': str(err)}, status_code=400)
+        except ConfigDisabled as err:
+            return JSONResponse({'error': str(err)}, status_code=404)
+        except EndpointBusy as err:
+            return JSONResponse({'error': str(err)}, status_code=503, headers={'Retry-After': '1'})
+        except RateLimited as err:
+            retry_after = str(max(math.ceil(err.retry_after_s), 1))
+            return JSONResponse({'error': str(err)}, status_code=503, headers={'Retry-After': retry_after})
+        except asyncio.TimeoutError:
+            return JSONResponse({'error': f'Request timed out after {request_timeout_ms}ms'}, status_code=504)
+        except Exception as err:
+            # In production, sanitize before logging — provider errors may include credentials.
+            log.warning(f"Request to '{name}' failed: {err}")
+            return JSONResponse({'error': 'The model provider request failed'}, status_code=502)
+
+    return route
+
+
+async def healthz(request: Request) -> JSONResponse:
+    service: AIService = request.app.state.service
+    return JSONResponse({
+        'status': 'ok',
+        'endpoints': {name: limiter.stats() for name, limiter in service.limiters.items()},
+        'config_cache': service.configs.stats.to_dict(),
+        'hedging': service.hedging.stats.to_dict(),
+        'rate_limits': service.rate_limits.stats(),
+        'semantic_cache': service.responses.to_dict() if service.responses else None,
+        'coalescing': service.flights.stats.to_dict(),
+        'conversations': service.conversations.to_dict() if service.conversations else None,
+    })
+
+
+async def stats(request: Request) -> JSONResponse:
+    service: AIService = request.app.state.service
+    params = request.query_params
+    series = service.summaries.stats(
+        config_key=params.get('config_key'),
+        variation_key=params.get('variation_key'),
+        model=params.get('model'),
+    )
+    return JSONResponse({
+        'window_s': metrics_window_s,
+        'series': [entry.to_dict() for entry in series],
+    })
+
+
+async def prometheus(request: Request) -> Response:
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    service = AIService()
+    service.start()
+    app.state.service = service
+    try:
+        yield
+    finally:
+        await service.stop()
+
+
+routes = [
+    Route('/v1/completion', endpoint('completion', AIService.completion), methods=['POST']),
+    Route('/v1/agent', endpoint('agent', AIService.agent), methods=['POST']),
+    Route('/v1/graph', endpoint('graph', AIService.graph), methods=['POST']),
+    Route('/v1/judge', endpoint('judge', AIService.judge), methods=['POST']),
+    Route('/v1/stats', stats, methods=['GET']),
+    Route('/healthz', healthz, methods=['GET']),
+]
+if prometheus_metrics:
+    routes.append(Route('/metrics', prometheus, methods=['GET']))
+
+app = Starlette(routes=routes, lifespan=lifespan)
+
+
+def main():
+    """Synchronous entry point for Poetry script."""
+    import uvicorn
+
+    uvicorn.run(
+        app,
+        host=os.getenv('SERVICE_HOST', '127.0.0.1'),
+        port=int(os.getenv('SERVICE_PORT', '8000')),
+        # In-flight requests get this long to finish after SIGINT or SIGTERM.
+        timeout_graceful_shutdown=max(request_timeout_ms, 0) // 1000 + 1,
+    )
+
+
+if __name__ == "__main__":
+    main()
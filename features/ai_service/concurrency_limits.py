@@ -0,0 +1,82 @@
+"""Per-endpoint concurrency limits with a bounded wait for a free slot."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+
+class EndpointBusy(Exception):
+    """Raised when an endpoint is at its concurrency limit and no slot frees up in time."""
+
+
+class ConcurrencyLimiter:
+    """
+    Caps the number of requests an endpoint handles at once.
+
+    A request that arrives while the endpoint is full waits up to
+    ``queue_timeout_ms`` for a slot and is then rejected with
+    :class:`EndpointBusy`, so a burst of slow model calls on one endpoint
+    cannot tie up the whole service or queue requests without bound.
+    """
+
+    def __init__(self, name: str, limit: int, queue_timeout_ms: int = 0):
+        """
+        Initialize the limiter.
+
+        :param name: Endpoint name, used in error messages and stats.
+        :param limit: Maximum concurrent requests; 0 or less means unlimited.
+        :param queue_timeout_ms: How long a request waits for a slot when the
+            endpoint is full. 0 rejects it immediately.
+        """
+        self.name = name
+        self.limit = limit
+        self._queue_timeout_s = max(queue_timeout_ms, 0) / 1000
+        self._semaphore = asyncio.Semaphore(limit) if limit > 0 else None
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def _acquire(self) -> None:
+        if self._semaphore is None:
+            return
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return
+        if self._queue_timeout_s == 0:
+            self.rejected += 1
+            raise EndpointBusy(f"Endpoint '{self.name}' is at its limit of {self.limit} concurrent requests")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self._queue_timeout_s)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise EndpointBusy(
+                f"Endpoint '{self.name}' is at its limit of {self.limit} concurrent requests"
+            ) from None
+        finally:
+            self.waiting -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Hold a slot for the duration of the ``async with`` block.
+
+        :raises EndpointBusy: If no slot is available within the queue timeout.
+        """
+        await self._acquire()
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'rejected': self.rejected,
+        }
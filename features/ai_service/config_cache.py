@@ -0,0 +1,184 @@
+"""LRU cache of evaluated AI Configs, invalidated by flag changes."""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+
+from ldclient import Context, LDClient
+from ldclient.interfaces import FlagChange
+from ldai import LDAIClient, log
+
+DEFAULT_MAX_ENTRIES = 1024
+
+CacheKey = Tuple[str, str, str, str]
+
+
+@dataclass
+class ConfigCacheStats:
+    """How often the cache was used and how much evaluation time it saved."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    """Entries dropped because the cache was full."""
+    invalidations: int = 0
+    """Entries dropped because a flag they depend on changed."""
+    evaluation_ms: float = 0.0
+    """Total time spent evaluating configs on misses."""
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @property
+    def mean_evaluation_ms(self) -> float:
+        return self.evaluation_ms / self.misses if self.misses else 0.0
+
+    @property
+    def saved_ms(self) -> float:
+        """Estimated evaluation time saved: hits times the mean miss latency."""
+        return self.hits * self.mean_evaluation_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hit_rate, 4),
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'mean_evaluation_ms': round(self.mean_evaluation_ms, 3),
+            'saved_ms': round(self.saved_ms, 1),
+        }
+
+
+def fingerprint(value: Any) -> str:
+    """Stable digest of JSON-like data, independent of dict ordering."""
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(encoded.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ConfigCache:
+    """
+    Caches evaluated completion, agent and judge configs per context and variables.
+
+    Evaluating an AI Config runs flag evaluation, builds the judge evaluator
+    and renders the prompt templates, and a service serving the same tenants
+    repeats that work for identical inputs. Entries are keyed on the config
+    key, a fingerprint of the context's attributes and a hash of the template
+    variables, and the least recently used entry is evicted when the cache is
+    full.
+
+    The cache listens for flag changes and drops every entry that depends on
+    the changed flag: the config itself and any judge configured on it. An
+    evaluation that was in progress when a flag changed is not cached, so a
+    rollout never leaves a stale prompt behind.
+
+    Cached configs are safe to share between requests: each run creates its
+    own tracker. A cache hit does not call the SDK, though, so it sends no
+    flag evaluation event; flag insights count one evaluation per cache miss.
+    """
+
+    def __init__(self, aiclient: LDAIClient, ld_client: LDClient, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the cache and start listening for flag changes.
+
+        :param aiclient: The AI client used to evaluate configs on a miss.
+        :param ld_client: The underlying LaunchDarkly client, used to listen
+            for flag changes.
+        :param max_entries: Maximum number of cached configs. 0 disables
+            caching, so every lookup evaluates.
+        """
+        self._aiclient = aiclient
+        self._ld_client = ld_client
+        self.max_entries = max_entries
+        self.stats = ConfigCacheStats()
+        self._entries: 'OrderedDict[CacheKey, Any]' = OrderedDict()
+        self._dependencies: Dict[CacheKey, FrozenSet[str]] = {}
+        self._generation = 0
+        # Flag changes arrive on an SDK thread.
+        self._lock = threading.Lock()
+        self._ld_client.flag_tracker.add_listener(self._on_flag_change)
+
+    def close(self) -> None:
+        """Stop listening for flag changes."""
+        self._ld_client.flag_tracker.remove_listener(self._on_flag_change)
+
+    def completion_config(self, key: str, context: Context, variables: Optional[Dict[str, Any]] = None):
+        """Cached equivalent of ``LDAIClient.completion_config``."""
+        return self._get('completion', key, context, variables, self._aiclient.completion_config)
+
+    def agent_config(self, key: str, context: Context, variables: Optional[Dict[str, Any]] = None):
+        """Cached equivalent of ``LDAIClient.agent_config``."""
+        return self._get('agent', key, context, variables, self._aiclient.agent_config)
+
+    def judge_config(self, key: str, context: Context, variables: Optional[Dict[str, Any]] = None):
+        """Cached equivalent of ``LDAIClient.judge_config``."""
+        return self._get('judge', key, context, variables, self._aiclient.judge_config)
+
+    def _get(
+        self,
+        kind: str,
+        key: str,
+        context: Context,
+        variables: Optional[Dict[str, Any]],
+        evaluate: Callable[..., Any],
+    ):
+        cache_key = (kind, key, fingerprint(context.to_dict()), fingerprint(variables or {}))
+        with self._lock:
+            config = self._entries.get(cache_key)
+            if config is not None:
+                self._entries.move_to_end(cache_key)
+                self.stats.hits += 1
+                return config
+            generation = self._generation
+
+        start = time.perf_counter()
+        config = evaluate(key, context, variables=variables)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self.stats.misses += 1
+            self.stats.evaluation_ms += elapsed_ms
+            # A flag changed while evaluating; the result may predate the change.
+            if self.max_entries <= 0 or generation != self._generation:
+                return config
+            self._entries[cache_key] = config
+            self._entries.move_to_end(cache_key)
+            self._dependencies[cache_key] = self._flag_keys(key, config)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                del self._dependencies[evicted]
+                self.stats.evictions += 1
+        return config
+
+    @staticmethod
+    def _flag_keys(key: str, config: Any) -> FrozenSet[str]:
+        """The flags an evaluated config depends on: its own and its judges'."""
+        judge_configuration = getattr(config, 'judge_configuration', None)
+        judges = judge_configuration.judges if judge_configuration else []
+        return frozenset([key, *(judge.key for judge in judges)])
+
+    def invalidate(self, flag_key: str) -> int:
+        """
+        Drop every entry that depends on ``flag_key``.
+
+        :return: The number of entries dropped.
+        """
+        with self._lock:
+            self._generation += 1
+            stale = [cache_key for cache_key, flags in self._dependencies.items() if flag_key in flags]
+            for cache_key in stale:
+                del self._entries[cache_key]
+                del self._dependencies[cache_key]
+            self.stats.invalidations += len(stale)
+        return len(stale)
+
+    def _on_flag_change(self, change: FlagChange) -> None:
+        dropped = self.invalidate(change.key)
+        if dropped:
+            log.debug(f'Dropped {dropped} cached configs after change to {change.key}')
@@ -0,0 +1,233 @@
+"""Bounded per-session conversation history with compact turn records."""
+
+import sys
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from ldai import LDMessage
+
+DEFAULT_MAX_TURNS = 32
+DEFAULT_HOT_TURNS = 4
+
+COMPRESS_MIN_CHARS = 256
+"""Shorter turns are left as text; zlib's framing makes small inputs barely smaller, or larger."""
+
+
+class Turn:
+    """
+    One message of a conversation.
+
+    A ``__slots__`` record rather than a dict: about 48 bytes plus the
+    content, instead of a dict's 184. Roles are interned, so every turn with
+    the same role shares one string. Content is kept as text, or as
+    zlib-compressed UTF-8 once :meth:`compress` has been called.
+    """
+
+    __slots__ = ('role', '_content')
+
+    def __init__(self, role: str, content: str):
+        self.role = sys.intern(role)
+        self._content: Any = content
+
+    @property
+    def content(self) -> str:
+        content = self._content
+        return zlib.decompress(content).decode('utf-8') if isinstance(content, bytes) else content
+
+    @property
+    def compressed(self) -> bool:
+        return isinstance(self._content, bytes)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the record and its content; the interned role is shared and not counted."""
+        return sys.getsizeof(self) + sys.getsizeof(self._content)
+
+    def compress(self) -> int:
+        """
+        Compress the content if it is long enough and gets smaller.
+
+        :return: Bytes saved, or 0 if the content was left as it was.
+        """
+        content = self._content
+        if isinstance(content, bytes) or len(content) < COMPRESS_MIN_CHARS:
+            return 0
+        packed = zlib.compress(content.encode('utf-8'))
+        saved = sys.getsizeof(content) - sys.getsizeof(packed)
+        if saved <= 0:
+            return 0
+        self._content = packed
+        return saved
+
+
+class Conversation:
+    """
+    Ring buffer of a session's most recent turns.
+
+    The buffer grows as turns are added, up to ``max_turns``; after that
+    each new turn overwrites the oldest. Turns more than ``hot_turns`` from
+    the newest are compressed as they age out of the hot window, so a
+    request reading the history only decompresses the older part of it.
+    """
+
+    __slots__ = ('_turns', '_next', 'max_turns', 'hot_turns', 'compress')
+
+    def __init__(self, max_turns: int, hot_turns: int, compress: bool):
+        self._turns: List[Turn] = []
+        self._next = 0
+        self.max_turns = max_turns
+        self.hot_turns = hot_turns
+        self.compress = compress
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def turns(self) -> List[Turn]:
+        """Turns from oldest to newest."""
+        return self._turns[self._next:] + self._turns[:self._next]
+
+    def append(self, turn: Turn) -> Tuple[Optional[Turn], int]:
+        """
+        Add ``turn`` as the newest.
+
+        :return: The turn it evicted, if the buffer was full, and the bytes
+            saved by compressing the turn that left the hot window.
+        """
+        evicted = None
+        if len(self._turns) < self.max_turns:
+            self._turns.append(turn)
+        else:
+            evicted = self._turns[self._next]
+            self._turns[self._next] = turn
+            self._next = (self._next + 1) % self.max_turns
+        saved = 0
+        if self.compress and len(self._turns) > self.hot_turns:
+            # The turn just pushed out of the hot window; older ones are already compressed.
+            saved = self._turns[(self._next - self.hot_turns - 1) % len(self._turns)].compress()
+        return evicted, saved
+
+
+@dataclass
+class ConversationStoreStats:
+    sessions: int = 0
+    turns: int = 0
+    compressed_turns: int = 0
+    nbytes: int = 0
+    """Approximate size of the stored turns: records and content."""
+    evicted_sessions: int = 0
+    evicted_turns: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'sessions': self.sessions,
+            'turns': self.turns,
+            'compressed_turns': self.compressed_turns,
+            'bytes': self.nbytes,
+            'bytes_per_session': round(self.nbytes / self.sessions) if self.sessions else 0,
+            'evicted_sessions': self.evicted_sessions,
+            'evicted_turns': self.evicted_turns,
+        }
+
+
+class ConversationStore:
+    """
+    In-memory chat history for many concurrent sessions.
+
+    Each session keeps at most ``max_turns`` turns in a
+    :class:`Conversation` ring buffer, so a long-lived session costs a
+    bounded amount of memory and sends a bounded history to the model.
+    Turns are :class:`Turn` records with interned roles and, with
+    ``compress``, turns older than the last ``hot_turns`` are
+    zlib-compressed. Sessions are kept in least-recently-used order and the
+    oldest is dropped beyond ``max_sessions``.
+
+    Not safe to share between threads; the service uses it from its event
+    loop only.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int,
+        max_turns: int = DEFAULT_MAX_TURNS,
+        hot_turns: int = DEFAULT_HOT_TURNS,
+        compress: bool = True,
+    ):
+        """
+        Initialize the store.
+
+        :param max_sessions: Sessions kept at once.
+        :param max_turns: Turns kept per session. Use an even number so that
+            evicting the oldest turns drops whole user/assistant exchanges.
+        :param hot_turns: Most recent turns per session kept uncompressed.
+        :param compress: Whether to compress older turns.
+        """
+        self.max_sessions = max_sessions
+        self.max_turns = max(max_turns, 1)
+        self.hot_turns = max(hot_turns, 0)
+        self.compress = compress
+        self.stats = ConversationStoreStats()
+        self._sessions: 'OrderedDict[Hashable, Conversation]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: Hashable) -> bool:
+        return session_id in self._sessions
+
+    def history(self, session_id: Hashable) -> List[LDMessage]:
+        """The session's turns as messages, oldest first; empty for an unknown session."""
+        conversation = self._sessions.get(session_id)
+        if conversation is None:
+            return []
+        self._sessions.move_to_end(session_id)
+        return [LDMessage(role=turn.role, content=turn.content) for turn in conversation.turns()]
+
+    def append(self, session_id: Hashable, role: str, content: str) -> int:
+        """
+        Add a turn to the session, creating it if needed.
+
+        :return: The number of turns the session now holds.
+        """
+        conversation = self._sessions.get(session_id)
+        if conversation is None:
+            conversation = self._sessions[session_id] = Conversation(self.max_turns, self.hot_turns, self.compress)
+            self.stats.sessions += 1
+            while len(self._sessions) > self.max_sessions:
+                _, dropped = self._sessions.popitem(last=False)
+                self._forget(dropped.turns())
+                self.stats.sessions -= 1
+                self.stats.evicted_sessions += 1
+        self._sessions.move_to_end(session_id)
+
+        turn = Turn(role, content)
+        self.stats.turns += 1
+        self.stats.nbytes += turn.nbytes
+        evicted, saved = conversation.append(turn)
+        if saved:
+            self.stats.compressed_turns += 1
+            self.stats.nbytes -= saved
+        if evicted is not None:
+            self._forget([evicted])
+            self.stats.evicted_turns += 1
+        return len(conversation)
+
+    def clear(self, session_id: Hashable) -> None:
+        conversation = self._sessions.pop(session_id, None)
+        if conversation is not None:
+            self._forget(conversation.turns())
+            self.stats.sessions -= 1
+
+    def _forget(self, turns: List[Turn]) -> None:
+        for turn in turns:
+            self.stats.turns -= 1
+            self.stats.compressed_turns -= turn.compressed
+            self.stats.nbytes -= turn.nbytes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **self.stats.to_dict(),
+            'max_sessions': self.max_sessions,
+            'max_turns': self.max_turns,
+        }
@@ -0,0 +1,131 @@
+"""Memory per session of the conversation store against plain message lists."""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+from ldai import LDMessage
+
+from conversation_store import DEFAULT_HOT_TURNS, DEFAULT_MAX_TURNS, ConversationStore
+
+
+def build_corpus() -> List[str]:
+    """Words of real English prose, so compression ratios resemble chat text: the standard library's docstrings."""
+    import argparse as argparse_module
+    import asyncio
+    import collections
+    import dataclasses
+    import json
+    import logging
+    import unittest
+
+    modules = (argparse_module, asyncio, collections, dataclasses, json, logging, unittest)
+    text = ' '.join(
+        doc for module in modules for name in dir(module)
+        if (doc := getattr(getattr(module, name, None), '__doc__', None)) and isinstance(doc, str)
+    )
+    return text.split()
+
+
+class TurnSource:
+    """Deterministic user and assistant turns, each a fresh string cut from the corpus."""
+
+    def __init__(self, corpus: List[str], seed: int):
+        self._corpus = corpus
+        self._seed = seed
+
+    def turns(self, sessions: int, turns: int):
+        rng = random.Random(self._seed)
+        corpus = self._corpus
+        for session in range(sessions):
+            for index in range(turns):
+                words = rng.randint(10, 35) if index % 2 == 0 else rng.randint(80, 250)
+                start = rng.randrange(len(corpus) - words)
+                yield session, 'user' if index % 2 == 0 else 'assistant', ' '.join(corpus[start:start + words])
+
+
+def measure(build: Callable[[], object]) -> Tuple[int, float, object]:
+    """Bytes still allocated after ``build`` returns, and the time it took."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, elapsed, result
+
+
+def main():
+    """Synchronous entry point for Poetry script."""
+    parser = argparse.ArgumentParser(description='Compare memory per chat session across history representations.')
+    parser.add_argument('--sessions', type=int, default=10_000, help='Concurrent sessions (default: %(default)s)')
+    parser.add_argument('--turns', type=int, default=24, help='Turns added to each session (default: %(default)s)')
+    parser.add_argument('--max-turns', type=int, default=DEFAULT_MAX_TURNS,
+                        help='Store: turns kept per session (default: %(default)s)')
+    parser.add_argument('--hot-turns', type=int, default=DEFAULT_HOT_TURNS,
+                        help='Store: recent turns left uncompressed (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    source = TurnSource(build_corpus(), args.seed)
+
+    def dicts():
+        # As in the getting_started examples: messages.append({'role': ..., 'content': ...}).
+        histories = [[] for _ in range(args.sessions)]
+        for session, role, content in source.turns(args.sessions, args.turns):
+            histories[session].append({'role': role, 'content': content})
+        return histories
+
+    def ld_messages():
+        histories = [[] for _ in range(args.sessions)]
+        for session, role, content in source.turns(args.sessions, args.turns):
+            histories[session].append(LDMessage(role=role, content=content))
+        return histories
+
+    def store(compress: bool):
+        def build():
+            conversations = ConversationStore(args.sessions, args.max_turns, args.hot_turns, compress=compress)
+            for session, role, content in source.turns(args.sessions, args.turns):
+                conversations.append(f'session-{session}', role, content)
+            return conversations
+        return build
+
+    representations = [
+        ('list of dicts', dicts),
+        ('list of LDMessage', ld_messages),
+        ('store', store(False)),
+        ('store + zlib', store(True)),
+    ]
+
+    kept = min(args.turns, args.max_turns)
+    print(f"\n{args.sessions} sessions, {args.turns} turns each; the store keeps the last {kept}"
+          f" and compresses all but the last {args.hot_turns}.")
+    print(f"\n{'representation':<18} {'MB':>8} {'bytes/session':>14} {'vs dicts':>9} {'build s':>8} {'read µs':>8}")
+    baseline = None
+    for name, build in representations:
+        nbytes, elapsed, result = measure(build)
+        baseline = baseline or nbytes
+        # Time to read one session's history as messages, as a request would.
+        if isinstance(result, ConversationStore):
+            ids = [f'session-{session}' for session in range(0, args.sessions, max(args.sessions // 1000, 1))]
+            start = time.perf_counter()
+            for session_id in ids:
+                result.history(session_id)
+        else:
+            ids = list(range(0, args.sessions, max(args.sessions // 1000, 1)))
+            start = time.perf_counter()
+            for session in ids:
+                list(result[session])
+        read_us = (time.perf_counter() - start) / len(ids) * 1e6
+        print(f"{name:<18} {nbytes / 1e6:>8.1f} {nbytes / args.sessions:>14,.0f} {nbytes / baseline:>8.2f}x "
+              f"{elapsed:>8.2f} {read_us:>8.1f}")
+        del result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""Hedged model requests: race a backup provider or model when the primary is slow."""
+
+import asyncio
+import dataclasses
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ldclient import Context, LDClient
+from ldai import log
+from ldai.models import AICompletionConfig, ModelConfig, ProviderConfig
+from ldai.providers import Runner
+from ldai.providers.types import JudgeResult, ManagedResult, RunnerResult
+from ldai.tracker import LDAIConfigTracker
+from ld_bootstrap import resumption_data
+
+from rate_limits import Admission, track_queue_wait
+from summary_metrics import RollingSeries
+
+HEDGE_CUSTOM_KEY = 'hedge'
+"""Key under the AI Config's custom model data that defines the backup."""
+
+HEDGE_EVENT_KEY = 'ai-hedge'
+"""Custom event tracked for every hedged request."""
+
+
+@dataclass
+class HedgeTarget:
+    """The backup model for a config, read from its custom model data."""
+
+    model: str
+    provider: str
+    percentile: float = 95.0
+    """Percentile of the primary's recent latency to wait before hedging."""
+
+    @classmethod
+    def from_config(cls, config: AICompletionConfig) -> Optional['HedgeTarget']:
+        """
+        Read the backup from ``model.custom.hedge`` of an AI Config variation.
+
+        The value looks like ``{"model": "gpt-4o-mini", "provider": "openai",
+        "percentile": 95}``. ``provider`` defaults to the primary's provider
+        and ``percentile`` to 95.
+
+        :return: The target, or ``None`` if the config does not define one.
+        """
+        data = config.model.get_custom(HEDGE_CUSTOM_KEY) if config.model else None
+        if not isinstance(data, dict) or not isinstance(data.get('model'), str):
+            return None
+        provider = data.get('provider') or (config.provider.name if config.provider else '')
+        return cls(model=data['model'], provider=provider, percentile=float(data.get('percentile', 95)))
+
+
+@dataclass
+class HedgeStats:
+    """How often requests were hedged and which attempt won."""
+
+    requests: int = 0
+    hedged: int = 0
+    """Requests that sent a backup attempt."""
+    backup_wins: int = 0
+    primary_wins_after_hedge: int = 0
+    """Hedged requests the primary still won; the backup attempt was wasted cost."""
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.requests if self.requests else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'hedged': self.hedged,
+            'hedge_rate': round(self.hedge_rate, 4),
+            'backup_wins': self.backup_wins,
+            'primary_wins_after_hedge': self.primary_wins_after_hedge,
+        }
+
+
+class HedgePolicy:
+    """
+    Decides how long to wait for the primary attempt before sending the backup.
+
+    The delay is a percentile, 95 by default, of the latency recently
+    observed for the config and primary model, so only the slowest few
+    percent of requests are hedged and the extra cost stays around that
+    share. Until there are ``min_samples`` observations in the window the
+    fixed ``default_delay_ms`` is used.
+
+    The latencies come from :meth:`record_primary`, which sees every
+    primary attempt, including those cancelled because the backup won.
+    Tracker summaries only cover the winner; a percentile of those would
+    leave out the slow primaries, fall a little with each window, and end
+    up hedging nearly every request.
+    """
+
+    def __init__(
+        self,
+        window_s: float = 300.0,
+        default_delay_ms: float = 2000,
+        min_delay_ms: float = 50,
+        max_delay_ms: float = 30000,
+        min_samples: int = 20,
+        slots: int = 10,
+    ):
+        self.window_s = window_s
+        self.default_delay_ms = default_delay_ms
+        self.min_delay_ms = min_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.min_samples = min_samples
+        self._slots = slots
+        self._latency: Dict[Tuple[str, str], RollingSeries] = {}
+        self.stats = HedgeStats()
+
+    def record_primary(self, config_key: str, model: str, elapsed_ms: float) -> None:
+        """
+        Add the latency of a primary attempt.
+
+        For an attempt cancelled before it finished, ``elapsed_ms`` is how
+        long it had run, a lower bound on its latency that still sits above
+        the hedge delay.
+        """
+        series = self._latency.get((config_key, model))
+        if series is None:
+            series = self._latency[(config_key, model)] = RollingSeries(self.window_s, self._slots)
+        series.record(time.monotonic(), None, {'duration_ms': elapsed_ms})
+
+    def delay_ms(self, config_key: str, model: str, percentile: float) -> float:
+        series = self._latency.get((config_key, model))
+        histogram = series.snapshot(time.monotonic())[2].get('duration_ms') if series else None
+        if histogram is None or histogram.total < self.min_samples:
+            return self.default_delay_ms
+        return min(max(histogram.percentile(percentile), self.min_delay_ms), self.max_delay_ms)
+
+
+def backup_config(
+    config: AICompletionConfig,
+    target: HedgeTarget,
+    ld_client: LDClient,
+    context: Context,
+) -> AICompletionConfig:
+    """
+    A copy of ``config`` that runs on the backup model and provider.
+
+    The copy keeps the messages, parameters and judges of the original. Its
+    trackers report the same config key, variation and version but the
+    backup's model and provider, so the backup's latency, tokens and cost
+    are attributed to the right model.
+    """
+    parameters = config.model.to_dict().get('parameters') if config.model else None
+
+    def create_tracker() -> LDAIConfigTracker:
+        data = resumption_data(config.create_tracker().resumption_token)
+        return LDAIConfigTracker(
+            ld_client=ld_client,
+            run_id=str(uuid.uuid4()),
+            config_key=config.key,
+            variation_key=data.get('variationKey', ''),
+            version=int(data.get('version', 1)),
+            context=context,
+            model_name=target.model,
+            provider_name=target.provider,
+        )
+
+    return dataclasses.replace(
+        config,
+        model=ModelConfig(target.model, parameters=parameters),
+        provider=ProviderConfig(target.provider),
+        create_tracker=create_tracker,
+    )
+
+
+Admit = Callable[[AICompletionConfig], Awaitable[Admission]]
+"""Waits for rate-limit capacity for a config's provider and model."""
+
+
+class _Attempt:
+    """One tracked run of a config's runner."""
+
+    def __init__(self, name: str, config: AICompletionConfig, runner: Runner):
+        self.name = name
+        self.config = config
+        self.runner = runner
+        self.tracker: Optional[LDAIConfigTracker] = None
+        self.task: Optional[asyncio.Task] = None
+        self.elapsed_ms: Optional[int] = None
+        """How long the runner ran, whether it finished or was cancelled; ``None`` if it never started."""
+
+    def start(self, prompt: str, admit: Optional[Admit], ld_client: LDClient, context: Context) -> asyncio.Task:
+        self.task = asyncio.create_task(self._run(prompt, admit, ld_client, context))
+        return self.task
+
+    async def _run(self, prompt: str, admit: Optional[Admit], ld_client: LDClient, context: Context) -> RunnerResult:
+        admission = await admit(self.config) if admit else None
+        self.tracker = self.config.create_tracker()
+        start_ns = time.perf_counter_ns()
+        try:
+            return await self.tracker.track_metrics_of_async(
+                lambda r: r.metrics,
+                lambda: self.runner.run(prompt),
+            )
+        except asyncio.CancelledError:
+            # The losing attempt may still be billed; record how long it ran.
+            self.tracker.track_duration((time.perf_counter_ns() - start_ns) // 1_000_000)
+            raise
+        finally:
+            self.elapsed_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+            if admission is not None:
+                summary = self.tracker.get_summary()
+                if getattr(self.runner, 'shared', False):
+                    # Joined an identical call that was already in flight, so nothing was sent upstream.
+                    admission.refund()
+                else:
+                    admission.settle(summary)
+                track_queue_wait(ld_client, context, summary, admission)
+
+    @property
+    def succeeded(self) -> bool:
+        return (
+            self.task is not None and self.task.done() and not self.task.cancelled()
+            and self.task.exception() is None and bool(self.task.result().metrics.success)
+        )
+
+
+class HedgedModel:
+    """
+    Runs a completion on the primary model and hedges slow requests.
+
+    If the primary attempt has not finished after the policy's delay, or
+    fails before then, the same messages are sent to the backup model. The
+    first attempt to succeed wins and the other is cancelled. If both fail,
+    the primary's outcome is returned.
+
+    Each attempt gets its own tracker, so LaunchDarkly sees the duration,
+    tokens and outcome of every call that was sent, including the cancelled
+    one (which is tracked with its duration only). Hedged requests also send
+    an ``ai-hedge`` custom event naming the winner, so the cost of hedging is
+    visible next to the latency it saves.
+
+    The runners used here do not stream, so the first token arrives with the
+    full response and the delay applies to the whole call.
+
+    Pass ``admit`` to wait for rate-limit capacity before each attempt; the
+    wait is not counted in the attempt's tracked duration.
+    """
+
+    def __init__(
+        self,
+        primary: Tuple[AICompletionConfig, Runner],
+        backup: Tuple[AICompletionConfig, Runner],
+        policy: HedgePolicy,
+        target: HedgeTarget,
+        ld_client: LDClient,
+        context: Context,
+        admit: Optional[Admit] = None,
+    ):
+        self._primary = _Attempt('primary', *primary)
+        self._backup = _Attempt('backup', *backup)
+        self._policy = policy
+        self._target = target
+        self._ld_client = ld_client
+        self._context = context
+        self._admit = admit
+
+    async def run(self, prompt: str) -> Tuple[ManagedResult, AICompletionConfig]:
+        """
+        Run the prompt, hedging if the primary is slow.
+
+        :return: The winning attempt's result, and the config (primary or
+            backup) that produced it.
+        """
+        config = self._primary.config
+        stats = self._policy.stats
+        stats.requests += 1
+        delay_ms = self._policy.delay_ms(
+            config.key, config.model.name if config.model else '', self._target.percentile,
+        )
+
+        attempts: List[_Attempt] = [self._primary]
+        try:
+            self._primary.start(prompt, self._admit, self._ld_client, self._context)
+            await asyncio.wait({self._primary.task}, timeout=delay_ms / 1000)
+            winner = self._primary if self._primary.succeeded else None
+            if winner is None:
+                stats.hedged += 1
+                attempts.append(self._backup)
+                self._backup.start(prompt, self._admit, self._ld_client, self._context)
+                winner = await self._first_success(attempts)
+                if winner is self._backup:
+                    stats.backup_wins += 1
+                elif winner is self._primary:
+                    stats.primary_wins_after_hedge += 1
+                self._track_hedge(delay_ms, winner)
+        finally:
+            for attempt in attempts:
+                if attempt is not winner and not attempt.task.done():
+                    attempt.task.cancel()
+            await asyncio.gather(*(attempt.task for attempt in attempts), return_exceptions=True)
+            if self._primary.elapsed_ms is not None:
+                self._policy.record_primary(
+                    config.key, config.model.name if config.model else '', self._primary.elapsed_ms,
+                )
+
+        # With no success, surface the primary's error or failed result.
+        outcome = winner or self._primary
+        result: RunnerResult = outcome.task.result()
+        evaluations = self._dispatch_evaluations(outcome, prompt, result.content)
+        return ManagedResult(
+            content=result.content,
+            metrics=outcome.tracker.get_summary(),
+            raw=result.raw,
+            parsed=result.parsed,
+            evaluations=evaluations,
+        ), outcome.config
+
+    @staticmethod
+    async def _first_success(attempts: List[_Attempt]) -> Optional[_Attempt]:
+        pending = {attempt.task for attempt in attempts if not attempt.task.done()}
+        for attempt in attempts:
+            if attempt.succeeded:
+                return attempt
+        while pending:
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in attempts:
+                if attempt.succeeded:
+                    return attempt
+        return None
+
+    def _track_hedge(self, delay_ms: float, winner: Optional[_Attempt]) -> None:
+        data = resumption_data(self._primary.tracker.resumption_token if self._primary.tracker else None)
+        self._ld_client.track(HEDGE_EVENT_KEY, self._context, {
+            'configKey': self._primary.config.key,
+            'variationKey': data.get('variationKey', ''),
+            'primaryModel': self._primary.config.model.name if self._primary.config.model else '',
+            'backupModel': self._target.model,
+            'backupProvider': self._target.provider,
+            'hedgeDelayMs': round(delay_ms),
+            'winner': winner.name if winner else 'none',
+        }, 1)
+
+    @staticmethod
+    def _dispatch_evaluations(attempt: _Attempt, prompt: str, output: str) -> asyncio.Task:
+        """Run the config's judges on the winning output, as ``ManagedModel.run`` does."""
+        evaluator_task = attempt.config.evaluator.evaluate(prompt, output)
+        tracker = attempt.tracker
+
+        async def run_and_track() -> List[JudgeResult]:
+            results = await evaluator_task
+            for result in results:
+                if not result.sampled:
+                    continue
+                if result.success:
+                    try:
+                        tracker.track_judge_result(result)
+                    except Exception as exc:
+                        log.warning("Judge evaluation failed: %s", exc)
+                else:
+                    log.warning("Judge evaluation failed: %s", result.error_message)
+            return results
+
+        return asyncio.create_task(run_and_track())
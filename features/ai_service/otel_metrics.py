@@ -0,0 +1,120 @@
+"""Publish tracker summaries as OpenTelemetry metrics, with an optional Prometheus reader."""
+
+from typing import Dict, Optional
+
+from opentelemetry import metrics
+from opentelemetry.metrics import MeterProvider
+
+from summary_metrics import summary_labels
+
+METER_NAME = 'hello-python-ai-service'
+
+# Bucket boundaries follow the OpenTelemetry GenAI semantic conventions.
+DURATION_BUCKETS_S = [0.01, 0.02, 0.04, 0.08, 0.16, 0.32, 0.64, 1.28, 2.56, 5.12, 10.24, 20.48, 40.96, 81.92]
+TTFT_BUCKETS_S = [0.001, 0.005, 0.01, 0.02, 0.04, 0.06, 0.08, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0]
+TOKEN_BUCKETS = [1, 4, 16, 64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864]
+
+
+class TrackerMetricsExporter:
+    """
+    Records tracker summaries on OpenTelemetry histograms and counters.
+
+    Each summary becomes one measurement on each instrument it has data for:
+
+    - ``gen_ai.client.operation.duration`` (histogram, seconds)
+    - ``gen_ai.server.time_to_first_token`` (histogram, seconds, streaming runs only)
+    - ``gen_ai.client.token.usage`` (histogram, tokens, with ``gen_ai.token.type`` of ``input`` or ``output``)
+    - ``ld.ai_config.requests`` (counter, with ``ld.ai_config.outcome`` of ``success`` or ``error``)
+    - ``ld.ai_config.tool_calls`` (counter, with ``gen_ai.tool.name``)
+
+    Every measurement carries the config key, variation key, provider and
+    model as attributes. Names follow the OpenTelemetry GenAI semantic
+    conventions where one exists.
+
+    By default the instruments come from the global meter provider, which
+    ``ObservabilityPlugin`` configures to export to LaunchDarkly. Pass a
+    ``meter_provider`` to send them elsewhere, such as a provider with a
+    Prometheus reader (see :func:`prometheus_meter_provider`) or, in tests,
+    one with an ``InMemoryMetricReader``.
+    """
+
+    def __init__(self, meter_provider: Optional[MeterProvider] = None):
+        provider = meter_provider or metrics.get_meter_provider()
+        meter = provider.get_meter(METER_NAME)
+        self._duration = meter.create_histogram(
+            'gen_ai.client.operation.duration', unit='s',
+            description='Duration of AI Config model and agent runs',
+            explicit_bucket_boundaries_advisory=DURATION_BUCKETS_S,
+        )
+        self._time_to_first_token = meter.create_histogram(
+            'gen_ai.server.time_to_first_token', unit='s',
+            description='Time to the first streamed token',
+            explicit_bucket_boundaries_advisory=TTFT_BUCKETS_S,
+        )
+        self._tokens = meter.create_histogram(
+            'gen_ai.client.token.usage', unit='{token}',
+            description='Input and output tokens per run',
+            explicit_bucket_boundaries_advisory=TOKEN_BUCKETS,
+        )
+        self._requests = meter.create_counter(
+            'ld.ai_config.requests', unit='{request}',
+            description='AI Config runs by outcome',
+        )
+        self._tool_calls = meter.create_counter(
+            'ld.ai_config.tool_calls', unit='{call}',
+            description='Tool calls made during AI Config runs',
+        )
+
+    def record(self, summary, model: str = '', provider: str = '', config_key: Optional[str] = None) -> None:
+        """
+        Record a tracker summary.
+
+        :param summary: An ``LDAIMetricSummary`` from ``tracker.get_summary()``
+            or a managed result's ``metrics``.
+        :param model: The model name, from the config that produced the summary.
+        :param provider: The provider name, from the same config.
+        :param config_key: Overrides the config key read from the summary.
+        """
+        token_key, variation_key = summary_labels(summary)
+        attributes: Dict[str, str] = {
+            'ld.ai_config.key': config_key or token_key,
+            'ld.ai_config.variation_key': variation_key,
+            'gen_ai.provider.name': provider,
+            'gen_ai.request.model': model,
+        }
+
+        if summary.duration_ms is not None:
+            self._duration.record(summary.duration_ms / 1000, attributes)
+        if summary.time_to_first_token is not None:
+            self._time_to_first_token.record(summary.time_to_first_token / 1000, attributes)
+        if summary.tokens:
+            self._tokens.record(summary.tokens.input, {**attributes, 'gen_ai.token.type': 'input'})
+            self._tokens.record(summary.tokens.output, {**attributes, 'gen_ai.token.type': 'output'})
+        if summary.success is not None:
+            outcome = 'success' if summary.success else 'error'
+            self._requests.add(1, {**attributes, 'ld.ai_config.outcome': outcome})
+        for tool_name in summary.tool_calls or []:
+            self._tool_calls.add(1, {**attributes, 'gen_ai.tool.name': tool_name})
+
+    def record_config(self, config, summary) -> None:
+        """Record a summary produced by ``config``, labelling it with the config's provider and model."""
+        self.record(
+            summary,
+            model=config.model.name if getattr(config, 'model', None) else '',
+            provider=config.provider.name if getattr(config, 'provider', None) else '',
+            config_key=getattr(config, 'key', None),
+        )
+
+
+def prometheus_meter_provider() -> MeterProvider:
+    """
+    Create a meter provider whose metrics can be scraped in Prometheus format.
+
+    The reader registers with ``prometheus_client``'s default registry; serve
+    it with ``prometheus_client.generate_latest()``. Needs the
+    ``opentelemetry-exporter-prometheus`` package.
+    """
+    from opentelemetry.exporter.prometheus import PrometheusMetricReader
+    from opentelemetry.sdk.metrics import MeterProvider as SdkMeterProvider
+
+    return SdkMeterProvider(metric_readers=[PrometheusMetricReader()])
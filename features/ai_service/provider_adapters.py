@@ -0,0 +1,621 @@
+"""One async interface over the OpenAI, Gemini, Bedrock and LangChain clients."""
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from ldai import LDMessage, log
+from ldai.models import AIConfigKind
+from ldai.providers import Runner
+from ldai.providers.types import LDAIMetrics, RunnerResult
+from ldai.tracker import TokenUsage
+
+DEFAULT_MAX_CONNECTIONS = 100
+"""Connections each adapter keeps open to its provider."""
+
+DEFAULT_KEEPALIVE_S = 60.0
+"""How long an idle pooled connection is kept before it is closed."""
+
+DEFAULT_BATCH_CONCURRENCY = 8
+
+STRUCTURED_OUTPUT = 'structured_output'
+"""Schema name, or tool name where a provider forces a tool call, for structured output."""
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """The provider, model and parameters of an AI config, which is all an adapter needs."""
+
+    provider: str
+    name: str
+    parameters: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, config: AIConfigKind) -> 'ModelSpec':
+        config_dict = config.to_dict()
+        parameters = dict((config_dict.get('model') or {}).get('parameters') or {})
+        # Tool definitions belong to agents; completion and judge runs send none.
+        parameters.pop('tools', None)
+        return cls(
+            provider=config.provider.name if config.provider else '',
+            name=config.model.name if config.model else '',
+            parameters=parameters,
+        )
+
+
+@dataclass
+class StreamChunk:
+    """Text from a streaming call. The last chunk has no text and carries the call's metrics."""
+
+    text: str
+    metrics: Optional[LDAIMetrics] = None
+
+
+def _elapsed_ms(start: float) -> int:
+    return int((time.perf_counter() - start) * 1000)
+
+
+def _failed(tokens: Optional[TokenUsage] = None, raw: Any = None, content: str = '') -> RunnerResult:
+    return RunnerResult(content=content, metrics=LDAIMetrics(success=False, tokens=tokens), raw=raw)
+
+
+def _parse_structured(result: RunnerResult, provider: str) -> RunnerResult:
+    """Fill in ``parsed`` from JSON content, or mark the result failed if it is not valid JSON."""
+    if not result.metrics.success or result.parsed is not None:
+        return result
+    try:
+        result.parsed = json.loads(result.content)
+    except json.JSONDecodeError as error:
+        log.warning(f'{provider} structured response contains invalid JSON: {error}')
+        result.metrics = LDAIMetrics(success=False, tokens=result.metrics.tokens)
+    return result
+
+
+class ProviderAdapter:
+    """
+    Async model calls against one provider, all returning ``LDAIMetrics``.
+
+    Each adapter owns one provider client with a pool of keep-alive
+    connections, created on first use and closed by :meth:`aclose`, and
+    converts LaunchDarkly messages, model parameters and structured output
+    requests to the provider's API. Whatever the provider, :meth:`complete`
+    returns a ``RunnerResult`` whose metrics have success, token usage and
+    the call's wall-clock duration, so caching, coalescing, hedging, rate
+    limits and batch jobs built on the ``Runner`` protocol work the same for
+    every provider.
+
+    Like the SDK's runners, a provider error is logged and returned as an
+    unsuccessful result rather than raised.
+    """
+
+    provider = ''
+    requires: Tuple[str, ...] = ()
+    """Packages the adapter imports; it is only used when they are installed."""
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        self.max_connections = max(max_connections, 1)
+
+    async def complete(
+        self,
+        model: ModelSpec,
+        messages: Sequence[LDMessage],
+        output_type: Optional[Dict[str, Any]] = None,
+    ) -> RunnerResult:
+        """
+        Run one model call.
+
+        :param model: Model name and parameters.
+        :param messages: The full conversation, system messages included.
+        :param output_type: Optional JSON schema; when set, ``parsed`` holds
+            the parsed document.
+        """
+        start = time.perf_counter()
+        try:
+            result = await self._complete(model, list(messages), output_type)
+        except Exception as error:
+            log.warning(f'{self.provider} model invocation failed: {error}')
+            result = _failed()
+        if output_type is not None:
+            result = _parse_structured(result, self.provider)
+        if result.metrics.success and not result.content:
+            log.warning(f'{self.provider} response has no content available')
+            result.metrics = LDAIMetrics(success=False, tokens=result.metrics.tokens)
+        result.metrics.duration_ms = _elapsed_ms(start)
+        return result
+
+    async def stream(self, model: ModelSpec, messages: Sequence[LDMessage]) -> AsyncIterator[StreamChunk]:
+        """
+        Run one model call, yielding text as the provider sends it.
+
+        The last chunk has empty text and the call's metrics, including
+        token usage where the provider reports it in the stream.
+        """
+        start = time.perf_counter()
+        tokens: List[Optional[TokenUsage]] = [None]
+        success = True
+        try:
+            async for text in self._stream(model, list(messages), tokens):
+                if text:
+                    yield StreamChunk(text)
+        except Exception as error:
+            log.warning(f'{self.provider} streaming invocation failed: {error}')
+            success = False
+        yield StreamChunk('', LDAIMetrics(success=success, tokens=tokens[0], duration_ms=_elapsed_ms(start)))
+
+    async def batch(
+        self,
+        model: ModelSpec,
+        conversations: Sequence[Sequence[LDMessage]],
+        output_type: Optional[Dict[str, Any]] = None,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    ) -> List[RunnerResult]:
+        """
+        Run :meth:`complete` on each conversation, ``concurrency`` at a time
+        over the adapter's connection pool, and return results in input order.
+        """
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def one(messages):
+            async with semaphore:
+                return await self.complete(model, messages, output_type)
+
+        return list(await asyncio.gather(*(one(messages) for messages in conversations)))
+
+    async def aclose(self) -> None:
+        """Close the provider client and its connection pool."""
+
+    async def _complete(
+        self, model: ModelSpec, messages: List[LDMessage], output_type: Optional[Dict[str, Any]],
+    ) -> RunnerResult:
+        raise NotImplementedError
+
+    def _stream(
+        self, model: ModelSpec, messages: List[LDMessage], tokens: List[Optional[TokenUsage]],
+    ) -> AsyncIterator[str]:
+        """Yield text; set ``tokens[0]`` once the provider reports usage."""
+        raise NotImplementedError
+
+
+class OpenAIAdapter(ProviderAdapter):
+    """
+    Chat completions on one ``AsyncOpenAI`` client.
+
+    The client's httpx pool keeps up to ``max_connections`` connections
+    alive. Model parameters are passed through as they are; structured
+    output uses a strict JSON schema ``response_format``, as the SDK's
+    OpenAI runner does. Streams ask for usage in their final chunk.
+    """
+
+    provider = 'openai'
+    requires = ('openai', 'ldai_openai')
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS, client: Any = None):
+        super().__init__(max_connections)
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+            self._client = AsyncOpenAI(
+                api_key=os.environ.get('OPENAI_API_KEY'),
+                http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=DEFAULT_KEEPALIVE_S,
+                )),
+            )
+        return self._client
+
+    async def _complete(self, model, messages, output_type):
+        from ldai_openai import convert_messages_to_openai, get_ai_metrics_from_response
+
+        parameters = dict(model.parameters)
+        if output_type is not None:
+            parameters['response_format'] = {
+                'type': 'json_schema',
+                'json_schema': {'name': STRUCTURED_OUTPUT, 'schema': output_type, 'strict': True},
+            }
+        response = await self.client.chat.completions.create(
+            model=model.name, messages=convert_messages_to_openai(messages), **parameters,
+        )
+        content = response.choices[0].message.content if response.choices else None
+        return RunnerResult(content=content or '', metrics=get_ai_metrics_from_response(response), raw=response)
+
+    async def _stream(self, model, messages, tokens):
+        from ldai_openai import convert_messages_to_openai, get_ai_usage_from_response
+
+        response = await self.client.chat.completions.create(
+            model=model.name,
+            messages=convert_messages_to_openai(messages),
+            stream=True,
+            stream_options={'include_usage': True},
+            **model.parameters,
+        )
+        async for chunk in response:
+            if chunk.usage:
+                tokens[0] = get_ai_usage_from_response(chunk)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+GEMINI_PARAMETERS = {
+    'max_tokens': 'max_output_tokens',
+    'maxTokens': 'max_output_tokens',
+    'maxOutputTokens': 'max_output_tokens',
+    'topP': 'top_p',
+    'topK': 'top_k',
+    'stop': 'stop_sequences',
+    'stopSequences': 'stop_sequences',
+}
+"""AI config parameter names that differ from ``GenerateContentConfig`` fields."""
+
+
+def map_to_google_ai_messages(messages: List[LDMessage]) -> Tuple[Optional[str], List[Any]]:
+    """Gemini contents and system instruction for LaunchDarkly messages; system messages are joined with spaces."""
+    from google.genai import types
+
+    system = [message.content for message in messages if message.role == 'system']
+    contents = [
+        types.Content(role='model' if message.role == 'assistant' else 'user', parts=[types.Part(text=message.content)])
+        for message in messages if message.role in ('user', 'assistant')
+    ]
+    return (' '.join(system) if system else None), contents
+
+
+def _gemini_usage(response: Any) -> Optional[TokenUsage]:
+    usage = getattr(response, 'usage_metadata', None)
+    if not usage:
+        return None
+    return TokenUsage(
+        total=usage.total_token_count or 0,
+        input=usage.prompt_token_count or 0,
+        output=usage.candidates_token_count or 0,
+    )
+
+
+class GeminiAdapter(ProviderAdapter):
+    """
+    ``generate_content`` on one ``google.genai`` client's async API.
+
+    The client's httpx pool keeps up to ``max_connections`` connections
+    alive. Parameters are mapped to ``GenerateContentConfig`` fields
+    (``max_tokens`` becomes ``max_output_tokens``, and so on), and
+    structured output asks for JSON that follows the schema. Requires
+    ``GOOGLE_API_KEY``.
+    """
+
+    provider = 'gemini'
+    requires = ('google.genai',)
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS, client: Any = None):
+        super().__init__(max_connections)
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+            from google import genai
+            from google.genai import types
+
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=DEFAULT_KEEPALIVE_S,
+            )
+            self._client = genai.Client(
+                api_key=os.environ.get('GOOGLE_API_KEY'),
+                http_options=types.HttpOptions(async_client_args={'limits': limits}),
+            )
+        return self._client
+
+    def _request(self, model: ModelSpec, messages: List[LDMessage], output_type: Optional[Dict[str, Any]]):
+        from google.genai import types
+
+        system_instruction, contents = map_to_google_ai_messages(messages)
+        settings: Dict[str, Any] = {'system_instruction': system_instruction}
+        for name, value in model.parameters.items():
+            name = GEMINI_PARAMETERS.get(name, name)
+            if name not in types.GenerateContentConfig.model_fields:
+                log.debug(f'Ignoring parameter {name!r}, which Gemini does not support')
+                continue
+            settings[name] = [value] if name == 'stop_sequences' and isinstance(value, str) else value
+        if output_type is not None:
+            settings['response_mime_type'] = 'application/json'
+            settings['response_json_schema'] = output_type
+        return {'model': model.name, 'contents': contents, 'config': types.GenerateContentConfig(**settings)}
+
+    async def _complete(self, model, messages, output_type):
+        response = await self.client.aio.models.generate_content(**self._request(model, messages, output_type))
+        return RunnerResult(
+            content=response.text or '',
+            metrics=LDAIMetrics(success=True, tokens=_gemini_usage(response)),
+            raw=response,
+        )
+
+    async def _stream(self, model, messages, tokens):
+        response = await self.client.aio.models.generate_content_stream(**self._request(model, messages, None))
+        async for chunk in response:
+            # Each chunk reports the usage so far; the last one has the totals.
+            tokens[0] = _gemini_usage(chunk) or tokens[0]
+            if chunk.text:
+                yield chunk.text
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aio.aclose()
+            self._client.close()
+            self._client = None
+
+
+BEDROCK_PARAMETERS = {
+    'max_tokens': 'maxTokens',
+    'maxTokens': 'maxTokens',
+    'temperature': 'temperature',
+    'top_p': 'topP',
+    'topP': 'topP',
+    'stop': 'stopSequences',
+    'stop_sequences': 'stopSequences',
+    'stopSequences': 'stopSequences',
+}
+"""AI config parameters that go in ``inferenceConfig``; the rest are model-specific request fields."""
+
+
+def _bedrock_usage(usage: Optional[Dict[str, Any]]) -> Optional[TokenUsage]:
+    if not usage:
+        return None
+    return TokenUsage(
+        total=usage.get('totalTokens', 0),
+        input=usage.get('inputTokens', 0),
+        output=usage.get('outputTokens', 0),
+    )
+
+
+def _bedrock_metrics(response: Dict[str, Any]) -> LDAIMetrics:
+    status_code = response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+    return LDAIMetrics(success=status_code == 200, tokens=_bedrock_usage(response.get('usage')))
+
+
+class BedrockAdapter(ProviderAdapter):
+    """
+    The Converse API on one ``bedrock-runtime`` client.
+
+    boto3 is synchronous, so calls run on the adapter's own thread pool,
+    sized to match the client's ``max_pool_connections``; a burst of
+    requests neither waits on the event loop's default executor nor opens
+    more connections than the pool keeps alive. Structured output forces a
+    call to a ``structured_output`` tool whose input schema is the output
+    schema. The region comes from ``AWS_DEFAULT_REGION``.
+    """
+
+    provider = 'bedrock'
+    requires = ('boto3',)
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS, client: Any = None):
+        super().__init__(max_connections)
+        self._client = client
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            from botocore.config import Config
+
+            self._client = boto3.client(
+                'bedrock-runtime',
+                region_name=os.getenv('AWS_DEFAULT_REGION', 'us-east-1'),
+                config=Config(max_pool_connections=self.max_connections, tcp_keepalive=True),
+            )
+        return self._client
+
+    async def _call(self, function, *args, **kwargs):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_connections, thread_name_prefix='bedrock')
+        return await asyncio.get_running_loop().run_in_executor(self._executor, lambda: function(*args, **kwargs))
+
+    @staticmethod
+    def _request(model: ModelSpec, messages: List[LDMessage], output_type: Optional[Dict[str, Any]]):
+        inference: Dict[str, Any] = {}
+        additional: Dict[str, Any] = {}
+        for name, value in model.parameters.items():
+            if name in BEDROCK_PARAMETERS:
+                name = BEDROCK_PARAMETERS[name]
+                inference[name] = [value] if name == 'stopSequences' and isinstance(value, str) else value
+            else:
+                additional[name] = value
+        request: Dict[str, Any] = {
+            'modelId': model.name,
+            'messages': [
+                {'role': message.role, 'content': [{'text': message.content}]}
+                for message in messages if message.role != 'system'
+            ],
+            'system': [{'text': message.content} for message in messages if message.role == 'system'],
+        }
+        if inference:
+            request['inferenceConfig'] = inference
+        if additional:
+            request['additionalModelRequestFields'] = additional
+        if output_type is not None:
+            request['toolConfig'] = {
+                'tools': [{'toolSpec': {'name': STRUCTURED_OUTPUT, 'inputSchema': {'json': output_type}}}],
+                'toolChoice': {'tool': {'name': STRUCTURED_OUTPUT}},
+            }
+        return request
+
+    async def _complete(self, model, messages, output_type):
+        response = await self._call(self.client.converse, **self._request(model, messages, output_type))
+        metrics = _bedrock_metrics(response)
+        blocks = response.get('output', {}).get('message', {}).get('content', [])
+        if output_type is not None:
+            for block in blocks:
+                if block.get('toolUse', {}).get('name') == STRUCTURED_OUTPUT:
+                    parsed = block['toolUse']['input']
+                    return RunnerResult(content=json.dumps(parsed), metrics=metrics, raw=response, parsed=parsed)
+            log.warning('Bedrock structured response has no structured_output tool call')
+            return _failed(metrics.tokens, response)
+        content = ''.join(block.get('text', '') for block in blocks)
+        return RunnerResult(content=content, metrics=metrics, raw=response)
+
+    async def _stream(self, model, messages, tokens):
+        response = await self._call(self.client.converse_stream, **self._request(model, messages, None))
+        events = iter(response['stream'])
+        while (event := await self._call(next, events, None)) is not None:
+            if 'contentBlockDelta' in event:
+                yield event['contentBlockDelta']['delta'].get('text', '')
+            elif 'metadata' in event:
+                tokens[0] = _bedrock_usage(event['metadata'].get('usage'))
+
+    async def aclose(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+class LangChainAdapter(ProviderAdapter):
+    """
+    Any provider LangChain's ``init_chat_model`` supports.
+
+    Chat models are created once per provider, model and parameters and
+    kept, so each one's provider client and connection pool are reused
+    across calls instead of being rebuilt for every runner. Batches go
+    through ``abatch`` and structured output through
+    ``with_structured_output``; metrics come from the response's usage
+    metadata, as in the SDK's LangChain runner.
+    """
+
+    provider = 'langchain'
+    requires = ('langchain', 'ldai_langchain')
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        super().__init__(max_connections)
+        self._models: Dict[Tuple[str, str, str], Any] = {}
+
+    def model(self, spec: ModelSpec):
+        """The chat model for ``spec``, created on first use."""
+        key = (spec.provider, spec.name, json.dumps(spec.parameters, sort_keys=True, default=str))
+        chat_model = self._models.get(key)
+        if chat_model is None:
+            from langchain.chat_models import init_chat_model
+            from ldai_langchain import map_provider
+
+            parameters = dict(spec.parameters)
+            provider = map_provider(spec.provider)
+            if provider == 'bedrock_converse' and 'provider' not in parameters:
+                parameters['provider'] = spec.provider.lower().removeprefix('bedrock:')
+            chat_model = self._models[key] = init_chat_model(spec.name, model_provider=provider, **parameters)
+        return chat_model
+
+    def _runnable(self, spec: ModelSpec, output_type: Optional[Dict[str, Any]]):
+        chat_model = self.model(spec)
+        if output_type is None:
+            return chat_model
+        return chat_model.with_structured_output(output_type, include_raw=True)
+
+    @staticmethod
+    def _result(response: Any, structured: bool) -> RunnerResult:
+        from ldai_langchain import get_ai_metrics_from_response
+
+        if not structured:
+            return RunnerResult(content=response.text, metrics=get_ai_metrics_from_response(response), raw=response)
+        raw, parsed = response.get('raw'), response.get('parsed')
+        metrics = get_ai_metrics_from_response(raw)
+        if response.get('parsing_error') is not None or not isinstance(parsed, dict):
+            log.warning(f'LangChain structured response could not be parsed: {response.get("parsing_error")}')
+            return _failed(metrics.tokens, raw)
+        return RunnerResult(content=json.dumps(parsed), metrics=metrics, raw=raw, parsed=parsed)
+
+    async def _complete(self, model, messages, output_type):
+        from ldai_langchain import convert_messages_to_langchain
+
+        response = await self._runnable(model, output_type).ainvoke(convert_messages_to_langchain(messages))
+        return self._result(response, output_type is not None)
+
+    async def _stream(self, model, messages, tokens):
+        from ldai_langchain import convert_messages_to_langchain, get_ai_usage_from_response
+
+        combined = None
+        async for chunk in self.model(model).astream(convert_messages_to_langchain(messages)):
+            combined = chunk if combined is None else combined + chunk
+            yield chunk.text
+        if combined is not None:
+            tokens[0] = get_ai_usage_from_response(combined)
+
+    async def batch(self, model, conversations, output_type=None, concurrency=DEFAULT_BATCH_CONCURRENCY):
+        from ldai_langchain import convert_messages_to_langchain
+
+        start = time.perf_counter()
+        try:
+            inputs = [convert_messages_to_langchain(list(messages)) for messages in conversations]
+            responses = await self._runnable(model, output_type).abatch(
+                inputs, config={'max_concurrency': max(concurrency, 1)}, return_exceptions=True,
+            )
+        except Exception as error:
+            log.warning(f'LangChain batch invocation failed: {error}')
+            responses = [error] * len(conversations)
+        duration_ms = _elapsed_ms(start)
+        results = []
+        for response in responses:
+            if isinstance(response, Exception):
+                log.warning(f'LangChain model invocation failed: {response}')
+                result = _failed()
+            else:
+                result = self._result(response, output_type is not None)
+            # abatch does not time calls separately; each gets the batch's duration.
+            result.metrics.duration_ms = duration_ms
+            results.append(result)
+        return results
+
+    async def aclose(self) -> None:
+        self._models.clear()
+
+
+def adapter_type(provider_name: str) -> type:
+    """The adapter class for an AI config's provider name; LangChain for any provider without its own."""
+    name = provider_name.lower()
+    if name == 'openai':
+        return OpenAIAdapter
+    if name in ('gemini', 'google', 'google-genai'):
+        return GeminiAdapter
+    if name == 'bedrock' or name.startswith('bedrock:'):
+        return BedrockAdapter
+    return LangChainAdapter
+
+
+class AdapterRunner(Runner):
+    """
+    A ``Runner`` for ``ManagedModel``, judges and the service's runner
+    wrappers that sends its calls through a shared :class:`ProviderAdapter`.
+
+    Keeps the conversation history the way the SDK's model runners do:
+    the config's messages, then each successful exchange if ``multi_turn``.
+    """
+
+    def __init__(self, adapter: ProviderAdapter, config: AIConfigKind, multi_turn: bool = True):
+        self.adapter = adapter
+        self.model = ModelSpec.from_config(config)
+        self._history: List[LDMessage] = list(getattr(config, 'messages', None) or [])
+        self._multi_turn = multi_turn
+
+    async def run(self, input: str, output_type: Optional[Dict[str, Any]] = None) -> RunnerResult:
+        user_message = LDMessage(role='user', content=input)
+        result = await self.adapter.complete(self.model, [*self._history, user_message], output_type)
+        if result.metrics.success and result.content and self._multi_turn:
+            self._history.append(user_message)
+            self._history.append(LDMessage(role='assistant', content=result.content))
+        return result
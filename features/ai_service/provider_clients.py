@@ -0,0 +1,85 @@
+"""Provider clients shared across every request the service handles."""
+
+from importlib import util
+from typing import Dict, Optional
+
+from ldai import log
+from ldai.models import AIConfigKind
+from ldai.providers import Runner, RunnerFactory
+
+from provider_adapters import DEFAULT_MAX_CONNECTIONS, AdapterRunner, OpenAIAdapter, ProviderAdapter, adapter_type
+
+
+def _installed(module: str) -> bool:
+    try:
+        return util.find_spec(module) is not None
+    except ModuleNotFoundError:
+        # find_spec imports the parent package of a dotted name, such as google for google.genai.
+        return False
+
+
+class ProviderClients:
+    """
+    Builds model runners on provider clients that live as long as the service.
+
+    ``create_model`` and ``create_judge`` on the AI client construct a new
+    provider client, with its own connection pool, for every runner. In a
+    long-lived service that means a fresh TCP and TLS handshake on most
+    requests. This class keeps one :class:`~provider_adapters.ProviderAdapter`
+    per provider, each with a pool of up to ``max_connections`` keep-alive
+    connections, and hands out runners that share it: OpenAI, Gemini and
+    Bedrock configs go to their own SDKs, and configs for any other provider
+    to LangChain. If the adapter's packages are not installed, the config
+    falls back to the SDK's ``RunnerFactory``.
+
+    Agents and agent graphs are still created through the AI client, since
+    their runners manage their own clients.
+    """
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        self.max_connections = max_connections
+        self._adapters: Dict[type, ProviderAdapter] = {}
+
+    def adapter(self, provider_name: str) -> Optional[ProviderAdapter]:
+        """
+        The shared adapter for a provider, for callers that need ``stream`` or ``batch``.
+
+        :return: The adapter, or ``None`` if its packages are not installed.
+        """
+        kind = adapter_type(provider_name)
+        adapter = self._adapters.get(kind)
+        if adapter is None:
+            if not all(_installed(module) for module in kind.requires):
+                return None
+            adapter = self._adapters[kind] = kind(self.max_connections)
+        return adapter
+
+    def warm_up(self) -> None:
+        """Create the shared OpenAI client up front instead of on the first request."""
+        adapter = self.adapter('openai')
+        if isinstance(adapter, OpenAIAdapter):
+            adapter.client
+
+    def create_model(self, config: AIConfigKind, multi_turn: bool = True) -> Optional[Runner]:
+        """
+        Create a model runner for a completion or judge config.
+
+        :param config: The evaluated AI config.
+        :param multi_turn: Whether the runner keeps conversation history
+            between calls. Pass ``False`` for judges.
+        :return: A runner, or ``None`` if no installed provider supports the config.
+        """
+        provider_name = config.provider.name if config.provider else ''
+        adapter = self.adapter(provider_name) if provider_name else None
+        if adapter is not None:
+            return AdapterRunner(adapter, config, multi_turn=multi_turn)
+        return RunnerFactory.create_model(config, multi_turn=multi_turn)
+
+    async def aclose(self) -> None:
+        """Close the shared clients and their connection pools."""
+        for adapter in self._adapters.values():
+            try:
+                await adapter.aclose()
+            except Exception as err:
+                log.warning(f"Failed to close the {adapter.provider} client: {err}")
+        self._adapters.clear()
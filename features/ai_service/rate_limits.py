@@ -0,0 +1,373 @@
+"""Per-provider and per-model token buckets for requests and tokens per minute."""
+
+import asyncio
+import heapq
+import itertools
+import json
+import math
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ldclient import Context, LDClient
+from ld_bootstrap import resumption_data
+
+
+QUEUE_WAIT_EVENT_KEY = 'ai-queue-wait'
+"""Custom event tracked for every run that waited for rate-limit capacity."""
+
+CHARS_PER_TOKEN = 4
+TOKENS_PER_MESSAGE = 4
+"""Role and separator tokens added for each chat message."""
+
+
+class Priority(IntEnum):
+    """Admission order when a model is at its limit. Lower values go first."""
+
+    INTERACTIVE = 0
+    BATCH = 1
+
+    @classmethod
+    def parse(cls, value: Optional[str]) -> 'Priority':
+        if not value:
+            return cls.INTERACTIVE
+        try:
+            return cls[value.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown priority '{value}'; use 'interactive' or 'batch'") from None
+
+
+class RateLimited(Exception):
+    """Raised when a request would wait longer than the allowed queue time."""
+
+    def __init__(self, message: str, retry_after_s: float):
+        super().__init__(message)
+        self.retry_after_s = retry_after_s
+
+
+def estimate_tokens(texts: Iterable[str]) -> int:
+    """
+    Rough token count of a chat request: about four characters per token,
+    plus a few tokens of framing per message.
+
+    Providers count tokens with their own tokenizers, so this is only an
+    estimate; it is corrected with the actual usage once the response
+    arrives (see :meth:`Admission.settle`).
+    """
+    total = 3
+    for text in texts:
+        total += math.ceil(len(text) / CHARS_PER_TOKEN) + TOKENS_PER_MESSAGE
+    return total
+
+
+@dataclass
+class RateLimit:
+    """Requests and tokens allowed per minute. ``None`` means no limit on that dimension."""
+
+    rpm: Optional[float] = None
+    tpm: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RateLimit':
+        return cls(rpm=data.get('rpm'), tpm=data.get('tpm'))
+
+
+def parse_limits(value: str) -> Dict[str, RateLimit]:
+    """
+    Parse limits from JSON such as
+    ``{"openai": {"rpm": 500, "tpm": 30000}, "openai/gpt-4o": {"tpm": 80000}}``.
+
+    Keys are a provider name, applied to each of its models separately, or
+    ``provider/model`` for one model.
+    """
+    if not value:
+        return {}
+    data = json.loads(value)
+    if not isinstance(data, dict):
+        raise ValueError('Rate limits must be a JSON object keyed by provider or provider/model')
+    return {key.lower(): RateLimit.from_dict(limit) for key, limit in data.items()}
+
+
+class TokenBucket:
+    """
+    Holds up to ``capacity`` units and refills at ``capacity`` per minute.
+
+    The level can go below zero when actual usage turns out higher than
+    the amount taken up front; later requests then wait for the debt to
+    refill.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self._rate_per_s = self.capacity / 60
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._updated) * self._rate_per_s)
+        self._updated = now
+
+    def wait_s(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken; 0 if it can be taken now."""
+        return self.refill_s(min(amount, self.capacity), now)
+
+    def refill_s(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` will have been refilled, which may be more than the capacity."""
+        self._refill(now)
+        return max(amount - self._level, 0.0) / self._rate_per_s
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self._level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Take ``amount`` more (or give back a negative amount) after the fact."""
+        self._level = min(self.capacity, self._level - amount)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class _Lane:
+    """Buckets and wait queue for one provider and model."""
+
+    def __init__(self, name: str, limit: RateLimit):
+        self.name = name
+        self.requests = TokenBucket(limit.rpm) if limit.rpm else None
+        self.tokens = TokenBucket(limit.tpm) if limit.tpm else None
+        self._queue: List[_Waiter] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.wait_ms_total = 0.0
+
+    def wait_s(self, tokens: int, now: float) -> float:
+        return max(
+            self.requests.wait_s(1, now) if self.requests else 0.0,
+            self.tokens.wait_s(tokens, now) if self.tokens else 0.0,
+        )
+
+    def take(self, tokens: int, now: float) -> None:
+        if self.requests:
+            self.requests.take(1, now)
+        if self.tokens:
+            self.tokens.take(tokens, now)
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for waiter in self._queue if not waiter.future.done())
+
+    def backlog_s(self, tokens: int, priority: int, now: float) -> float:
+        """Estimated wait for a new request: time to refill it and everything queued ahead of it."""
+        ahead = [w for w in self._queue if not w.future.done() and w.priority <= priority]
+        wait = 0.0
+        if self.requests:
+            wait = self.requests.refill_s(len(ahead) + 1, now)
+        if self.tokens:
+            queued = sum(min(w.tokens, self.tokens.capacity) for w in ahead) + min(tokens, self.tokens.capacity)
+            wait = max(wait, self.tokens.refill_s(queued, now))
+        return wait
+
+    def enqueue(self, waiter: _Waiter) -> None:
+        heapq.heappush(self._queue, waiter)
+        self.queued += 1
+        self.pump()
+
+    def pump(self) -> None:
+        """Admit waiters in priority order while the buckets allow, then sleep until the head fits."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        while self._queue:
+            head = self._queue[0]
+            if head.future.done():
+                # Cancelled while waiting.
+                heapq.heappop(self._queue)
+                continue
+            wait = self.wait_s(head.tokens, now)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self.pump)
+                return
+            heapq.heappop(self._queue)
+            self.take(head.tokens, now)
+            head.future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rpm': self.requests.capacity if self.requests else None,
+            'tpm': self.tokens.capacity if self.tokens else None,
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'waiting': self.waiting,
+            'rejected': self.rejected,
+            'mean_wait_ms': round(self.wait_ms_total / self.admitted, 1) if self.admitted else 0.0,
+        }
+
+
+@dataclass
+class Admission:
+    """A request let through by :class:`ProviderRateLimiter`."""
+
+    provider: str
+    model: str
+    priority: Priority
+    estimated_tokens: int
+    wait_ms: float
+    """Time spent queued for capacity."""
+    _lane: Optional[_Lane] = field(default=None, repr=False)
+
+    def settle(self, summary) -> None:
+        """
+        Correct the token bucket with the tokens the run actually used.
+
+        Admission only charges the estimated input tokens; once the response
+        is in, the difference to the reported total, output included, is
+        charged (or refunded) so the next requests see the real usage.
+        """
+        tokens = getattr(summary, 'tokens', None)
+        if self._lane is None or self._lane.tokens is None or not tokens:
+            return
+        self._lane.tokens.adjust(tokens.total - min(self.estimated_tokens, self._lane.tokens.capacity))
+
+    def refund(self) -> None:
+        """Give back the request and estimated tokens taken at admission, for a call that was never sent."""
+        if self._lane is None:
+            return
+        if self._lane.requests is not None:
+            self._lane.requests.adjust(-1)
+        if self._lane.tokens is not None:
+            self._lane.tokens.adjust(-min(self.estimated_tokens, self._lane.tokens.capacity))
+        self._lane.pump()
+
+
+class ProviderRateLimiter:
+    """
+    Process-wide scheduler that keeps model calls under provider rate limits.
+
+    Each provider and model gets a requests-per-minute bucket and a
+    tokens-per-minute bucket. A request is admitted once both buckets
+    hold enough for it: one request, and its estimated input tokens.
+    Otherwise it queues; interactive requests are admitted before batch
+    requests, and requests of the same priority in arrival order.
+
+    Waiting here instead of sending the request and backing off on a 429
+    keeps the wait short and predictable, and avoids spending the
+    provider's quota on requests that will be rejected. A request whose
+    estimated wait exceeds ``max_wait_ms`` is rejected straight away with
+    :class:`RateLimited`.
+
+    Buckets are shared by every request on the event loop, so create one
+    limiter per process.
+    """
+
+    def __init__(self, limits: Dict[str, RateLimit], max_wait_ms: float = 0):
+        """
+        Initialize the limiter.
+
+        :param limits: Limits keyed by provider name or ``provider/model``.
+            A ``provider/model`` entry takes precedence; a provider entry
+            applies to each of its models separately. Models with no entry
+            are not limited.
+        :param max_wait_ms: Reject requests expected to wait longer than
+            this. 0 lets them wait as long as needed.
+        """
+        self._limits = {key.lower(): limit for key, limit in limits.items()}
+        self._max_wait_s = max(max_wait_ms, 0) / 1000
+        self._lanes: Dict[Tuple[str, str], _Lane] = {}
+        self._seq = itertools.count()
+
+    def _lane(self, provider: str, model: str) -> Optional[_Lane]:
+        key = (provider.lower(), model)
+        lane = self._lanes.get(key)
+        if lane is None:
+            limit = self._limits.get(f'{key[0]}/{model}'.lower()) or self._limits.get(key[0])
+            if limit is None or not (limit.rpm or limit.tpm):
+                return None
+            lane = self._lanes[key] = _Lane(f'{key[0]}/{model}', limit)
+        return lane
+
+    async def admit(
+        self,
+        provider: str,
+        model: str,
+        estimated_tokens: int,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> Admission:
+        """
+        Wait until the provider and model have capacity for the request.
+
+        :param provider: The provider name from the AI Config.
+        :param model: The model name from the AI Config.
+        :param estimated_tokens: Estimated input tokens, for example from
+            :func:`estimate_tokens`.
+        :param priority: Interactive requests are admitted first.
+        :raises RateLimited: If the wait is expected to exceed ``max_wait_ms``.
+        """
+        lane = self._lane(provider or '', model or '')
+        admission = Admission(provider, model, priority, estimated_tokens, 0.0, lane)
+        if lane is None:
+            return admission
+
+        now = time.monotonic()
+        if not lane.waiting and lane.wait_s(estimated_tokens, now) == 0:
+            lane.take(estimated_tokens, now)
+            lane.admitted += 1
+            return admission
+
+        if self._max_wait_s:
+            backlog_s = lane.backlog_s(estimated_tokens, priority, now)
+            if backlog_s > self._max_wait_s:
+                lane.rejected += 1
+                raise RateLimited(f"Rate limit for '{lane.name}' reached; retry in {backlog_s:.1f}s", backlog_s)
+
+        waiter = _Waiter(priority, next(self._seq), estimated_tokens, asyncio.get_running_loop().create_future())
+        lane.enqueue(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the caller gave up; return the capacity.
+                if lane.requests:
+                    lane.requests.adjust(-1)
+                if lane.tokens:
+                    lane.tokens.adjust(-min(estimated_tokens, lane.tokens.capacity))
+            waiter.future.cancel()
+            lane.pump()
+            raise
+        admission.wait_ms = (time.monotonic() - now) * 1000
+        lane.admitted += 1
+        lane.wait_ms_total += admission.wait_ms
+        return admission
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {lane.name: lane.stats() for lane in self._lanes.values()}
+
+
+def track_queue_wait(ld_client: LDClient, context: Context, summary, admission: Admission) -> None:
+    """
+    Send the time a run waited for capacity as an ``ai-queue-wait`` event.
+
+    The event carries the run's config key, variation key, version and run
+    ID from its tracker summary, so the wait can be matched to the run's
+    other metrics. Runs that did not wait send nothing.
+    """
+    if admission.wait_ms <= 0:
+        return
+    data = resumption_data(getattr(summary, 'resumption_token', None))
+    ld_client.track(QUEUE_WAIT_EVENT_KEY, context, {
+        'runId': data.get('runId', ''),
+        'configKey': data.get('configKey', ''),
+        'variationKey': data.get('variationKey', ''),
+        'version': data.get('version', 1),
+        'modelName': admission.model,
+        'providerName': admission.provider,
+        'priority': admission.priority.name.lower(),
+    }, round(admission.wait_ms, 1))
@@ -0,0 +1,228 @@
+"""Semantic response cache: nearest-neighbour lookup over hashed n-gram embeddings."""
+
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_DIMENSIONS = 1024
+DEFAULT_THRESHOLD = 0.9
+
+_WORD = re.compile(r'\w+')
+
+
+class HashedNgramEmbedder:
+    """
+    Embeds text as a signed, hashed bag of words, word pairs and character n-grams.
+
+    Runs on the CPU with NumPy alone and needs no model download or
+    training, so it adds well under a millisecond per lookup. It captures
+    surface similarity: differences in case, punctuation, word order and
+    small rewordings score close to 1. It does not understand meaning, so
+    questions that share most of their words but differ in one entity or
+    a negation can also score high; choose the threshold accordingly.
+    """
+
+    def __init__(self, dimensions: int = DEFAULT_DIMENSIONS, ngram_sizes: Tuple[int, ...] = (3, 4)):
+        self.dimensions = dimensions
+        self.ngram_sizes = ngram_sizes
+
+    def features(self, text: str) -> List[str]:
+        words = _WORD.findall(text.lower())
+        features = [f'w:{word}' for word in words]
+        features += [f'b:{first} {second}' for first, second in zip(words, words[1:])]
+        for word in words:
+            padded = f'<{word}>'
+            for size in self.ngram_sizes:
+                features += [f'c:{padded[i:i + size]}' for i in range(max(len(padded) - size + 1, 1))]
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        """A unit-length float32 vector; all zeros for text with no words."""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in self.features(text):
+            digest = zlib.crc32(feature.encode('utf-8'))
+            # The top bit picks the sign, so colliding features tend to cancel out.
+            vector[digest % self.dimensions] += 1.0 if digest & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+@dataclass
+class CachedResponse:
+    """A stored response and how close its prompt was to the lookup."""
+
+    prompt: str
+    content: str
+    similarity: float = 1.0
+
+
+class VectorIndex:
+    """
+    Bounded matrix of unit vectors searched by brute-force dot product.
+
+    Vectors live in one contiguous float32 array that doubles as entries
+    are added, up to ``capacity`` rows, so a lookup is one matrix-vector
+    product. When the index is full the oldest entry is overwritten.
+    """
+
+    def __init__(self, dimensions: int, capacity: int):
+        self.capacity = capacity
+        self._vectors = np.zeros((min(capacity, 16), dimensions), dtype=np.float32)
+        self._entries: List[CachedResponse] = []
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, vector: np.ndarray, entry: CachedResponse) -> None:
+        if len(self._entries) < self.capacity:
+            if len(self._entries) == len(self._vectors):
+                grown = np.zeros((min(len(self._vectors) * 2, self.capacity), self._vectors.shape[1]), np.float32)
+                grown[:len(self._vectors)] = self._vectors
+                self._vectors = grown
+            self._vectors[len(self._entries)] = vector
+            self._entries.append(entry)
+            return
+        self._vectors[self._next] = vector
+        self._entries[self._next] = entry
+        self._next = (self._next + 1) % self.capacity
+
+    def nearest(self, vector: np.ndarray) -> Tuple[Optional[CachedResponse], float]:
+        """The most similar entry and its cosine similarity, or ``(None, 0.0)`` if empty."""
+        if not self._entries:
+            return None, 0.0
+        scores = self._vectors[:len(self._entries)] @ vector
+        best = int(np.argmax(scores))
+        return self._entries[best], min(float(scores[best]), 1.0)
+
+    @property
+    def nbytes(self) -> int:
+        """Vector storage plus the stored prompt and response text."""
+        text = sum(len(entry.prompt) + len(entry.content) for entry in self._entries)
+        return self._vectors.nbytes + text
+
+
+@dataclass
+class SemanticCacheStats:
+    """How often lookups hit and what they cost."""
+
+    lookups: int = 0
+    hits: int = 0
+    stores: int = 0
+    lookup_ms: float = 0.0
+    """Total time spent embedding and searching on lookups."""
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    @property
+    def mean_lookup_ms(self) -> float:
+        return self.lookup_ms / self.lookups if self.lookups else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'hit_rate': round(self.hit_rate, 4),
+            'stores': self.stores,
+            'mean_lookup_ms': round(self.mean_lookup_ms, 3),
+        }
+
+
+class SemanticCache:
+    """
+    Serves responses for prompts similar to ones already answered.
+
+    Entries are scoped: a lookup only matches prompts stored under the same
+    scope, such as the config key, variation key and rendered system
+    messages, so a response is never served for a different prompt template
+    or model. Within a scope the final user turn is embedded with
+    :class:`HashedNgramEmbedder` and compared against a bounded
+    :class:`VectorIndex`; the nearest entry is a hit if its cosine
+    similarity reaches ``threshold``.
+
+    Scopes are kept in least-recently-used order and the oldest is dropped
+    beyond ``max_scopes``, so memory stays under roughly
+    ``max_scopes * capacity * dimensions * 4`` bytes plus the cached text.
+
+    Safe to call from several threads.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_scopes: int = 64,
+        embedder: Optional[HashedNgramEmbedder] = None,
+    ):
+        """
+        Initialize the cache.
+
+        :param capacity: Entries kept per scope.
+        :param threshold: Minimum cosine similarity for a hit, from 0 to 1.
+        :param max_scopes: Maximum number of scopes kept at once.
+        :param embedder: Embedder to use; defaults to a 1024-dimension
+            :class:`HashedNgramEmbedder`.
+        """
+        self.capacity = capacity
+        self.threshold = threshold
+        self.max_scopes = max_scopes
+        self.embedder = embedder or HashedNgramEmbedder()
+        self.stats = SemanticCacheStats()
+        self._indexes: 'OrderedDict[Hashable, VectorIndex]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, scope: Hashable, prompt: str) -> Optional[CachedResponse]:
+        """
+        Find a stored response for a prompt similar to ``prompt``.
+
+        :return: The response with its similarity, or ``None`` on a miss.
+        """
+        start = time.perf_counter()
+        vector = self.embedder.embed(prompt)
+        with self._lock:
+            index = self._indexes.get(scope)
+            entry, similarity = index.nearest(vector) if index is not None else (None, 0.0)
+            if index is not None:
+                self._indexes.move_to_end(scope)
+            hit = entry is not None and similarity >= self.threshold
+            self.stats.lookups += 1
+            self.stats.hits += hit
+            self.stats.lookup_ms += (time.perf_counter() - start) * 1000
+        if not hit:
+            return None
+        return CachedResponse(entry.prompt, entry.content, similarity)
+
+    def store(self, scope: Hashable, prompt: str, content: str) -> None:
+        """Cache ``content`` as the response to ``prompt`` within ``scope``."""
+        vector = self.embedder.embed(prompt)
+        with self._lock:
+            index = self._indexes.get(scope)
+            if index is None:
+                index = self._indexes[scope] = VectorIndex(self.embedder.dimensions, self.capacity)
+                while len(self._indexes) > self.max_scopes:
+                    self._indexes.popitem(last=False)
+            self._indexes.move_to_end(scope)
+            index.add(vector, CachedResponse(prompt, content))
+            self.stats.stores += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Stats plus the number of scopes and entries and the index memory in bytes."""
+        with self._lock:
+            entries = sum(len(index) for index in self._indexes.values())
+            nbytes = sum(index.nbytes for index in self._indexes.values())
+            scopes = len(self._indexes)
+        return {
+            **self.stats.to_dict(),
+            'threshold': self.threshold,
+            'scopes': scopes,
+            'entries': entries,
+            'index_bytes': nbytes,
+        }
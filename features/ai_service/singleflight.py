@@ -0,0 +1,130 @@
+"""Coalesce identical in-flight model calls into one upstream request."""
+
+import asyncio
+import dataclasses
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from ldai.providers import Runner
+from ldai.providers.types import RunnerResult
+
+
+@dataclass
+class SingleFlightStats:
+    """How many calls were made and how many shared another caller's request."""
+
+    calls: int = 0
+    upstream: int = 0
+    """Calls that made their own upstream request."""
+    coalesced: int = 0
+    """Calls that joined a request already in flight."""
+
+    @property
+    def coalescing_ratio(self) -> float:
+        """Share of calls served by another caller's request."""
+        return self.coalesced / self.calls if self.calls else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'upstream': self.upstream,
+            'coalesced': self.coalesced,
+            'coalescing_ratio': round(self.coalescing_ratio, 4),
+        }
+
+
+class _Flight:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time and shares its result.
+
+    The first caller for a key starts the call; callers that arrive with
+    the same key while it is running wait for the same result instead of
+    starting their own, and an exception is raised to all of them. Once it
+    finishes the key is free again, so this is not a cache: a later
+    caller starts a new call.
+
+    The call runs in its own task, so a caller that is cancelled, for
+    example by a request timeout, does not cancel it for the others. It is
+    cancelled only when every caller waiting on it has gone.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.stats = SingleFlightStats()
+
+    def pending(self, key: Hashable) -> bool:
+        """Whether a call for ``key`` is in flight, so a new caller would join it."""
+        return key in self._flights
+
+    def _finish(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run ``fn`` for ``key``, or join the call already running for it.
+
+        :return: The result, and whether it came from another caller's call.
+        """
+        self.stats.calls += 1
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda _, done=flight: self._finish(key, done))
+            self.stats.upstream += 1
+        else:
+            self.stats.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+
+class CoalescingRunner:
+    """
+    Runner wrapper that shares identical in-flight calls through a :class:`SingleFlight`.
+
+    Wrap the runner for each request with the key of everything that
+    determines the provider's answer: provider, model, parameters, the
+    rendered messages and the input. The first request runs its own
+    runner; identical requests that arrive while it is running get its
+    result instead of calling the provider.
+
+    Every caller still runs under its own tracker, so each request is
+    counted with its own duration and outcome. Token usage is reported
+    only by the caller whose request reached the provider, so tokens and
+    cost are not counted once per caller.
+    """
+
+    def __init__(self, runner: Runner, flights: SingleFlight, key: Hashable):
+        self._runner = runner
+        self._flights = flights
+        self._key = key
+        self.shared: Optional[bool] = None
+        """After :meth:`run`, whether the result came from another request."""
+
+    def pending(self, input: str, output_type: Optional[Dict[str, Any]] = None) -> bool:
+        """Whether running ``input`` now would join a call already in flight."""
+        return self._flights.pending((self._key, input, repr(output_type)))
+
+    async def run(self, input: str, output_type: Optional[Dict[str, Any]] = None) -> RunnerResult:
+        key = (self._key, input, repr(output_type))
+        result, self.shared = await self._flights.do(key, lambda: self._runner.run(input, output_type))
+        if not self.shared:
+            return result
+        # Measure the joining caller's own wait, and leave the tokens with the caller that paid for them.
+        metrics = dataclasses.replace(result.metrics, tokens=None, duration_ms=None)
+        return dataclasses.replace(result, metrics=metrics)
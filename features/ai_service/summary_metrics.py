@@ -0,0 +1,362 @@
+"""Rolling latency, token and error-rate histograms aggregated from tracker summaries."""
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ld_bootstrap import resumption_data
+
+log = logging.getLogger(__name__)
+
+SUB_BUCKET_BITS = 7
+"""Values are bucketed with 7 significant bits, a relative error under 1%."""
+
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_HALF_SUB_BUCKETS = _SUB_BUCKETS // 2
+
+PERCENTILES = (50, 95, 99)
+
+
+def _bucket_index(value: int) -> int:
+    """Log-linear bucket for a non-negative integer, as in an HDR histogram."""
+    if value < _SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return _SUB_BUCKETS + (shift - 1) * _HALF_SUB_BUCKETS + (value >> shift) - _HALF_SUB_BUCKETS
+
+
+def _bucket_value(index: int) -> float:
+    """Midpoint of the values that fall in a bucket."""
+    if index < _SUB_BUCKETS:
+        return float(index)
+    shift = (index - _SUB_BUCKETS) // _HALF_SUB_BUCKETS + 1
+    mantissa = (index - _SUB_BUCKETS) % _HALF_SUB_BUCKETS + _HALF_SUB_BUCKETS
+    low = mantissa << shift
+    return low + ((1 << shift) - 1) / 2
+
+
+class Histogram:
+    """
+    Sparse log-linear histogram of non-negative integers.
+
+    Memory is bounded by the value range rather than the number of samples:
+    64 buckets per power of two, so latencies up to an hour in milliseconds
+    need at most about 1,400 buckets however many requests are recorded.
+    """
+
+    __slots__ = ('counts', 'total', 'max')
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: float) -> None:
+        value = max(int(value), 0)
+        index = _bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.max = max(self.max, value)
+
+    def merge(self, other: 'Histogram') -> None:
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile, or ``None`` if nothing was recorded."""
+        if not self.total:
+            return None
+        rank = max(math.ceil(pct / 100 * self.total), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_bucket_value(index), float(self.max))
+        return float(self.max)
+
+
+class _Slot:
+    """One time slice of a series: a histogram per measure plus outcome counts."""
+
+    __slots__ = ('start', 'histograms', 'requests', 'errors')
+
+    def __init__(self, start: float):
+        self.start = start
+        self.histograms: Dict[str, Histogram] = {}
+        self.requests = 0
+        self.errors = 0
+
+
+class RollingSeries:
+    """
+    Measurements for one config, variation and model over a sliding window.
+
+    The window is split into ``slots`` slices; recording goes to the current
+    slice and the oldest slice is dropped as time moves on, so percentiles
+    reflect roughly the last ``window_s`` seconds.
+    """
+
+    def __init__(self, window_s: float, slots: int):
+        self._slot_s = window_s / slots
+        self._slots: List[_Slot] = []
+        self._max_slots = slots
+
+    def _current(self, now: float) -> _Slot:
+        start = now - now % self._slot_s
+        if not self._slots or self._slots[-1].start != start:
+            self._slots.append(_Slot(start))
+        self._expire(now)
+        return self._slots[-1]
+
+    def _expire(self, now: float) -> None:
+        oldest = now - self._slot_s * self._max_slots
+        while self._slots and self._slots[0].start <= oldest:
+            self._slots.pop(0)
+
+    def record(self, now: float, success: Optional[bool], values: Dict[str, Optional[float]]) -> None:
+        slot = self._current(now)
+        slot.requests += 1
+        if success is False:
+            slot.errors += 1
+        for measure, value in values.items():
+            if value is not None:
+                slot.histograms.setdefault(measure, Histogram()).record(value)
+
+    def snapshot(self, now: float) -> Tuple[int, int, Dict[str, Histogram]]:
+        """Requests, errors and merged histograms for the current window."""
+        self._expire(now)
+        merged: Dict[str, Histogram] = {}
+        requests = errors = 0
+        for slot in self._slots:
+            requests += slot.requests
+            errors += slot.errors
+            for measure, histogram in slot.histograms.items():
+                merged.setdefault(measure, Histogram()).merge(histogram)
+        return requests, errors, merged
+
+
+@dataclass(frozen=True)
+class SeriesKey:
+    config_key: str
+    variation_key: str
+    model: str
+
+
+@dataclass
+class SeriesStats:
+    """Percentiles for one series over the current window."""
+
+    key: SeriesKey
+    requests: int
+    errors: int
+    percentiles: Dict[str, Dict[int, Optional[float]]]
+    """Measure name to ``{50: p50, 95: p95, 99: p99}``."""
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'config_key': self.key.config_key,
+            'variation_key': self.key.variation_key,
+            'model': self.key.model,
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': round(self.error_rate, 4),
+            **{
+                measure: {f'p{pct}': value for pct, value in values.items()}
+                for measure, values in self.percentiles.items()
+            },
+        }
+
+    def log_line(self) -> str:
+        def fmt(measure: str, unit: str = '') -> str:
+            values = self.percentiles.get(measure)
+            if not values:
+                return '-'
+            return '/'.join(f'{values[pct]:.0f}' for pct in PERCENTILES) + unit
+
+        return (
+            f"config={self.key.config_key} variation={self.key.variation_key or '-'} "
+            f"model={self.key.model or '-'} n={self.requests} err={self.error_rate:.1%} "
+            f"latency p50/95/99={fmt('duration_ms', 'ms')} ttft={fmt('time_to_first_token_ms', 'ms')} "
+            f"tokens in={fmt('input_tokens')} out={fmt('output_tokens')}"
+        )
+
+
+def summary_labels(summary) -> Tuple[str, str]:
+    """
+    The config key and variation key a tracker summary belongs to.
+
+    Summaries do not expose them directly; both are read from the summary's
+    resumption token.
+    """
+    data = resumption_data(getattr(summary, 'resumption_token', None))
+    return data.get('configKey', ''), data.get('variationKey', '')
+
+
+class SummaryAggregator:
+    """
+    Aggregates tracker summaries into rolling per-series histograms.
+
+    Every summary passed to :meth:`record` is filed under its config key,
+    variation key and model, and updates rolling histograms of latency,
+    time to first token and input and output tokens, plus success and error
+    counts. :meth:`stats` returns p50, p95 and p99 for each series over the
+    last ``window_s`` seconds, which shows tail latency per variation while a
+    rollout is in progress.
+
+    Safe to call from several threads.
+    """
+
+    def __init__(self, window_s: float = 300.0, slots: int = 10, max_series: int = 1000):
+        """
+        Initialize the aggregator.
+
+        :param window_s: Length of the rolling window in seconds.
+        :param slots: Number of slices the window is split into. More slices
+            make the window slide more smoothly at the cost of memory.
+        :param max_series: Maximum distinct (config, variation, model) series.
+            Summaries for new series beyond this are dropped.
+        """
+        self._window_s = window_s
+        self._slots = slots
+        self._max_series = max_series
+        self._series: Dict[SeriesKey, RollingSeries] = {}
+        self._lock = threading.Lock()
+        self._log_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.dropped = 0
+
+    def record(self, summary, model: str = '', config_key: Optional[str] = None) -> None:
+        """
+        Add a tracker summary.
+
+        :param summary: An ``LDAIMetricSummary`` from ``tracker.get_summary()``
+            or a managed result's ``metrics``.
+        :param model: The model name, from the config that produced the summary.
+        :param config_key: Overrides the config key read from the summary.
+        """
+        token_key, variation_key = summary_labels(summary)
+        key = SeriesKey(config_key or token_key, variation_key, model or '')
+        tokens = summary.tokens
+        values = {
+            'duration_ms': summary.duration_ms,
+            'time_to_first_token_ms': summary.time_to_first_token,
+            'input_tokens': tokens.input if tokens else None,
+            'output_tokens': tokens.output if tokens else None,
+        }
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= self._max_series:
+                    self.dropped += 1
+                    return
+                series = self._series[key] = RollingSeries(self._window_s, self._slots)
+            series.record(time.monotonic(), summary.success, values)
+
+    def record_config(self, config, summary) -> None:
+        """Add a summary produced by ``config``, labelling it with the config's model."""
+        model = config.model.name if getattr(config, 'model', None) else ''
+        self.record(summary, model=model, config_key=getattr(config, 'key', None))
+
+    def stats(
+        self,
+        config_key: Optional[str] = None,
+        variation_key: Optional[str] = None,
+        model: Optional[str] = None,
+        percentiles: Iterable[int] = PERCENTILES,
+    ) -> List[SeriesStats]:
+        """
+        Percentiles for every series with data in the current window.
+
+        :param config_key: Only include series for this config.
+        :param variation_key: Only include series for this variation.
+        :param model: Only include series for this model.
+        :param percentiles: Percentiles to compute.
+        :return: One entry per series, sorted by config, variation and model.
+        """
+        now = time.monotonic()
+        result = []
+        with self._lock:
+            for key in sorted(self._series, key=lambda k: (k.config_key, k.variation_key, k.model)):
+                if config_key is not None and key.config_key != config_key:
+                    continue
+                if variation_key is not None and key.variation_key != variation_key:
+                    continue
+                if model is not None and key.model != model:
+                    continue
+                requests, errors, histograms = self._series[key].snapshot(now)
+                if not requests:
+                    continue
+                result.append(SeriesStats(
+                    key=key,
+                    requests=requests,
+                    errors=errors,
+                    percentiles={
+                        measure: {pct: histogram.percentile(pct) for pct in percentiles}
+                        for measure, histogram in histograms.items()
+                    },
+                ))
+        return result
+
+    def percentile(
+        self,
+        measure: str,
+        pct: float,
+        config_key: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> Tuple[Optional[float], int]:
+        """
+        One percentile of a measure across every matching series in the window.
+
+        :param measure: ``duration_ms``, ``time_to_first_token_ms``,
+            ``input_tokens`` or ``output_tokens``.
+        :param pct: The percentile, for example 95.
+        :param config_key: Only include series for this config.
+        :param model: Only include series for this model.
+        :return: The percentile, or ``None`` with no data, and the number of
+            samples it is based on.
+        """
+        now = time.monotonic()
+        merged = Histogram()
+        with self._lock:
+            for key, series in self._series.items():
+                if config_key is not None and key.config_key != config_key:
+                    continue
+                if model is not None and key.model != model:
+                    continue
+                _, _, histograms = series.snapshot(now)
+                if measure in histograms:
+                    merged.merge(histograms[measure])
+        return merged.percentile(pct), merged.total
+
+    def log_stats(self, logger: Optional[logging.Logger] = None) -> None:
+        """Log one line per series with data in the current window."""
+        for series in self.stats():
+            (logger or log).info(series.log_line())
+
+    def start_periodic_log(self, interval_s: float, logger: Optional[logging.Logger] = None) -> None:
+        """Log the stats every ``interval_s`` seconds on a background thread."""
+        if self._log_thread is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval_s):
+                self.log_stats(logger)
+
+        self._log_thread = threading.Thread(target=run, name='summary-metrics-log', daemon=True)
+        self._log_thread.start()
+
+    def stop_periodic_log(self) -> None:
+        self._stop.set()
+        if self._log_thread is not None:
+            self._log_thread.join()
+            self._log_thread = None
@@ -0,0 +1,189 @@
+"""Pool of agents and agent graphs created ahead of the request path."""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from ldclient import Context, LDClient
+from ldclient.interfaces import FlagChange
+from ldai import LDAIClient, ManagedAgent, ManagedAgentGraph, ToolRegistry, log
+
+PoolEntry = Union[ManagedAgent, ManagedAgentGraph, None]
+
+
+@dataclass
+class CreationStats:
+    """Latency of getting an agent from the pool, split by warm and cold."""
+
+    warm_ms: List[float] = field(default_factory=list)
+    """Per-request lookup latency when the entry was prebuilt."""
+
+    cold_ms: List[float] = field(default_factory=list)
+    """Per-request latency when the entry had to be created on the request path."""
+
+    refreshes: int = 0
+    """Entries rebuilt in the background after a flag change."""
+
+    @staticmethod
+    def _mean(values: List[float]) -> float:
+        return sum(values) / len(values) if values else 0.0
+
+    @property
+    def mean_warm_ms(self) -> float:
+        return self._mean(self.warm_ms)
+
+    @property
+    def mean_cold_ms(self) -> float:
+        return self._mean(self.cold_ms)
+
+
+class AgentPool:
+    """
+    Prebuilds managed agents and agent graphs for known configs and contexts.
+
+    ``create_agent`` and ``create_agent_graph`` evaluate flags and set up the
+    provider runner, which is slow enough to notice on a first request.
+    ``warm_up`` does that work at startup, in parallel, so the request path
+    only does a dictionary lookup. Entries are keyed on config key and the
+    context's fully qualified key.
+
+    With ``start_background_refresh`` the pool listens for flag changes and
+    rebuilds affected entries, so rollouts are picked up without a restart.
+    Agent entries are rebuilt when their own flag changes. Graph entries are
+    rebuilt on any flag change, because a graph also depends on the flags of
+    each of its nodes.
+    """
+
+    def __init__(
+        self,
+        aiclient: LDAIClient,
+        ld_client: LDClient,
+        tools: Optional[ToolRegistry] = None,
+        max_concurrency: int = 8,
+    ):
+        """
+        Initialize the pool.
+
+        :param aiclient: The AI client used to create agents and graphs.
+        :param ld_client: The underlying LaunchDarkly client, used to listen
+            for flag changes.
+        :param tools: Tool registry passed to every created agent and graph.
+        :param max_concurrency: Maximum number of entries created at once.
+        """
+        self._aiclient = aiclient
+        self._ld_client = ld_client
+        self._tools = tools or {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._agents: Dict[Tuple[str, str], PoolEntry] = {}
+        self._graphs: Dict[Tuple[str, str], PoolEntry] = {}
+        self._contexts: Dict[str, Context] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = CreationStats()
+
+    async def warm_up(
+        self,
+        contexts: Iterable[Context],
+        agent_keys: Iterable[str] = (),
+        graph_keys: Iterable[str] = (),
+    ) -> float:
+        """
+        Create an agent or graph for every key and context combination.
+
+        :param contexts: Representative contexts to prebuild for.
+        :param agent_keys: Agent config keys.
+        :param graph_keys: Agent graph keys.
+        :return: Wall-clock time of the warm-up in milliseconds.
+        """
+        start = time.perf_counter()
+        contexts = list(contexts)
+        agent_keys = list(agent_keys)
+        graph_keys = list(graph_keys)
+        await asyncio.gather(
+            *(self._build(self._agents, key, ctx, self._create_agent) for key in agent_keys for ctx in contexts),
+            *(self._build(self._graphs, key, ctx, self._create_graph) for key in graph_keys for ctx in contexts),
+        )
+        return (time.perf_counter() - start) * 1000
+
+    async def get_agent(self, key: str, context: Context) -> Optional[ManagedAgent]:
+        """
+        Return the pooled agent, creating it on the request path if needed.
+
+        :param key: Agent config key.
+        :param context: Evaluation context.
+        :return: The managed agent, or ``None`` if the config is disabled.
+        """
+        return await self._get(self._agents, key, context, self._create_agent)
+
+    async def get_graph(self, key: str, context: Context) -> Optional[ManagedAgentGraph]:
+        """
+        Return the pooled agent graph, creating it on the request path if needed.
+
+        :param key: Agent graph key.
+        :param context: Evaluation context.
+        :return: The managed agent graph, or ``None`` if the graph is disabled.
+        """
+        return await self._get(self._graphs, key, context, self._create_graph)
+
+    def start_background_refresh(self) -> None:
+        """Rebuild pooled entries whenever a flag changes. Call from the event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._ld_client.flag_tracker.add_listener(self._on_flag_change)
+
+    def stop_background_refresh(self) -> None:
+        """Stop listening for flag changes."""
+        self._ld_client.flag_tracker.remove_listener(self._on_flag_change)
+        self._loop = None
+
+    async def _get(self, entries, key: str, context: Context, create) -> PoolEntry:
+        start = time.perf_counter()
+        pool_key = (key, context.fully_qualified_key)
+        if pool_key in entries:
+            entry = entries[pool_key]
+            self.stats.warm_ms.append((time.perf_counter() - start) * 1000)
+            return entry
+
+        entry = await self._build(entries, key, context, create)
+        self.stats.cold_ms.append((time.perf_counter() - start) * 1000)
+        return entry
+
+    async def _build(self, entries, key: str, context: Context, create) -> PoolEntry:
+        async with self._semaphore:
+            # Creation evaluates flags and builds provider clients synchronously.
+            entry = await asyncio.to_thread(create, key, context)
+        self._contexts[context.fully_qualified_key] = context
+        entries[(key, context.fully_qualified_key)] = entry
+        return entry
+
+    def _create_agent(self, key: str, context: Context) -> Optional[ManagedAgent]:
+        return self._aiclient.create_agent(key, context, tools=self._tools)
+
+    def _create_graph(self, key: str, context: Context) -> Optional[ManagedAgentGraph]:
+        return self._aiclient.create_agent_graph(key, context, tools=self._tools)
+
+    def _on_flag_change(self, change: FlagChange) -> None:
+        # Called on an SDK thread; hand the rebuild to the event loop.
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._refresh(change.key), loop)
+
+    async def _refresh(self, flag_key: str) -> None:
+        rebuilds = [
+            self._build(self._agents, key, self._contexts[ctx_key], self._create_agent)
+            for key, ctx_key in list(self._agents)
+            if key == flag_key
+        ]
+        rebuilds.extend(
+            self._build(self._graphs, key, self._contexts[ctx_key], self._create_graph)
+            for key, ctx_key in list(self._graphs)
+        )
+        if not rebuilds:
+            return
+        log.debug(f'Rebuilding {len(rebuilds)} pooled entries after change to {flag_key}')
+        results = await asyncio.gather(*rebuilds, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                log.warning(f'Failed to rebuild pooled entry after change to {flag_key}: {result}')
+            else:
+                self.stats.refreshes += 1
@@ -2,46 +2,56 @@ import os
 import logging
 from dotenv import load_dotenv
 import asyncio
+import time
 import ldclient
 from ldclient import Context
-from ldclient.config import Config
-from ldai import LDAIClient, AIAgentConfigDefault
-from ldobserve import ObservabilityConfig, ObservabilityPlugin
+from ldai import AIAgentConfigDefault
+from ld_bootstrap import bootstrap
+from agent_pool import AgentPool
+from ld_deadline import Deadline, DeadlineExceeded, deadline_tools, run_with_deadline, track_cancelled
+from streaming_agent import StreamCompleted, StreamingAgent, TextDelta, ToolCallFinished, ToolCallStarted
 
 load_dotenv()
 
 logging.basicConfig()
 logging.getLogger('ldclient').setLevel(logging.WARNING)
 
-# Set sdk_key to your LaunchDarkly SDK key.
-sdk_key = os.getenv('LAUNCHDARKLY_SDK_KEY')
-
 # Set agent_config_key to the AI Agent Config key you want to evaluate.
 agent_config_key = os.getenv('LAUNCHDARKLY_AGENT_KEY', 'sample-agent')
 
+# Set AGENT_STREAM=true to print text and tool calls as they happen.
+stream_response = os.getenv('AGENT_STREAM', 'false').lower() in ('1', 'true', 'yes')
+
+# Set AGENT_WARM_POOL=true to prebuild the agent at startup instead of on the request path.
+use_warm_pool = os.getenv('AGENT_WARM_POOL', 'false').lower() in ('1', 'true', 'yes')
+
+# Set AGENT_TIMEOUT_MS to abandon the request, including in-flight model and
+# tool calls, once this many milliseconds have passed.
+timeout_ms = int(os.getenv('AGENT_TIMEOUT_MS', '0'))
+
 
 def get_weather(city: str) -> str:
     """Get the weather for a given city."""
     return f"The weather in {city} is sunny."
 
 
-async def async_main():
-    if not sdk_key:
-        print("*** Please set the LAUNCHDARKLY_SDK_KEY env first")
-        exit()
+async def stream_agent_response(agent: StreamingAgent, question: str):
+    """Print streamed text and tool events, then return the final ManagedResult."""
+    print("\nAgent response:")
+    async for event in agent.stream(question):
+        if isinstance(event, TextDelta):
+            print(event.text, end="", flush=True)
+        elif isinstance(event, ToolCallStarted):
+            print(f"\n[tool {event.tool_name} started at {event.elapsed_ms}ms]", flush=True)
+        elif isinstance(event, ToolCallFinished):
+            print(f"[tool {event.tool_name} finished in {event.duration_ms}ms]", flush=True)
+        elif isinstance(event, StreamCompleted):
+            print()
+            return event.result
 
-    ldclient.set_config(Config(sdk_key, plugins=[
-        ObservabilityPlugin(ObservabilityConfig(
-            service_name='hello-python-ai-managed-agent',
-        ))
-    ]))
 
-    if not ldclient.get().is_initialized():
-        print("*** SDK failed to initialize. Please check your internet connection and SDK credential for any typo.")
-        exit()
-
-    aiclient = LDAIClient(ldclient.get())
-    print("*** SDK successfully initialized")
+async def async_main():
+    aiclient = bootstrap('hello-python-ai-managed-agent').aiclient
 
     # Set up the evaluation context. This context should appear on your
     # LaunchDarkly contexts dashboard soon after you run the demo.
@@ -64,11 +74,25 @@ async def async_main():
         #       instructions='You are a helpful weather assistant.',
         #   )
         #   agent = aiclient.create_agent(agent_config_key, context, tools={'get_weather': get_weather}, default=default)
-        agent = aiclient.create_agent(
-            agent_config_key,
-            context,
-            tools={'get_weather': get_weather},
-        )
+        tools = deadline_tools({'get_weather': get_weather})
+        if use_warm_pool:
+            # In a service, warm the pool once at startup for your hot configs and contexts.
+            pool = AgentPool(aiclient, ldclient.get(), tools=tools)
+            warm_up_ms = await pool.warm_up([context], agent_keys=[agent_config_key])
+            pool.start_background_refresh()
+            print(f"*** Agent pool warmed in {warm_up_ms:.0f}ms")
+
+        start = time.perf_counter()
+        if use_warm_pool:
+            agent = await pool.get_agent(agent_config_key, context)
+        else:
+            agent = aiclient.create_agent(
+                agent_config_key,
+                context,
+                tools=tools,
+            )
+        creation_ms = (time.perf_counter() - start) * 1000
+        print(f"*** Agent ready in {creation_ms:.2f}ms ({'warm' if use_warm_pool else 'cold'})")
 
         if not agent:
             print(f"AI config '{agent_config_key}' is disabled. Verify the config key exists in your LaunchDarkly project and is not targeting a disabled variation.")
@@ -78,13 +102,28 @@ async def async_main():
         print(f'\nSending sample question: "{sample_question}"')
         print("Waiting for response...")
 
-        agent_response = await agent.run(sample_question)
-        print(f"\nAgent response:\n{agent_response.content}")
+        # The deadline covers the whole request, including agent creation above.
+        deadline = Deadline(timeout_ms - int(creation_ms)) if timeout_ms > 0 else None
+        try:
+            if stream_response:
+                agent_response = await run_with_deadline(
+                    lambda: stream_agent_response(StreamingAgent(agent, tools), sample_question),
+                    deadline,
+                )
+            else:
+                agent_response = await run_with_deadline(lambda: agent.run(sample_question), deadline)
+                print(f"\nAgent response:\n{agent_response.content}")
+        except DeadlineExceeded:
+            track_cancelled(ldclient.get(), context, deadline.elapsed_ms(), config=agent.get_config())
+            print(f"\n*** Request cancelled after {timeout_ms}ms deadline")
+            return
 
         summary = agent_response.metrics
         print("\nMetrics tracked:")
         print(f"  Duration:      {summary.duration_ms}ms")
         print(f"  Success:       {summary.success}")
+        if summary.time_to_first_token is not None:
+            print(f"  Time to first token: {summary.time_to_first_token}ms")
         if summary.tokens:
             print(f"  Input tokens:  {summary.tokens.input}")
             print(f"  Output tokens: {summary.tokens.output}")
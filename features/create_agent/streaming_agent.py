@@ -0,0 +1,286 @@
+"""Streaming runs for a LaunchDarkly managed agent."""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from ldai import JudgeResult, ManagedAgent, ManagedResult, ToolRegistry, log
+from ldai.tracker import LDAIConfigTracker, TokenUsage
+
+
+@dataclass
+class TextDelta:
+    """A chunk of assistant text, forwarded as soon as the provider emits it."""
+
+    text: str
+    elapsed_ms: int
+    """Milliseconds since the run started."""
+
+
+@dataclass
+class ToolCallStarted:
+    """The agent has started a tool call."""
+
+    tool_name: str
+    call_id: str
+    elapsed_ms: int
+    """Milliseconds since the run started."""
+
+
+@dataclass
+class ToolCallFinished:
+    """A tool call has returned its output to the agent."""
+
+    tool_name: str
+    call_id: str
+    elapsed_ms: int
+    """Milliseconds since the run started."""
+    duration_ms: int
+    """Time between the matching :class:`ToolCallStarted` and this event."""
+
+
+@dataclass
+class StreamCompleted:
+    """The final event of a stream, equivalent to the result of ``agent.run``."""
+
+    result: ManagedResult
+    """Content, tracker summary (including time to first token) and evaluations."""
+
+
+AgentStreamEvent = Union[TextDelta, ToolCallStarted, ToolCallFinished, StreamCompleted]
+
+
+@dataclass
+class _StreamState:
+    start_ns: int
+    content: List[str] = field(default_factory=list)
+    tokens: Optional[TokenUsage] = None
+    tool_calls: List[str] = field(default_factory=list)
+    tool_starts: Dict[str, int] = field(default_factory=dict)
+    tool_names: Dict[str, str] = field(default_factory=dict)
+    first_token_ms: Optional[int] = None
+
+    def elapsed_ms(self) -> int:
+        return (time.perf_counter_ns() - self.start_ns) // 1_000_000
+
+    def new_turn(self) -> None:
+        # The result's content is the final turn's text, as for a non-streaming run.
+        self.content = []
+
+    def text(self, text: str) -> TextDelta:
+        elapsed = self.elapsed_ms()
+        if self.first_token_ms is None:
+            self.first_token_ms = elapsed
+        self.content.append(text)
+        return TextDelta(text=text, elapsed_ms=elapsed)
+
+    def tool_started(self, tool_name: str, call_id: str) -> ToolCallStarted:
+        elapsed = self.elapsed_ms()
+        self.tool_starts[call_id] = elapsed
+        self.tool_names[call_id] = tool_name
+        self.tool_calls.append(tool_name)
+        return ToolCallStarted(tool_name=tool_name, call_id=call_id, elapsed_ms=elapsed)
+
+    def tool_finished(self, call_id: str) -> ToolCallFinished:
+        elapsed = self.elapsed_ms()
+        started = self.tool_starts.pop(call_id, elapsed)
+        return ToolCallFinished(
+            tool_name=self.tool_names.get(call_id, ''),
+            call_id=call_id,
+            elapsed_ms=elapsed,
+            duration_ms=elapsed - started,
+        )
+
+
+class StreamingAgent:
+    """
+    Adds a streaming interface to a :class:`~ldai.ManagedAgent`.
+
+    ``stream`` yields text deltas and tool-call events while the agent runs,
+    then a :class:`StreamCompleted` event carrying the same
+    :class:`~ldai.ManagedResult` that ``agent.run`` would return. Metrics are
+    tracked on the agent config's tracker, including time to first token.
+
+    Streaming is supported for the OpenAI (``openai-agents``) and LangChain
+    agent runners. With any other runner, ``stream`` runs the agent without
+    streaming and yields only the :class:`StreamCompleted` event. On every
+    path, the result's content is the text of the agent's final turn.
+    ``run`` delegates to the wrapped agent unchanged.
+    """
+
+    def __init__(self, agent: ManagedAgent, tools: Optional[ToolRegistry] = None):
+        """
+        Initialize the streaming agent.
+
+        :param agent: The managed agent returned by ``create_agent``.
+        :param tools: The tool registry passed to ``create_agent``. The OpenAI
+            runner has no streaming method, so the agent is built again from
+            the config with the public openai-agents API, and needs the callables.
+        """
+        self._agent = agent
+        self._tools = tools or {}
+
+    async def run(self, input: str) -> ManagedResult:
+        """Run the agent without streaming. See ``ManagedAgent.run``."""
+        return await self._agent.run(input)
+
+    async def stream(self, input: str) -> AsyncIterator[AgentStreamEvent]:
+        """
+        Run the agent and yield events as they happen.
+
+        :param input: The user prompt or input to the agent
+        :return: Async iterator of :data:`AgentStreamEvent`; the last event is
+            always :class:`StreamCompleted` unless the run raises.
+        """
+        state = _StreamState(start_ns=time.perf_counter_ns())
+        events = self._provider_events(input, state)
+        if events is None:
+            yield StreamCompleted(result=await self._agent.run(input))
+            return
+
+        tracker = self._agent.get_config().create_tracker()
+        try:
+            async for event in events:
+                yield event
+        except Exception:
+            tracker.track_duration(state.elapsed_ms())
+            tracker.track_error()
+            raise
+
+        if state.first_token_ms is not None:
+            tracker.track_time_to_first_token(state.first_token_ms)
+        tracker.track_duration(state.elapsed_ms())
+        if state.tokens:
+            tracker.track_tokens(state.tokens)
+        if state.tool_calls:
+            tracker.track_tool_calls(state.tool_calls)
+        tracker.track_success()
+
+        content = ''.join(state.content)
+        yield StreamCompleted(result=ManagedResult(
+            content=content,
+            metrics=tracker.get_summary(),
+            evaluations=self._track_judge_results(tracker, input, content),
+        ))
+
+    def _provider_events(self, input: str, state: _StreamState) -> Optional[AsyncIterator[AgentStreamEvent]]:
+        runner = self._agent.get_agent_runner()
+        try:
+            from ldai_langchain import LangChainAgentRunner
+            if isinstance(runner, LangChainAgentRunner):
+                return self._stream_langchain(runner.get_agent(), input, state)
+        except ImportError:
+            pass
+        try:
+            from ldai_openai import OpenAIAgentRunner
+            if isinstance(runner, OpenAIAgentRunner):
+                return self._stream_openai(input, state)
+        except ImportError:
+            pass
+        log.debug(f'Streaming is not supported for {type(runner).__name__}; running without streaming')
+        return None
+
+    async def _stream_langchain(
+        self, agent: Any, input: str, state: _StreamState
+    ) -> AsyncIterator[AgentStreamEvent]:
+        from ldai_langchain import get_ai_usage_from_response
+
+        input_tokens = output_tokens = total_tokens = 0
+        async for event in agent.astream_events(
+            {'messages': [{'role': 'user', 'content': str(input)}]},
+            version='v2',
+        ):
+            kind = event['event']
+            if kind == 'on_chat_model_start':
+                state.new_turn()
+            elif kind == 'on_chat_model_stream':
+                chunk = event['data'].get('chunk')
+                text = getattr(chunk, 'content', None)
+                if isinstance(text, str) and text:
+                    yield state.text(text)
+            elif kind == 'on_chat_model_end':
+                usage = get_ai_usage_from_response(event['data'].get('output'))
+                if usage:
+                    input_tokens += usage.input
+                    output_tokens += usage.output
+                    total_tokens += usage.total
+            elif kind == 'on_tool_start':
+                yield state.tool_started(event['name'], event['run_id'])
+            elif kind == 'on_tool_end':
+                yield state.tool_finished(event['run_id'])
+
+        if total_tokens or input_tokens or output_tokens:
+            state.tokens = TokenUsage(total=total_tokens, input=input_tokens, output=output_tokens)
+
+    async def _stream_openai(self, input: str, state: _StreamState) -> AsyncIterator[AgentStreamEvent]:
+        from agents import Agent, ModelSettings, Runner, function_tool
+        from ldai_openai import get_ai_usage_from_response
+
+        config = self._agent.get_config()
+        parameters = dict(config.model.to_dict().get('parameters') or {}) if config.model else {}
+        tool_definitions = parameters.pop('tools', []) or []
+
+        agent_tools = []
+        tool_name_map: Dict[str, str] = {}
+        for td in tool_definitions:
+            name = td.get('name', '') if isinstance(td, dict) else ''
+            tool_fn = self._tools.get(name)
+            if not tool_fn:
+                continue
+            # Plain functions become function tools; tool instances from openai-agents are used as they are.
+            tool = function_tool(tool_fn) if callable(tool_fn) else tool_fn
+            tool_name_map[getattr(tool, 'name', name)] = name
+            agent_tools.append(tool)
+
+        known = {'temperature', 'top_p', 'max_tokens', 'frequency_penalty', 'presence_penalty'}
+        agent = Agent(
+            name='ldai-agent',
+            instructions=config.instructions or None,
+            model=config.model.name if config.model else None,
+            tools=agent_tools,
+            model_settings=ModelSettings(**{k: v for k, v in parameters.items() if k in known}),
+        )
+
+        result = Runner.run_streamed(agent, str(input), max_turns=25)
+        async for event in result.stream_events():
+            if event.type == 'raw_response_event':
+                kind = getattr(event.data, 'type', None)
+                if kind == 'response.created':
+                    state.new_turn()
+                elif kind == 'response.output_text.delta':
+                    yield state.text(event.data.delta)
+            elif event.type == 'run_item_stream_event':
+                raw = event.item.raw_item
+                call_id = getattr(raw, 'call_id', None) or (raw.get('call_id') if isinstance(raw, dict) else '')
+                if event.name == 'tool_called':
+                    raw_name = getattr(raw, 'name', None) or getattr(raw, 'type', '')
+                    yield state.tool_started(tool_name_map.get(raw_name, raw_name), call_id)
+                elif event.name == 'tool_output':
+                    yield state.tool_finished(call_id)
+
+        state.tokens = get_ai_usage_from_response(result)
+
+    def _track_judge_results(
+        self,
+        tracker: LDAIConfigTracker,
+        input_text: str,
+        output_text: str,
+    ) -> asyncio.Task:
+        evaluator_task = self._agent.get_config().evaluator.evaluate(input_text, output_text)
+
+        async def _run_and_track() -> List[JudgeResult]:
+            results = await evaluator_task
+            for r in results:
+                if not r.sampled:
+                    continue
+                if r.success:
+                    try:
+                        tracker.track_judge_result(r)
+                    except Exception as exc:
+                        log.warning("Judge evaluation failed: %s", exc)
+                else:
+                    log.warning("Judge evaluation failed: %s", r.error_message)
+            return results
+
+        return asyncio.create_task(_run_and_track())
@@ -4,21 +4,47 @@ from dotenv import load_dotenv
 import asyncio
 import ldclient
 from ldclient import Context
-from ldclient.config import Config
-from ldai import LDAIClient
-from ldobserve import ObservabilityConfig, ObservabilityPlugin
+from ldai import ManagedAgentGraph
+from ld_bootstrap import bootstrap
+from parallel_graph_runner import ParallelAgentGraphRunner, ParallelGraphOutput
+from graph_trace import GraphProfile, ToolTimer
+from graph_budget import GraphBudget
+from ld_deadline import Deadline, DeadlineExceeded, deadline_tools, run_with_deadline, track_cancelled
 
 load_dotenv()
 
 logging.basicConfig()
 logging.getLogger('ldclient').setLevel(logging.WARNING)
 
-# Set sdk_key to your LaunchDarkly SDK key.
-sdk_key = os.getenv('LAUNCHDARKLY_SDK_KEY')
-
 # Set graph_key to the Agent Graph key you want to evaluate.
 graph_key = os.getenv('LAUNCHDARKLY_AGENT_GRAPH_KEY', 'sample-agent-graph')
 
+# Set AGENT_GRAPH_PARALLELISM to use ParallelAgentGraphRunner, which runs
+# independent nodes and tool calls concurrently with at most this many
+# running at once, and enforces the budgets below.
+graph_parallelism = int(os.getenv('AGENT_GRAPH_PARALLELISM', '0'))
+
+
+def _optional_int(name: str):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+# Set any of these to bound each run. An over-budget run stops early and
+# returns a partial result. Budgets need AGENT_GRAPH_PARALLELISM.
+graph_budget = GraphBudget(
+    max_tokens=_optional_int('AGENT_GRAPH_MAX_TOKENS'),
+    max_wall_ms=_optional_int('AGENT_GRAPH_MAX_WALL_MS'),
+    max_node_hops=_optional_int('AGENT_GRAPH_MAX_NODE_HOPS'),
+)
+
+# Set AGENT_GRAPH_TIMEOUT_MS to abandon the request, including in-flight
+# model and tool calls, once this many milliseconds have passed.
+timeout_ms = int(os.getenv('AGENT_GRAPH_TIMEOUT_MS', '0'))
+
+# Set AGENT_GRAPH_TRACE_PATH to write the run as a Chrome trace-event file.
+trace_path = os.getenv('AGENT_GRAPH_TRACE_PATH')
+
 
 def search_flights(destination: str, date: str) -> str:
     """Search for available flights to a destination on a given date."""
@@ -36,22 +62,7 @@ def get_weather(city: str) -> str:
 
 
 async def async_main():
-    if not sdk_key:
-        print("*** Please set the LAUNCHDARKLY_SDK_KEY env first")
-        exit()
-
-    ldclient.set_config(Config(sdk_key, plugins=[
-        ObservabilityPlugin(ObservabilityConfig(
-            service_name='hello-python-ai-managed-agent-graph',
-        ))
-    ]))
-
-    if not ldclient.get().is_initialized():
-        print("*** SDK failed to initialize. Please check your internet connection and SDK credential for any typo.")
-        exit()
-
-    aiclient = LDAIClient(ldclient.get())
-    print("*** SDK successfully initialized")
+    aiclient = bootstrap('hello-python-ai-managed-agent-graph').aiclient
 
     # Set up the evaluation context.
     context = (
@@ -63,15 +74,31 @@ async def async_main():
     )
 
     try:
-        graph = aiclient.create_agent_graph(
-            graph_key,
-            context,
-            tools={
-                'search_flights': search_flights,
-                'search_hotels': search_hotels,
-                'get_weather': get_weather,
-            },
-        )
+        tool_timer = ToolTimer()
+        tools = tool_timer.wrap(deadline_tools({
+            'search_flights': search_flights,
+            'search_hotels': search_hotels,
+            'get_weather': get_weather,
+        }))
+        graph_definition = None
+        if graph_parallelism > 0:
+            graph_definition = aiclient.agent_graph(graph_key, context)
+            graph = None
+            if graph_definition.enabled:
+                graph = ManagedAgentGraph(
+                    graph_definition,
+                    ParallelAgentGraphRunner(
+                        graph_definition,
+                        tools,
+                        max_parallelism=graph_parallelism,
+                        budget=graph_budget,
+                    ),
+                )
+        else:
+            if not graph_budget.is_unlimited:
+                print("Warning: run budgets are only enforced by the parallel runner. "
+                      "Set AGENT_GRAPH_PARALLELISM to 1 or more to apply them.")
+            graph = aiclient.create_agent_graph(graph_key, context, tools=tools)
 
         if not graph:
             print(f"AI config '{graph_key}' is disabled. Verify the config key exists in your LaunchDarkly project and is not targeting a disabled variation.")
@@ -81,8 +108,17 @@ async def async_main():
         print(f'\nSending sample question: "{sample_question}"')
         print("Waiting for response...")
 
-        result = await graph.run(sample_question)
+        tool_timer.reset()
+        deadline = Deadline(timeout_ms) if timeout_ms > 0 else None
+        try:
+            result = await run_with_deadline(lambda: graph.run(sample_question), deadline)
+        except DeadlineExceeded:
+            track_cancelled(ldclient.get(), context, deadline.elapsed_ms(), graph_key=graph_key)
+            print(f"\n*** Request cancelled after {timeout_ms}ms deadline")
+            return
         print(f"\nGraph response:\n{result.content}")
+        if isinstance(result.raw, ParallelGraphOutput) and result.raw.stop_reason:
+            print(f"\n*** Run stopped early ({result.raw.stop_reason}); the response is partial.")
 
         summary = result.metrics
         print("\nGraph metrics:")
@@ -111,6 +147,25 @@ async def async_main():
                     print(f"    Total tokens:  {node_summary.tokens.total}")
                 if node_summary.tool_calls:
                     print(f"    Tool calls:    {', '.join(node_summary.tool_calls)}")
+                if isinstance(result.raw, ParallelGraphOutput) and node_key in result.raw.node_metrics:
+                    node_run = result.raw.node_metrics[node_key]
+                    print(f"    Start offset:  {node_run.start_offset_ms}ms")
+                    print(f"    End offset:    {node_run.end_offset_ms}ms")
+
+        if summary.node_metrics:
+            node_offsets = None
+            run_start_ms = 0.0
+            if isinstance(result.raw, ParallelGraphOutput):
+                node_offsets = {
+                    key: (m.start_offset_ms, m.end_offset_ms)
+                    for key, m in result.raw.node_metrics.items()
+                }
+                run_start_ms = tool_timer.offset_ms(result.raw.started_ns)
+            profile = GraphProfile(summary, node_offsets, tool_timer.spans, graph_definition, run_start_ms)
+            print(f"\n{profile.critical_path_report()}")
+            if trace_path:
+                profile.write_chrome_trace(trace_path)
+                print(f"\nChrome trace written to {trace_path}")
 
         if result.evaluations is not None:
             eval_results = await result.evaluations
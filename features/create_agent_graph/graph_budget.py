@@ -0,0 +1,148 @@
+"""Token, wall-time and node-hop budgets for agent graph runs."""
+
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+
+STOP_MAX_TOKENS = 'max_tokens'
+"""The run used at least ``GraphBudget.max_tokens`` tokens."""
+
+STOP_MAX_WALL_TIME = 'max_wall_time'
+"""The run took longer than ``GraphBudget.max_wall_ms``."""
+
+STOP_MAX_NODE_HOPS = 'max_node_hops'
+"""The run started ``GraphBudget.max_node_hops`` nodes."""
+
+BUDGET_EXHAUSTED_TOOL_OUTPUT = (
+    'The budget for this request is exhausted. Do not call any more tools; '
+    'answer with the information you already have.'
+)
+"""Returned to the model instead of running a tool once the budget is spent."""
+
+CHARS_PER_TOKEN = 4
+"""Rough characters per token, used to estimate the cost of a model call."""
+
+
+@dataclass
+class GraphBudget:
+    """Limits for a single graph run. ``None`` means unlimited."""
+
+    max_tokens: Optional[int] = None
+    """Maximum total tokens across all nodes."""
+
+    max_wall_ms: Optional[int] = None
+    """Maximum wall-clock time of the run in milliseconds."""
+
+    max_node_hops: Optional[int] = None
+    """Maximum number of nodes started during the run."""
+
+    @property
+    def is_unlimited(self) -> bool:
+        return self.max_tokens is None and self.max_wall_ms is None and self.max_node_hops is None
+
+
+class BudgetTracker:
+    """
+    Running totals of a graph run, checked against a :class:`GraphBudget`.
+
+    Node runners only report token usage when the node finishes, so each
+    model call is charged an estimate as it completes: the size of the
+    node's prompt plus the tool results returned so far, in tokens. A call
+    is seen completing when the tool calls it requested start. Calls that
+    start in the same event loop iteration, or while another call of the
+    node is running, were requested together and are charged once. When the
+    node finishes, its estimates are replaced by the usage it reports. Wall
+    time is measured from creation.
+    """
+
+    def __init__(self, budget: GraphBudget):
+        self.budget = budget
+        self.tokens = 0
+        self.node_hops = 0
+        self.stop_reason: Optional[str] = None
+        self._start_ns = time.perf_counter_ns()
+        self._context_chars: Dict[str, int] = {}
+        self._estimated: Dict[str, int] = {}
+        self._tool_calls_in_flight: Dict[str, int] = {}
+        self._charged_this_iteration: Set[str] = set()
+
+    def elapsed_ms(self) -> int:
+        return (time.perf_counter_ns() - self._start_ns) // 1_000_000
+
+    def remaining_ms(self) -> Optional[int]:
+        """Milliseconds left before the wall-time budget runs out, or ``None``."""
+        if self.budget.max_wall_ms is None:
+            return None
+        return max(self.budget.max_wall_ms - self.elapsed_ms(), 0)
+
+    def begin_node(self, node_key: str, prompt: str) -> None:
+        """Start estimating the model calls of ``node_key``, whose input is ``prompt``."""
+        self._context_chars[node_key] = len(prompt)
+        self._estimated[node_key] = 0
+        self._tool_calls_in_flight[node_key] = 0
+
+    def start_tool_call(self, node_key: Optional[str]) -> None:
+        """Charge the model call that requested this tool call, unless already charged."""
+        if node_key not in self._context_chars:
+            return
+        if self._tool_calls_in_flight[node_key] == 0 and node_key not in self._charged_this_iteration:
+            estimate = math.ceil(self._context_chars[node_key] / CHARS_PER_TOKEN)
+            self._estimated[node_key] += estimate
+            self.tokens += estimate
+            # Tasks started together run in the same loop iteration, before this callback.
+            self._charged_this_iteration.add(node_key)
+            asyncio.get_running_loop().call_soon(self._charged_this_iteration.discard, node_key)
+        self._tool_calls_in_flight[node_key] += 1
+
+    def end_tool_call(self, node_key: Optional[str], output: Any) -> None:
+        """Add the tool's output to the context of the node's next model call."""
+        if node_key not in self._context_chars:
+            return
+        self._tool_calls_in_flight[node_key] -= 1
+        self._context_chars[node_key] += len(str(output)) if output is not None else 0
+
+    def finish_node(self, node_key: str, total_tokens: Optional[int]) -> None:
+        """
+        Replace the node's estimated tokens with its reported usage.
+
+        :param total_tokens: Tokens the node reported, or ``None`` to keep the estimate.
+        """
+        estimated = self._estimated.pop(node_key, 0)
+        self._context_chars.pop(node_key, None)
+        self._tool_calls_in_flight.pop(node_key, None)
+        if total_tokens is not None:
+            self.tokens += total_tokens - estimated
+
+    def exceeded(self) -> Optional[str]:
+        """
+        Check the running token and wall-time totals against the budget.
+
+        Node hops are not checked here, since they only stop new nodes from
+        starting. The first limit found exceeded is kept as :attr:`stop_reason`.
+
+        :return: The exceeded limit, or ``None`` if tokens and time remain.
+        """
+        reason = None
+        if self.budget.max_tokens is not None and self.tokens >= self.budget.max_tokens:
+            reason = STOP_MAX_TOKENS
+        elif self.budget.max_wall_ms is not None and self.elapsed_ms() >= self.budget.max_wall_ms:
+            reason = STOP_MAX_WALL_TIME
+        if reason is not None and self.stop_reason is None:
+            self.stop_reason = reason
+        return reason
+
+    def try_start_node(self) -> bool:
+        """
+        Count a node hop if the run is still within budget.
+
+        :return: ``True`` if the node may start.
+        """
+        if self.exceeded():
+            return False
+        if self.budget.max_node_hops is not None and self.node_hops >= self.budget.max_node_hops:
+            self.stop_reason = self.stop_reason or STOP_MAX_NODE_HOPS
+            return False
+        self.node_hops += 1
+        return True
@@ -0,0 +1,347 @@
+"""Chrome trace export and critical-path analysis for agent graph runs."""
+
+import asyncio
+import functools
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ldai import AgentGraphDefinition, AIGraphMetricSummary, ToolRegistry
+
+from parallel_graph_runner import current_node_key
+
+
+@dataclass
+class ToolSpan:
+    """A single tool call, as offsets from the timer origin."""
+
+    tool_name: str
+    start_ms: float
+    end_ms: float
+    node_key: Optional[str] = None
+    """Node that made the call, when the runner reports it (see ``current_node_key``)."""
+
+    @property
+    def duration_ms(self) -> float:
+        return self.end_ms - self.start_ms
+
+
+class ToolTimer:
+    """
+    Records the wall-clock span of every tool call.
+
+    Wrap the tool registry before creating the graph, and call :meth:`reset`
+    right before ``graph.run`` so offset zero is the start of the run. Calls
+    made under :class:`~parallel_graph_runner.ParallelAgentGraphRunner` also
+    record the node that made them.
+    """
+
+    def __init__(self):
+        self.spans: List[ToolSpan] = []
+        self._origin_ns = time.perf_counter_ns()
+
+    def reset(self) -> None:
+        """Clear recorded spans and restart the clock at zero."""
+        self.spans = []
+        self._origin_ns = time.perf_counter_ns()
+
+    def wrap(self, tools: ToolRegistry) -> ToolRegistry:
+        """
+        Return a registry whose callables record their spans on this timer.
+
+        :param tools: Registry mapping tool names to callables.
+        :return: Registry with the same names and signatures.
+        """
+        return {name: self._wrap_tool(name, tool) for name, tool in tools.items()}
+
+    def offset_ms(self, perf_counter_ns: Optional[int] = None) -> float:
+        """
+        Convert a ``time.perf_counter_ns()`` reading to an offset on this timer.
+
+        :param perf_counter_ns: The reading, or ``None`` for now.
+        :return: Milliseconds since the last :meth:`reset`.
+        """
+        if perf_counter_ns is None:
+            perf_counter_ns = time.perf_counter_ns()
+        return (perf_counter_ns - self._origin_ns) / 1_000_000
+
+    def _wrap_tool(self, name: str, tool: Any) -> Any:
+        if not callable(tool):
+            return tool
+
+        if asyncio.iscoroutinefunction(tool):
+            @functools.wraps(tool)
+            async def timed_async(*args, **kwargs):
+                start = self.offset_ms()
+                try:
+                    return await tool(*args, **kwargs)
+                finally:
+                    self.spans.append(ToolSpan(name, start, self.offset_ms(), current_node_key.get()))
+            return timed_async
+
+        @functools.wraps(tool)
+        def timed(*args, **kwargs):
+            start = self.offset_ms()
+            try:
+                return tool(*args, **kwargs)
+            finally:
+                self.spans.append(ToolSpan(name, start, self.offset_ms(), current_node_key.get()))
+        return timed
+
+
+@dataclass
+class NodeProfile:
+    """Timing and token breakdown for one node of a graph run."""
+
+    node_key: str
+    start_ms: float
+    end_ms: float
+    total_tokens: int = 0
+    tool_spans: List[ToolSpan] = field(default_factory=list)
+
+    @property
+    def duration_ms(self) -> float:
+        return self.end_ms - self.start_ms
+
+    @property
+    def tool_ms(self) -> float:
+        """Time during which at least one tool call made by this node was running."""
+        total = 0.0
+        covered_to = float('-inf')
+        for span in sorted(self.tool_spans, key=lambda s: s.start_ms):
+            start = max(span.start_ms, covered_to)
+            if span.end_ms > start:
+                total += span.end_ms - start
+                covered_to = span.end_ms
+        return total
+
+    @property
+    def self_ms(self) -> float:
+        """Time spent in the node itself, mostly waiting on the model."""
+        return max(self.duration_ms - self.tool_ms, 0.0)
+
+
+class GraphProfile:
+    """
+    Timeline of a graph run built from its metric summary.
+
+    Times are offsets on the :class:`ToolTimer` clock, so nodes and tool
+    calls share one timeline. Node start and end times come from
+    ``node_offsets`` when the runner reports them (see
+    ``ParallelGraphOutput``), and tool calls are attributed to the node that
+    made them. Otherwise nodes are laid out one after another in
+    ``summary.path`` order from ``run_start_ms``, which matches how the
+    provider runners execute the graph: tool calls are matched to nodes in
+    that order using each node's recorded tool calls, and a node is moved or
+    stretched to cover the calls it made.
+    """
+
+    def __init__(
+        self,
+        summary: AIGraphMetricSummary,
+        node_offsets: Optional[Dict[str, Tuple[Optional[int], Optional[int]]]] = None,
+        tool_spans: Optional[List[ToolSpan]] = None,
+        graph: Optional[AgentGraphDefinition] = None,
+        run_start_ms: float = 0.0,
+    ):
+        """
+        Build the profile.
+
+        :param summary: ``result.metrics`` from ``graph.run``.
+        :param node_offsets: Optional ``{node_key: (start_ms, end_ms)}``.
+        :param tool_spans: Optional spans from a :class:`ToolTimer`.
+        :param graph: Optional graph definition. When given, the critical path
+            follows the graph's edges; otherwise it is ``summary.path``.
+        :param run_start_ms: Start of the run on the tool timer's clock, which
+            is also the origin of ``node_offsets``. Use
+            ``tool_timer.offset_ms(result.raw.started_ns)`` with
+            ``ParallelAgentGraphRunner``; the default of zero fits a timer
+            reset right before ``graph.run``.
+        """
+        self.summary = summary
+        self._graph = graph
+        self.nodes: Dict[str, NodeProfile] = {}
+        spans = sorted(tool_spans or [], key=lambda span: span.start_ms)
+
+        order = list(summary.path) + [k for k in summary.node_metrics if k not in summary.path]
+        attributed = self._attribute_in_order(order, spans) if not node_offsets else {}
+        cursor = run_start_ms
+        for key in order:
+            node_summary = summary.node_metrics.get(key)
+            duration = (node_summary.duration_ms if node_summary else None) or 0
+            start, end = (node_offsets or {}).get(key, (None, None))
+            if start is not None and end is not None:
+                start, end = run_start_ms + start, run_start_ms + end
+            else:
+                start = cursor
+                own = attributed.get(key)
+                end = start + duration
+                if own:
+                    # The layout only estimates where the node began, while
+                    # its tool calls have real timestamps. Move the node so it
+                    # ends no earlier than its last call, and stretch it if it
+                    # still does not cover them all.
+                    calls_start = own[0].start_ms
+                    calls_end = max(span.end_ms for span in own)
+                    start = min(max(start, calls_end - duration), calls_start)
+                    end = max(start + duration, calls_end)
+            cursor = max(cursor, end)
+            tokens = node_summary.tokens.total if node_summary and node_summary.tokens else 0
+            self.nodes[key] = NodeProfile(key, float(start), float(end), tokens)
+
+        owner_keys = {id(span): key for key, own in attributed.items() for span in own}
+        for span in spans:
+            owner_key = span.node_key if span.node_key in self.nodes else owner_keys.get(id(span))
+            owner = self.nodes[owner_key] if owner_key is not None else self._owner_of(span)
+            if owner is not None:
+                owner.tool_spans.append(span)
+
+    @property
+    def total_tokens(self) -> int:
+        if self.summary.tokens:
+            return self.summary.tokens.total
+        return sum(node.total_tokens for node in self.nodes.values())
+
+    def token_share(self, node_key: str) -> float:
+        """Fraction of the run's tokens used by ``node_key``."""
+        total = self.total_tokens
+        return self.nodes[node_key].total_tokens / total if total else 0.0
+
+    def critical_path(self) -> List[str]:
+        """
+        Return the longest chain of dependent nodes by duration.
+
+        :return: Node keys from the first to the last node on the path.
+        """
+        order = sorted(self.nodes, key=lambda k: self.nodes[k].start_ms)
+        if self._graph is None:
+            return [k for k in self.summary.path if k in self.nodes] or order
+
+        longest: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+        for key in order:
+            parents = [
+                p.get_key() for p in self._graph.get_parent_nodes(key)
+                if p.get_key() in longest
+            ]
+            best = max(parents, key=lambda p: longest[p], default=None)
+            longest[key] = self.nodes[key].duration_ms + (longest[best] if best else 0.0)
+            previous[key] = best
+
+        if not longest:
+            return []
+        path = [max(longest, key=lambda k: longest[k])]
+        while previous[path[-1]] is not None:
+            path.append(previous[path[-1]])
+        return list(reversed(path))
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        Render the run in the Chrome trace-event format.
+
+        Load the JSON in ``chrome://tracing`` or https://ui.perfetto.dev.
+        Overlapping nodes are placed on separate rows; tool calls are nested
+        under the node that made them.
+
+        :return: Trace document with a ``traceEvents`` list.
+        """
+        events: List[Dict[str, Any]] = []
+        lane_ends: List[float] = []
+        critical = set(self.critical_path())
+
+        for node in sorted(self.nodes.values(), key=lambda n: n.start_ms):
+            lane = next((i for i, end in enumerate(lane_ends) if end <= node.start_ms), len(lane_ends))
+            if lane == len(lane_ends):
+                lane_ends.append(node.end_ms)
+            else:
+                lane_ends[lane] = node.end_ms
+
+            events.append({
+                'name': node.node_key,
+                'cat': 'node',
+                'ph': 'X',
+                'ts': node.start_ms * 1000,
+                'dur': node.duration_ms * 1000,
+                'pid': 1,
+                'tid': lane,
+                'args': {
+                    'tokens': node.total_tokens,
+                    'token_share': round(self.token_share(node.node_key), 4),
+                    'self_ms': node.self_ms,
+                    'tool_ms': node.tool_ms,
+                    'critical_path': node.node_key in critical,
+                },
+            })
+            for span in node.tool_spans:
+                events.append({
+                    'name': span.tool_name,
+                    'cat': 'tool',
+                    'ph': 'X',
+                    'ts': span.start_ms * 1000,
+                    'dur': span.duration_ms * 1000,
+                    'pid': 1,
+                    'tid': lane,
+                })
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path: str) -> None:
+        """Write :meth:`to_chrome_trace` to ``path`` as JSON."""
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f, indent=2)
+
+    def critical_path_report(self) -> str:
+        """
+        Render a text report of the critical path.
+
+        :return: One line per node on the critical path with its duration,
+            self time, tool time and share of the run's tokens.
+        """
+        path = self.critical_path()
+        total_ms = sum(self.nodes[k].duration_ms for k in path)
+        lines = [
+            f"Critical path: {' -> '.join(path)} ({total_ms:.0f}ms)",
+            f"  {'node':<24} {'duration':>10} {'self':>10} {'tools':>10} {'tokens':>8}",
+        ]
+        for key in path:
+            node = self.nodes[key]
+            lines.append(
+                f"  {key:<24} {node.duration_ms:>8.0f}ms {node.self_ms:>8.0f}ms "
+                f"{node.tool_ms:>8.0f}ms {self.token_share(key):>8.0%}"
+            )
+        return '\n'.join(lines)
+
+    def _attribute_in_order(self, order: List[str], spans: List[ToolSpan]) -> Dict[str, List[ToolSpan]]:
+        """
+        Match tool spans to nodes that ran one after another.
+
+        Spans are taken in time order, and each node in ``order`` claims the
+        next spans whose tool names are among its recorded tool calls. Spans
+        that already name their node, or that no node claims, are left out.
+        """
+        attributed: Dict[str, List[ToolSpan]] = {}
+        pending = [span for span in spans if span.node_key is None]
+        index = 0
+        for key in order:
+            node_summary = self.summary.node_metrics.get(key)
+            remaining = Counter(node_summary.tool_calls or []) if node_summary else Counter()
+            while index < len(pending) and remaining[pending[index].tool_name] > 0:
+                remaining[pending[index].tool_name] -= 1
+                attributed.setdefault(key, []).append(pending[index])
+                index += 1
+        return attributed
+
+    def _owner_of(self, span: ToolSpan) -> Optional[NodeProfile]:
+        candidates = [
+            node for node in self.nodes.values()
+            if node.start_ms <= span.start_ms <= node.end_ms
+        ]
+        if not candidates:
+            return None
+        tool_users = [
+            node for node in candidates
+            if span.tool_name in (self.summary.node_metrics[node.node_key].tool_calls or [])
+        ]
+        return (tool_users or candidates)[0]
@@ -0,0 +1,428 @@
+"""Agent graph runner that executes independent nodes concurrently."""
+
+import asyncio
+import contextvars
+import dataclasses
+import functools
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ldai import AgentGraphDefinition, log
+from ldai.models import AIAgentConfig, ModelConfig
+from ldai.providers import (
+    AgentGraphRunnerResult,
+    AIGraphMetrics,
+    LDAIMetrics,
+    Runner,
+    RunnerFactory,
+    ToolRegistry,
+)
+from ldai.tracker import TokenUsage
+
+from graph_budget import (
+    BUDGET_EXHAUSTED_TOOL_OUTPUT,
+    STOP_MAX_WALL_TIME,
+    BudgetTracker,
+    GraphBudget,
+)
+
+# Budget of the run in progress. Tool calls made by a node run in tasks
+# spawned from ``run`` and so see that run's tracker.
+_current_budget: contextvars.ContextVar[Optional[BudgetTracker]] = contextvars.ContextVar(
+    '_current_budget', default=None,
+)
+
+# Key of the node whose runner is executing. Each node runs in its own task,
+# so tool calls see the node that made them, even when nodes overlap.
+current_node_key: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    'current_node_key', default=None,
+)
+
+# Child chosen by each routing node in the run in progress, keyed by the
+# routing node's key.
+_current_handoffs: contextvars.ContextVar[Optional[Dict[str, str]]] = contextvars.ContextVar(
+    '_current_handoffs', default=None,
+)
+
+
+@dataclass
+class NodeRunMetrics(LDAIMetrics):
+    """Node metrics with the node's position on the run's timeline."""
+
+    start_offset_ms: Optional[int] = None
+    """Milliseconds from the start of the graph run until the node started."""
+
+    end_offset_ms: Optional[int] = None
+    """Milliseconds from the start of the graph run until the node finished."""
+
+
+@dataclass
+class ParallelGraphOutput:
+    """Raw output of a parallel graph run, available as ``result.raw``."""
+
+    node_outputs: Dict[str, str] = field(default_factory=dict)
+    """Output content of each node that ran, keyed by node key."""
+
+    node_metrics: Dict[str, NodeRunMetrics] = field(default_factory=dict)
+    """Per-node metrics including start and end offsets."""
+
+    stop_reason: Optional[str] = None
+    """Why the run stopped early (one of the ``graph_budget.STOP_*`` values), or ``None``."""
+
+    started_ns: int = 0
+    """``time.perf_counter_ns()`` at the start of the run, the origin of the node offsets."""
+
+
+def _limit_tool(tool: Any, semaphore: asyncio.Semaphore) -> Any:
+    """
+    Wrap a tool so calls respect ``semaphore`` and sync tools run off the event loop.
+
+    Sync tools would otherwise block the loop, serializing tool calls that the
+    provider issued together. Each call charges the run's budget for the
+    model call that requested it. Once the budget is spent the tool is not
+    called and the model is told to finish instead, which ends tool loops.
+    Native provider tool objects are returned as is.
+    """
+    if not callable(tool):
+        return tool
+
+    async def call_within_budget(call):
+        budget = _current_budget.get()
+        if budget is None:
+            async with semaphore:
+                return await call()
+        node_key = current_node_key.get()
+        budget.start_tool_call(node_key)
+        output = None
+        try:
+            if budget.exceeded() is not None:
+                output = BUDGET_EXHAUSTED_TOOL_OUTPUT
+            else:
+                async with semaphore:
+                    output = await call()
+            return output
+        finally:
+            budget.end_tool_call(node_key, output)
+
+    if asyncio.iscoroutinefunction(tool):
+        @functools.wraps(tool)
+        async def limited_async(*args, **kwargs):
+            return await call_within_budget(lambda: tool(*args, **kwargs))
+        return limited_async
+
+    @functools.wraps(tool)
+    async def limited(*args, **kwargs):
+        return await call_within_budget(lambda: asyncio.to_thread(tool, *args, **kwargs))
+    return limited
+
+
+def _is_parallel_edge(edge: Any) -> bool:
+    return bool((edge.handoff or {}).get('parallel'))
+
+
+def _handoff_tool_name(child_key: str) -> str:
+    return 'transfer_to_' + re.sub(r'\W', '_', child_key)
+
+
+def _make_handoff_tool(source_key: str, child_key: str, description: str) -> Any:
+    """
+    Create a tool that records ``child_key`` as the node to run after ``source_key``.
+
+    Only the first handoff a node makes in a run counts.
+    """
+    async def handoff() -> str:
+        choices = _current_handoffs.get()
+        if choices is not None:
+            choices.setdefault(source_key, child_key)
+        return f'Transferred to {child_key}. Finish your answer; it is passed on to {child_key}.'
+
+    handoff.__name__ = _handoff_tool_name(child_key)
+    handoff.__doc__ = description
+    return handoff
+
+
+def _with_handoff_tools(config: AIAgentConfig, handoff_tools: Dict[str, Any]) -> AIAgentConfig:
+    """Return a copy of ``config`` whose model also offers ``handoff_tools``."""
+    model = config.model.to_dict() if config.model else {'name': ''}
+    parameters = dict(model.get('parameters') or {})
+    parameters['tools'] = list(parameters.get('tools') or []) + [
+        {'name': name, 'type': 'function', 'description': tool.__doc__}
+        for name, tool in handoff_tools.items()
+    ]
+    return dataclasses.replace(
+        config,
+        model=ModelConfig(model['name'], parameters, model.get('custom'), model.get('region')),
+    )
+
+
+class ParallelAgentGraphRunner:
+    """
+    AgentGraphRunner that runs parallel branches of a graph concurrently.
+
+    Edges are handoffs, as with the provider graph runners, unless the edge's
+    handoff data sets ``"parallel": true``:
+
+    - A node with a single plain outgoing edge always continues to that child.
+    - A node with several plain outgoing edges gets a ``transfer_to_<child>``
+      tool per child, and only the first child it transfers to runs. If it
+      does not transfer, its branch ends there.
+    - Every child reached through a parallel edge runs. These are the only
+      edges that fan out, so mark them on nodes whose children are
+      independent, such as a planner that hands the same task to several
+      researchers.
+
+    A node starts once all of its parents have finished or been passed over,
+    and receives the run input followed by the output of each parent that
+    selected it, in graph order. Nodes ready at the same time run
+    concurrently, up to ``max_parallelism`` at a time, and tool calls issued
+    together by a node run concurrently under the same cap. Edges that point
+    back to an earlier node are ignored, so cycles cannot deadlock the run.
+
+    The final content joins, in graph order, the outputs of the nodes that
+    ran and whose selected children did not, so results are deterministic
+    however the nodes interleave. Use with :class:`~ldai.ManagedAgentGraph`
+    to get the usual graph and node tracking.
+
+    An optional :class:`~graph_budget.GraphBudget` bounds each run. Token and
+    node-hop limits are checked before each node starts and before each tool
+    call, with each model call charged as it completes (see
+    :class:`~graph_budget.BudgetTracker`). When the wall-time limit passes,
+    in-flight nodes are cancelled. An
+    over-budget run returns the outputs of the furthest nodes that finished,
+    is tracked as unsuccessful, and sets ``result.raw.stop_reason``.
+    """
+
+    def __init__(
+        self,
+        graph: AgentGraphDefinition,
+        tools: Optional[ToolRegistry] = None,
+        max_parallelism: int = 4,
+        default_ai_provider: Optional[str] = None,
+        budget: Optional[GraphBudget] = None,
+    ):
+        """
+        Initialize the runner and create a runner for every node.
+
+        :param graph: The graph definition from ``aiclient.agent_graph``.
+        :param tools: Registry mapping tool names to callables.
+        :param max_parallelism: Maximum number of nodes, and of tool calls,
+            running at the same time.
+        :param default_ai_provider: Optional provider override for node runners.
+        :param budget: Optional limits applied to every run.
+        """
+        if max_parallelism < 1:
+            raise ValueError('max_parallelism must be at least 1')
+        self._graph = graph
+        self.max_parallelism = max_parallelism
+        self.budget = budget or GraphBudget()
+        self._tool_semaphore = asyncio.Semaphore(max_parallelism)
+        limited_tools = {
+            name: _limit_tool(tool, self._tool_semaphore)
+            for name, tool in (tools or {}).items()
+        }
+
+        # traverse visits nodes by depth and stores each node in the context
+        # dict, so its insertion order is the graph order.
+        ordered: Dict[str, Any] = {}
+        graph.traverse(lambda node, ctx: node, ordered)
+        self._order: List[str] = list(ordered)
+        position = {key: i for i, key in enumerate(self._order)}
+
+        self._parents: Dict[str, List[str]] = {
+            key: [
+                parent.get_key()
+                for parent in graph.get_parent_nodes(key)
+                if position.get(parent.get_key(), len(position)) < position[key]
+            ]
+            for key in self._order
+        }
+        # Forward edges only, split into children that always run after the
+        # node and children it chooses between with handoff tools.
+        self._fan_out: Dict[str, List[str]] = {}
+        self._handoff_children: Dict[str, List[str]] = {}
+        self._runners: Dict[str, Optional[Runner]] = {}
+        for key in self._order:
+            edges = [
+                edge for edge in ordered[key].get_edges()
+                if position.get(edge.target_config, -1) > position[key]
+            ]
+            plain = [edge for edge in edges if not _is_parallel_edge(edge)]
+            self._fan_out[key] = [edge.target_config for edge in edges if _is_parallel_edge(edge)]
+            config = ordered[key].get_config()
+            node_tools = limited_tools
+            if len(plain) == 1:
+                self._fan_out[key].append(plain[0].target_config)
+                plain = []
+            self._handoff_children[key] = [edge.target_config for edge in plain]
+            if plain:
+                handoff_tools = {
+                    _handoff_tool_name(edge.target_config): _make_handoff_tool(
+                        key, edge.target_config, self._handoff_description(edge),
+                    )
+                    for edge in plain
+                }
+                config = _with_handoff_tools(config, handoff_tools)
+                node_tools = {**limited_tools, **handoff_tools}
+            self._runners[key] = RunnerFactory.create_agent(config, node_tools, default_ai_provider)
+
+    def _handoff_description(self, edge: Any) -> str:
+        description = (edge.handoff or {}).get('description')
+        if description:
+            return description
+        child = self._graph.get_node(edge.target_config)
+        instructions = child.get_config().instructions if child else None
+        if instructions:
+            return instructions[:120]
+        return f'Transfer control to {edge.target_config}'
+
+    def _selected_children(self, key: str, handoffs: Dict[str, str]) -> List[str]:
+        """Children that run after ``key``, given the handoffs made so far."""
+        chosen = handoffs.get(key)
+        return self._fan_out[key] + [child for child in self._handoff_children[key] if child == chosen]
+
+    async def run(self, input: str) -> AgentGraphRunnerResult:
+        """
+        Run the graph with the given input.
+
+        :param input: The user input prompt.
+        :return: AgentGraphRunnerResult whose ``raw`` is a
+            :class:`ParallelGraphOutput` with per-node outputs and offsets.
+        """
+        start_ns = time.perf_counter_ns()
+        node_semaphore = asyncio.Semaphore(self.max_parallelism)
+        budget = BudgetTracker(self.budget)
+        budget_token = _current_budget.set(budget)
+        handoffs: Dict[str, str] = {}
+        handoffs_token = _current_handoffs.set(handoffs)
+        output = ParallelGraphOutput(started_ns=start_ns)
+        tasks: Dict[str, asyncio.Task] = {}
+
+        def offset_ms() -> int:
+            return (time.perf_counter_ns() - start_ns) // 1_000_000
+
+        async def run_node(key: str) -> Optional[bool]:
+            # True if the node ran successfully, False if it failed or was
+            # skipped after a failure, None if no parent selected it.
+            # Parent failures are reported on the parent's own task.
+            parent_results = await asyncio.gather(
+                *(tasks[p] for p in self._parents[key]), return_exceptions=True,
+            )
+            if any(ok is not True and ok is not None for ok in parent_results):
+                log.warning(f"Skipping node '{key}' because a parent node did not complete")
+                return False
+            selected_by = [
+                parent for parent, ok in zip(self._parents[key], parent_results)
+                if ok and key in self._selected_children(parent, handoffs)
+            ]
+            if self._parents[key] and not selected_by:
+                return None
+
+            node_input = input
+            for parent in selected_by:
+                node_input += f'\n\n{parent} output:\n{output.node_outputs.get(parent, "")}'
+
+            current_node_key.set(key)
+            runner = self._runners[key]
+            if runner is None:
+                log.warning(f"No runner available for node '{key}'")
+                return False
+
+            async with node_semaphore:
+                if not budget.try_start_node():
+                    log.warning(f"Skipping node '{key}' because the run budget is spent ({budget.stop_reason})")
+                    return False
+                # Skipped nodes get no entry, so the graph tracker does not report an error for an agent that never ran.
+                metrics = NodeRunMetrics(success=False, start_offset_ms=offset_ms())
+                output.node_metrics[key] = metrics
+                budget.begin_node(key, node_input)
+                try:
+                    result = await runner.run(node_input)
+                finally:
+                    metrics.end_offset_ms = offset_ms()
+
+            budget.finish_node(key, result.metrics.tokens.total if result.metrics.tokens else None)
+            metrics.success = result.metrics.success
+            metrics.tokens = result.metrics.tokens
+            metrics.tool_calls = result.metrics.tool_calls
+            metrics.duration_ms = (
+                result.metrics.duration_ms
+                if result.metrics.duration_ms is not None
+                else metrics.end_offset_ms - metrics.start_offset_ms
+            )
+            output.node_outputs[key] = result.content
+            return metrics.success
+
+        try:
+            for key in self._order:
+                tasks[key] = asyncio.create_task(run_node(key))
+
+            remaining_ms = budget.remaining_ms()
+            _, pending = await asyncio.wait(
+                tasks.values(),
+                timeout=remaining_ms / 1000 if remaining_ms is not None else None,
+            )
+            if pending:
+                budget.stop_reason = budget.stop_reason or STOP_MAX_WALL_TIME
+                log.warning(f'Cancelling {len(pending)} graph nodes because the run budget is spent ({budget.stop_reason})')
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        except asyncio.CancelledError:
+            # The caller gave up, for example at a request deadline. Stop the
+            # nodes too, rather than leaving them running with no one waiting.
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            _current_handoffs.reset(handoffs_token)
+            _current_budget.reset(budget_token)
+
+        success = True
+        for key, task in tasks.items():
+            if task.cancelled():
+                success = False
+            elif task.exception() is not None:
+                log.warning(f"ParallelAgentGraphRunner node '{key}' failed: {task.exception()}")
+                success = False
+            elif task.result() is False:
+                success = False
+        output.stop_reason = budget.stop_reason
+
+        # Report nodes in graph order rather than completion order.
+        output.node_metrics = {k: output.node_metrics[k] for k in self._order if k in output.node_metrics}
+        # The ends of the branches that ran. If the run stopped early, these
+        # are the furthest nodes that finished.
+        final_keys = [
+            key for key in self._order
+            if key in output.node_outputs
+            and not any(child in output.node_outputs for child in self._selected_children(key, handoffs))
+        ]
+        content = '\n\n'.join(
+            output.node_outputs[key] for key in final_keys if key in output.node_outputs
+        )
+
+        return AgentGraphRunnerResult(
+            content=content,
+            raw=output,
+            metrics=AIGraphMetrics(
+                success=success,
+                path=[k for k, m in output.node_metrics.items() if m.start_offset_ms is not None],
+                duration_ms=offset_ms(),
+                tokens=_sum_tokens(output.node_metrics.values()),
+                node_metrics=dict(output.node_metrics),
+            ),
+        )
+
+
+def _sum_tokens(node_metrics) -> Optional[TokenUsage]:
+    usages = [m.tokens for m in node_metrics if m.tokens]
+    if not usages:
+        return None
+    return TokenUsage(
+        total=sum(u.total for u in usages),
+        input=sum(u.input for u in usages),
+        output=sum(u.output for u in usages),
+    )
@@ -4,39 +4,33 @@ from dotenv import load_dotenv
 import asyncio
 import ldclient
 from ldclient import Context
-from ldclient.config import Config
-from ldai import LDAIClient, AIJudgeConfigDefault
-from ldobserve import ObservabilityConfig, ObservabilityPlugin
+from ldai import AIJudgeConfigDefault
+from ld_bootstrap import bootstrap
+from judge_cache import DEFAULT_MAX_BYTES, JudgeResultCache
+from judge_cascade import JudgeCascade
 
 load_dotenv()
 
 logging.basicConfig()
 logging.getLogger('ldclient').setLevel(logging.WARNING)
 
-# Set sdk_key to your LaunchDarkly SDK key.
-sdk_key = os.getenv('LAUNCHDARKLY_SDK_KEY')
-
 # Set judge_key to the Judge key you want to use.
 judge_key = os.getenv('LAUNCHDARKLY_JUDGE_KEY', 'sample-judge')
 
+# Set cheap_judge_key to enable cascade mode: the cheap judge scores every
+# pair and only scores inside the uncertainty band are escalated to judge_key.
+cheap_judge_key = os.getenv('LAUNCHDARKLY_CHEAP_JUDGE_KEY')
+uncertainty_band = tuple(float(v) for v in os.getenv('JUDGE_CASCADE_BAND', '0.3,0.7').split(','))
 
-async def async_main():
-    if not sdk_key:
-        print("*** Please set the LAUNCHDARKLY_SDK_KEY env first")
-        exit()
-
-    ldclient.set_config(Config(sdk_key, plugins=[
-        ObservabilityPlugin(ObservabilityConfig(
-            service_name='hello-python-ai-judge',
-        ))
-    ]))
+# Judge results are cached on disk so re-scoring identical pairs skips the
+# judge model call. Set JUDGE_CACHE_BYPASS=true to always call the judge.
+judge_cache_path = os.getenv('JUDGE_CACHE_PATH', '.judge_cache.db')
+judge_cache_max_bytes = int(os.getenv('JUDGE_CACHE_MAX_BYTES', str(DEFAULT_MAX_BYTES)))
+judge_cache_bypass = os.getenv('JUDGE_CACHE_BYPASS', 'false').lower() in ('1', 'true', 'yes')
 
-    if not ldclient.get().is_initialized():
-        print("*** SDK failed to initialize. Please check your internet connection and SDK credential for any typo.")
-        exit()
 
-    aiclient = LDAIClient(ldclient.get())
-    print("*** SDK successfully initialized")
+async def async_main():
+    aiclient = bootstrap('hello-python-ai-judge').aiclient
 
     # Set up the evaluation context. This context should appear on your
     # LaunchDarkly contexts dashboard soon after you run the demo.
@@ -48,6 +42,8 @@ async def async_main():
         .build()
     )
 
+    cache = JudgeResultCache(judge_cache_path, judge_cache_max_bytes, bypass=judge_cache_bypass)
+
     try:
         # Pass a default for improved resiliency when the AI config is unavailable
         # or LaunchDarkly is unreachable; omit for a disabled default.
@@ -77,7 +73,17 @@ async def async_main():
         print(f'  Sample output: "{output_text}"')
         print("Waiting for judge evaluation...")
 
-        judge_result = await judge.evaluate(input_text, output_text)
+        cascade = None
+        if cheap_judge_key:
+            cheap_judge = aiclient.create_judge(cheap_judge_key, context)
+            if not cheap_judge:
+                print(f"AI config '{cheap_judge_key}' is disabled. Verify the config key exists in your LaunchDarkly project and is not targeting a disabled variation.")
+                return
+            cascade = JudgeCascade(cheap_judge, judge, uncertainty_band, cache=cache)
+            cascade_result = await cascade.evaluate(input_text, output_text)
+            judge_result = cascade_result.result
+        else:
+            judge_result = await cache.evaluate(judge, input_text, output_text)
 
         # If the output you're judging came from another AI Config, track the
         # result on that config's tracker so the metric is attributed to the
@@ -85,7 +91,7 @@ async def async_main():
         # ai_config.create_tracker().track_judge_result(judge_result)
 
         print("\nJudge result:")
-        print(f"- judge_config_key: {judge_key}")
+        print(f"- judge_config_key: {judge_result.judge_config_key}")
         print(f"  sampled: {judge_result.sampled}")
         if judge_result.sampled:
             print(f"  success: {judge_result.success}")
@@ -94,11 +100,28 @@ async def async_main():
             print(f"  score: {judge_result.score}")
             print(f"  reasoning: {judge_result.reasoning}")
 
+        if cascade:
+            print("\nJudge cascade:")
+            print(f"  Uncertainty band: {cascade.uncertainty_band[0]}-{cascade.uncertainty_band[1]}")
+            print(f"  Escalation rate:  {cascade.escalation_rate:.0%}")
+            for tier, stats in (('cheap', cascade.cheap_stats), ('expensive', cascade.expensive_stats)):
+                print(f"  [{tier}]")
+                print(f"    Calls:         {stats.calls}")
+                print(f"    Mean latency:  {stats.mean_duration_ms:.0f}ms")
+                print(f"    Total tokens:  {stats.total_tokens}")
+
+        print("\nJudge cache:")
+        print(f"  Bypassed:      {cache.bypass}")
+        print(f"  Hits:          {cache.hits}")
+        print(f"  Misses:        {cache.misses}")
+        print(f"  Hit rate:      {cache.hit_rate:.0%}")
+
         print("\nDone!")
     except Exception as err:
         # In production, sanitize before logging — provider errors may include credentials.
         print("Error:", err)
     finally:
+        cache.close()
         # Flush pending events and close the client.
         ldclient.get().flush()
         ldclient.get().close()
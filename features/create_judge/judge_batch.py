@@ -0,0 +1,203 @@
+"""Packed judge evaluation: several input/output pairs per judge request."""
+
+import random
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ldai import Judge, JudgeResult, log
+
+
+def build_batch_schema(count: int) -> Dict[str, Any]:
+    """
+    Build the structured output schema for ``count`` packed evaluations.
+
+    Each entry mirrors the single-evaluation schema used by the SDK judge and
+    adds the index of the pair it scores.
+
+    :param count: Number of pairs packed into the request.
+    :return: Schema dictionary for structured output.
+    """
+    return {
+        'title': 'BatchEvaluationResponse',
+        'description': f'One evaluation (score and reasoning) for each of the {count} pairs.',
+        'type': 'object',
+        'properties': {
+            'evaluations': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'index': {
+                            'type': 'integer',
+                            'description': 'Index of the pair being evaluated.',
+                        },
+                        'score': {
+                            'type': 'number',
+                            'minimum': 0,
+                            'maximum': 1,
+                            'description': 'Score between 0.0 and 1.0.',
+                        },
+                        'reasoning': {
+                            'type': 'string',
+                            'description': 'Reasoning behind the score.',
+                        },
+                    },
+                    'required': ['index', 'score', 'reasoning'],
+                    'additionalProperties': False,
+                },
+            },
+        },
+        'required': ['evaluations'],
+        'additionalProperties': False,
+    }
+
+
+def build_batch_input(pairs: Sequence[Tuple[str, str]]) -> str:
+    """
+    Render ``pairs`` as a single judge input.
+
+    Each pair uses the same ``MESSAGE HISTORY`` / ``RESPONSE TO EVALUATE``
+    layout as a single evaluation, prefixed with its index.
+
+    :param pairs: Sequence of ``(input_text, output_text)`` tuples.
+    :return: The packed evaluation input.
+    """
+    sections = [
+        f'Evaluate each of the following {len(pairs)} pairs independently. '
+        'Return exactly one evaluation per pair, using the pair index.'
+    ]
+    for index, (input_text, output_text) in enumerate(pairs):
+        sections.append(
+            f"PAIR {index}\n"
+            f"MESSAGE HISTORY:\n{input_text}\n\n"
+            f"RESPONSE TO EVALUATE:\n{output_text}"
+        )
+    return '\n\n'.join(sections)
+
+
+def parse_batch_response(data: Any, count: int) -> Dict[int, Tuple[float, str]]:
+    """
+    Parse a packed evaluation response.
+
+    Entries with an out-of-range index, an invalid score or missing reasoning
+    are dropped, so callers can fall back for just those pairs.
+
+    :param data: The parsed structured output from the runner.
+    :param count: Number of pairs that were packed.
+    :return: Mapping of pair index to ``(score, reasoning)``.
+    """
+    parsed: Dict[int, Tuple[float, str]] = {}
+    if not isinstance(data, dict) or not isinstance(data.get('evaluations'), list):
+        return parsed
+
+    for entry in data['evaluations']:
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get('index')
+        score = entry.get('score')
+        reasoning = entry.get('reasoning')
+        if not isinstance(index, int) or not 0 <= index < count or index in parsed:
+            continue
+        if not isinstance(score, (int, float)) or not 0 <= score <= 1:
+            continue
+        if not isinstance(reasoning, str):
+            continue
+        parsed[index] = (float(score), reasoning)
+    return parsed
+
+
+class BatchJudge:
+    """
+    Evaluates many input/output pairs with one judge request per batch.
+
+    The judge's config messages are sent once per batch instead of once per
+    pair. Results are split back into per-pair :class:`JudgeResult` objects.
+    Pairs whose result is missing or invalid in the batch response are
+    re-evaluated one at a time with ``judge.evaluate``.
+    """
+
+    def __init__(self, judge: Judge, batch_size: int = 4):
+        """
+        Initialize the batch judge.
+
+        :param judge: The judge returned by ``create_judge``.
+        :param batch_size: Maximum number of pairs packed into one request.
+            A batch size of 1 uses ``judge.evaluate`` directly.
+        """
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1')
+        self._judge = judge
+        self.batch_size = batch_size
+        self.fallbacks = 0
+
+    async def evaluate_many(
+        self,
+        pairs: Sequence[Tuple[str, str]],
+        sampling_rate: Optional[float] = None,
+    ) -> List[JudgeResult]:
+        """
+        Evaluate ``pairs`` in batches.
+
+        :param pairs: Sequence of ``(input_text, output_text)`` tuples.
+        :param sampling_rate: Sampling rate (0-1) applied to each pair. When
+            ``None``, falls back to the judge's sample rate.
+        :return: One result per pair, in input order.
+        """
+        results: List[JudgeResult] = []
+        for start in range(0, len(pairs), self.batch_size):
+            chunk = pairs[start:start + self.batch_size]
+            results.extend(await self._evaluate_chunk(chunk, sampling_rate))
+        return results
+
+    async def _evaluate_chunk(
+        self,
+        chunk: Sequence[Tuple[str, str]],
+        sampling_rate: Optional[float],
+    ) -> List[JudgeResult]:
+        if self.batch_size == 1:
+            return [await self._judge.evaluate(i, o, sampling_rate) for i, o in chunk]
+
+        ai_config = self._judge.get_ai_config()
+        effective_rate = sampling_rate if sampling_rate is not None else self._judge.sample_rate
+        results = [JudgeResult(judge_config_key=ai_config.key) for _ in chunk]
+
+        if not ai_config.evaluation_metric_key:
+            for result in results:
+                result.error_message = 'Judge configuration is missing required evaluationMetricKey'
+            return results
+
+        sampled = [i for i in range(len(chunk)) if random.random() <= effective_rate]
+        if not sampled:
+            return results
+
+        scores: Dict[int, Tuple[float, str]] = {}
+        success = False
+        try:
+            tracker = ai_config.create_tracker()
+            response = await tracker.track_metrics_of_async(
+                lambda r: r.metrics,
+                lambda: self._judge.get_model_runner().run(
+                    build_batch_input([chunk[i] for i in sampled]),
+                    output_type=build_batch_schema(len(sampled)),
+                ),
+            )
+            success = response.metrics.success
+            scores = parse_batch_response(response.parsed, len(sampled))
+        except Exception as error:
+            log.warning(f'Batch judge evaluation failed: {error}')
+
+        for position, index in enumerate(sampled):
+            if success and position in scores:
+                score, reasoning = scores[position]
+                result = results[index]
+                result.sampled = True
+                result.success = True
+                result.metric_key = ai_config.evaluation_metric_key
+                result.score = score
+                result.reasoning = reasoning
+                continue
+
+            # Already sampled above, so evaluate unconditionally.
+            self.fallbacks += 1
+            input_text, output_text = chunk[index]
+            results[index] = await self._judge.evaluate(input_text, output_text, 1.0)
+        return results
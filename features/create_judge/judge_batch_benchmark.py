@@ -0,0 +1,100 @@
+import os
+import logging
+import time
+from dotenv import load_dotenv
+import asyncio
+import ldclient
+from ldclient import Context
+from ld_bootstrap import bootstrap
+from judge_batch import BatchJudge
+from metered_runner import metered_judge
+
+load_dotenv()
+
+logging.basicConfig()
+logging.getLogger('ldclient').setLevel(logging.WARNING)
+
+# Set judge_key to the Judge key you want to use.
+judge_key = os.getenv('LAUNCHDARKLY_JUDGE_KEY', 'sample-judge')
+
+BATCH_SIZES = (1, 4, 16)
+
+SAMPLE_QUESTIONS = [
+    'How can you help me?',
+    'What does LaunchDarkly do?',
+    'How do I roll out a feature to 10% of users?',
+    'What is an AI Config?',
+]
+
+SAMPLE_ANSWERS = [
+    'I can answer questions about LaunchDarkly feature flags and AI Configs.',
+    'I can answer any question you have except for questions about the company LaunchDarkly.',
+    'Use a percentage rollout on the flag targeting rules and set the variation weights.',
+    'I do not know.',
+]
+
+
+def build_dataset():
+    """Return 16 input/output pairs covering good and bad answers."""
+    return [
+        (f'You are a helpful assistant for the company LaunchDarkly. {question}', answer)
+        for question in SAMPLE_QUESTIONS
+        for answer in SAMPLE_ANSWERS
+    ]
+
+
+async def async_main():
+    aiclient = bootstrap('hello-python-ai-judge-batch-benchmark').aiclient
+
+    context = (
+        Context
+        .builder('example-user-key')
+        .kind('user')
+        .name('Sandy')
+        .build()
+    )
+
+    try:
+        judge = aiclient.create_judge(judge_key, context)
+
+        if not judge:
+            print(f"AI config '{judge_key}' is disabled. Verify the config key exists in your LaunchDarkly project and is not targeting a disabled variation.")
+            return
+
+        dataset = build_dataset()
+        print(f"\nEvaluating {len(dataset)} pairs with batch sizes {', '.join(str(k) for k in BATCH_SIZES)}...")
+
+        print(f"\n{'K':>4} {'requests':>9} {'fallbacks':>10} {'tokens/eval':>12} {'input/eval':>11} {'ms/eval':>8}")
+        for batch_size in BATCH_SIZES:
+            metered = metered_judge(judge)
+            batch_judge = BatchJudge(metered, batch_size)
+
+            start = time.perf_counter()
+            await batch_judge.evaluate_many(dataset, sampling_rate=1.0)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            stats = metered.get_model_runner()
+            count = len(dataset)
+            print(
+                f"{batch_size:>4} {stats.calls:>9} {batch_judge.fallbacks:>10} "
+                f"{stats.total_tokens / count:>12.1f} {stats.input_tokens / count:>11.1f} "
+                f"{elapsed_ms / count:>8.0f}"
+            )
+
+        print("\nDone!")
+    except Exception as err:
+        # In production, sanitize before logging — provider errors may include credentials.
+        print("Error:", err)
+    finally:
+        # Flush pending events and close the client.
+        ldclient.get().flush()
+        ldclient.get().close()
+
+
+def main():
+    """Synchronous entry point for Poetry script."""
+    asyncio.run(async_main())
+
+
+if __name__ == "__main__":
+    main()
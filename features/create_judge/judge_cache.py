@@ -0,0 +1,211 @@
+"""Persistent, content-addressed cache for judge evaluation results."""
+
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import time
+from typing import Optional, Tuple
+
+from ldai import Judge, JudgeResult
+from ld_bootstrap import resumption_data
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def get_judge_variation(judge: Judge) -> Tuple[str, int]:
+    """
+    Return the ``(variation_key, version)`` the judge was evaluated with.
+
+    They are read from the resumption token of a fresh tracker with
+    ``resumption_data``. Creating a tracker does not emit any events.
+
+    :param judge: The judge instance returned by ``create_judge``.
+    :return: Tuple of variation key (empty when unknown) and version.
+    """
+    payload = resumption_data(judge.get_ai_config().create_tracker().resumption_token)
+    return payload.get('variationKey', ''), int(payload.get('version', 1))
+
+
+class JudgeResultCache:
+    """
+    On-disk cache of judge results backed by SQLite.
+
+    Entries are keyed on the judge config key, its variation and version, a
+    fingerprint of the evaluated judge config, and hashes of the input and
+    output text. Publishing a new judge variation therefore misses the cache
+    without any explicit invalidation. When the database grows beyond
+    ``max_bytes`` the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, bypass: bool = False):
+        """
+        Open (or create) the cache.
+
+        :param path: Location of the SQLite database file.
+        :param max_bytes: Upper bound on the total size of stored results.
+        :param bypass: When ``True`` every lookup misses and nothing is stored,
+            so each evaluation goes to the judge model.
+        """
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS judge_results ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' last_access REAL NOT NULL)'
+        )
+        self._db.execute(
+            'CREATE INDEX IF NOT EXISTS judge_results_last_access ON judge_results (last_access)'
+        )
+        self._db.commit()
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def key_for(self, judge: Judge, input_text: str, output_text: str) -> str:
+        """
+        Build the cache key for evaluating ``output_text`` against ``input_text``.
+
+        :param judge: The judge that would perform the evaluation.
+        :param input_text: The input prompt or conversation.
+        :param output_text: The response being evaluated.
+        :return: Hex digest identifying the evaluation.
+        """
+        ai_config = judge.get_ai_config()
+        variation_key, version = get_judge_variation(judge)
+        config_fingerprint = _sha256(json.dumps(ai_config.to_dict(), sort_keys=True, default=str))
+        parts = [
+            ai_config.key,
+            variation_key,
+            str(version),
+            config_fingerprint,
+            _sha256(input_text),
+            _sha256(output_text),
+        ]
+        return _sha256('\x1f'.join(parts))
+
+    def get(self, key: str) -> Optional[JudgeResult]:
+        """
+        Look up a cached result, recording a hit or miss.
+
+        :param key: Key produced by :meth:`key_for`.
+        :return: The cached result, or ``None`` on a miss or when bypassed.
+        """
+        if self.bypass:
+            self.misses += 1
+            return None
+
+        row = self._db.execute(
+            'SELECT value FROM judge_results WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self._db.execute(
+            'UPDATE judge_results SET last_access = ? WHERE key = ?', (time.time(), key)
+        )
+        self._db.commit()
+        self.hits += 1
+        data = json.loads(row[0])
+        return JudgeResult(
+            judge_config_key=data.get('judgeConfigKey'),
+            success=data.get('success', False),
+            sampled=data.get('sampled', False),
+            metric_key=data.get('metricKey'),
+            score=data.get('score'),
+            reasoning=data.get('reasoning'),
+        )
+
+    def put(self, key: str, result: JudgeResult) -> None:
+        """
+        Store a result. Only successful, sampled evaluations are cached.
+
+        :param key: Key produced by :meth:`key_for`.
+        :param result: The judge result to store.
+        """
+        if self.bypass or not (result.sampled and result.success):
+            return
+
+        value = json.dumps(result.to_dict())
+        self._db.execute(
+            'INSERT OR REPLACE INTO judge_results (key, value, size, last_access) VALUES (?, ?, ?, ?)',
+            (key, value, len(value), time.time()),
+        )
+        self._evict()
+        self._db.commit()
+
+    async def evaluate(
+        self,
+        judge: Judge,
+        input_text: str,
+        output_text: str,
+        sampling_rate: Optional[float] = None,
+    ) -> JudgeResult:
+        """
+        Evaluate through the cache, calling the judge only on a miss.
+
+        Sampling is applied before the lookup, so a cached score is returned
+        only as often as the judge itself would have been called.
+
+        :param judge: The judge to use on a miss.
+        :param input_text: The input prompt or conversation.
+        :param output_text: The response being evaluated.
+        :param sampling_rate: Sampling rate (0-1). When ``None``, the judge's
+            own ``sample_rate`` is used.
+        :return: The cached or freshly computed judge result, or an unsampled
+            result when the pair is not sampled.
+        """
+        effective_rate = sampling_rate if sampling_rate is not None else judge.sample_rate
+        if random.random() > effective_rate:
+            return JudgeResult(judge_config_key=judge.get_ai_config().key)
+
+        key = self.key_for(judge, input_text, output_text)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        # Already sampled above, so the judge evaluates unconditionally.
+        result = await judge.evaluate(input_text, output_text, 1.0)
+        self.put(key, result)
+        return result
+
+    def size_bytes(self) -> int:
+        """Total size of the stored results."""
+        return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM judge_results').fetchone()[0]
+
+    def close(self) -> None:
+        """Close the underlying database."""
+        self._db.close()
+
+    def _evict(self) -> None:
+        total = self.size_bytes()
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute(
+            'SELECT key, size FROM judge_results ORDER BY last_access ASC'
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute('DELETE FROM judge_results WHERE key = ?', (key,))
+            total -= size
+            self.evictions += 1
@@ -0,0 +1,103 @@
+"""Two-tier judge cascade that escalates only uncertain scores."""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from ldai import Judge, JudgeResult
+
+from judge_cache import JudgeResultCache
+from metered_runner import MeteredRunner, metered_judge
+
+
+@dataclass
+class CascadeResult:
+    """Result of a cascaded evaluation."""
+
+    result: JudgeResult
+    """The result that should be used: the expensive judge's when escalated."""
+
+    escalated: bool
+    """Whether the pair was sent to the expensive judge."""
+
+    first_tier: JudgeResult
+    """The cheap judge's result, kept for comparison."""
+
+
+class JudgeCascade:
+    """
+    Scores each pair with a cheap judge and escalates only uncertain results.
+
+    A result is uncertain when the cheap judge failed to produce a score, or
+    its score falls inside ``uncertainty_band`` (inclusive). Confident scores
+    at either end of the scale, and pairs the cheap judge did not sample, are
+    returned without calling the expensive judge.
+    """
+
+    def __init__(
+        self,
+        cheap_judge: Judge,
+        expensive_judge: Judge,
+        uncertainty_band: Tuple[float, float] = (0.3, 0.7),
+        cache: Optional[JudgeResultCache] = None,
+    ):
+        """
+        Initialize the cascade.
+
+        :param cheap_judge: First-tier judge, from ``create_judge``.
+        :param expensive_judge: Second-tier judge, from ``create_judge``.
+        :param uncertainty_band: ``(low, high)`` score range that triggers escalation.
+        :param cache: Optional result cache consulted for both tiers.
+        """
+        low, high = uncertainty_band
+        if not 0 <= low <= high <= 1:
+            raise ValueError(f'Invalid uncertainty band: {uncertainty_band}')
+        self.uncertainty_band = (low, high)
+        self._cheap = metered_judge(cheap_judge)
+        self._expensive = metered_judge(expensive_judge)
+        self._cache = cache
+        self.evaluations = 0
+        self.escalations = 0
+
+    @property
+    def escalation_rate(self) -> float:
+        """Fraction of evaluations that were escalated to the expensive judge."""
+        return self.escalations / self.evaluations if self.evaluations else 0.0
+
+    @property
+    def cheap_stats(self) -> MeteredRunner:
+        """Latency and token counters for the first tier."""
+        return self._cheap.get_model_runner()
+
+    @property
+    def expensive_stats(self) -> MeteredRunner:
+        """Latency and token counters for the second tier."""
+        return self._expensive.get_model_runner()
+
+    def is_uncertain(self, result: JudgeResult) -> bool:
+        """Return whether ``result`` should be escalated."""
+        if not result.success or result.score is None:
+            return True
+        low, high = self.uncertainty_band
+        return low <= result.score <= high
+
+    async def evaluate(self, input_text: str, output_text: str) -> CascadeResult:
+        """
+        Evaluate a pair, escalating to the expensive judge when uncertain.
+
+        :param input_text: The input prompt or conversation.
+        :param output_text: The response being evaluated.
+        :return: CascadeResult with the final result and whether it escalated.
+        """
+        self.evaluations += 1
+        first_tier = await self._evaluate(self._cheap, input_text, output_text)
+        if not first_tier.sampled or not self.is_uncertain(first_tier):
+            return CascadeResult(result=first_tier, escalated=False, first_tier=first_tier)
+
+        self.escalations += 1
+        second_tier = await self._evaluate(self._expensive, input_text, output_text)
+        return CascadeResult(result=second_tier, escalated=True, first_tier=first_tier)
+
+    async def _evaluate(self, judge: Judge, input_text: str, output_text: str) -> JudgeResult:
+        if self._cache is not None:
+            return await self._cache.evaluate(judge, input_text, output_text)
+        return await judge.evaluate(input_text, output_text)
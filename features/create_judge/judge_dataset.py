@@ -0,0 +1,120 @@
+import os
+import argparse
+import json
+import logging
+import sys
+from dotenv import load_dotenv
+from ldclient import Context
+from ld_worker_pool import DEFAULT_CONCURRENCY, WorkerContext, WorkerPool
+from judge_batch_benchmark import build_dataset
+from metered_runner import metered_judge
+
+load_dotenv()
+
+logging.basicConfig()
+logging.getLogger('ldclient').setLevel(logging.WARNING)
+
+# Set judge_key to the Judge key you want to use.
+judge_key = os.getenv('LAUNCHDARKLY_JUDGE_KEY', 'sample-judge')
+
+SERVICE_NAME = 'hello-python-ai-judge-dataset'
+
+
+def setup_judge(worker: WorkerContext):
+    """Create the judge once per worker, recording each judge model call in the worker's metrics."""
+    context = (
+        Context
+        .builder('example-user-key')
+        .kind('user')
+        .name('Sandy')
+        .build()
+    )
+    judge = worker.aiclient.create_judge(judge_key, context)
+    if not judge:
+        raise RuntimeError(f"AI config '{judge_key}' is disabled. Verify the config key exists in your LaunchDarkly project and is not targeting a disabled variation.")
+    return metered_judge(judge, on_metrics=worker.record)
+
+
+async def judge_pair(worker: WorkerContext, pair):
+    """Score one ``{"input": ..., "output": ...}`` pair."""
+    result = await worker.state.evaluate(pair['input'], pair['output'], sampling_rate=1.0)
+    return result.to_dict()
+
+
+def load_dataset(path, repeat):
+    """Read pairs from a JSON lines file, or repeat the 16 sample pairs ``repeat`` times."""
+    if path:
+        with open(path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file if line.strip()]
+    return [{'input': input_text, 'output': output_text} for input_text, output_text in build_dataset()] * repeat
+
+
+def judge_dataset(pairs, workers, concurrency, ordered, output=None):
+    """
+    Judge every pair with ``workers`` processes and return the pool, with its merged metrics.
+
+    Each result is written to ``output`` as a JSON line with the pair's
+    index and the number of workers, so several runs can share one file.
+    """
+    pool = WorkerPool(SERVICE_NAME, judge_pair, setup=setup_judge, workers=workers,
+                      concurrency=concurrency, ordered=ordered)
+    for result in pool.map(pairs):
+        if output is not None:
+            record = {'index': result.index, 'workers': workers, **(result.value or {})}
+            if result.error:
+                record['error'] = result.error
+            output.write(json.dumps(record) + '\n')
+    return pool
+
+
+def main():
+    """Synchronous entry point for Poetry script."""
+    parser = argparse.ArgumentParser(description='Judge a dataset of input/output pairs across worker processes.')
+    parser.add_argument('dataset', nargs='?', help='JSON lines file of {"input": ..., "output": ...} pairs; '
+                        'defaults to the 16 sample pairs repeated --repeat times')
+    parser.add_argument('--repeat', type=int, default=64, help='Copies of the sample pairs (default: %(default)s)')
+    parser.add_argument('--workers', default=str(os.cpu_count() or 1),
+                        help='Worker processes, or a comma-separated list such as 1,2,4 to compare (default: CPUs)')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Pairs each worker judges at once (default: %(default)s)')
+    parser.add_argument('--ordered', action='store_true', help='Write results in input order')
+    parser.add_argument('--output', help='Write one JSON line per result to this file')
+    args = parser.parse_args()
+
+    pairs = load_dataset(args.dataset, args.repeat)
+    worker_counts = [int(count) for count in args.workers.split(',')]
+    print(f"\nJudging {len(pairs)} pairs with {judge_key}, {args.concurrency} at a time per worker...")
+
+    rows = []
+    output = open(args.output, 'w', encoding='utf-8') if args.output else None
+    try:
+        for workers in worker_counts:
+            rows.append((workers, judge_dataset(pairs, workers, args.concurrency, args.ordered, output)))
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        if output is not None:
+            output.close()
+
+    print(f"\n{'workers':>7} {'pairs':>6} {'failed':>6} {'calls':>6} {'call errors':>11} {'tokens':>8} {'wall s':>7} "
+          f"{'pairs/s':>8} {'speedup':>8} {'p50 ms':>7} {'p95 ms':>7}")
+    base_rate = None
+    for workers, pool in rows:
+        metrics = pool.metrics
+        rate = metrics.items / pool.elapsed_s if pool.elapsed_s else 0.0
+        base_rate = base_rate or rate
+        print(
+            f"{workers:>7} {metrics.items:>6} {metrics.failed:>6} {metrics.calls:>6} "
+            f"{metrics.calls - metrics.successes:>11} {metrics.total_tokens:>8} {pool.elapsed_s:>7.2f} {rate:>8.1f} "
+            f"{rate / base_rate if base_rate else 0:>7.2f}x {metrics.percentile_ms(50):>7.0f} "
+            f"{metrics.percentile_ms(95):>7.0f}"
+        )
+    workers, pool = rows[-1]
+    if workers > 1:
+        print(f"\nPairs per worker ({workers} workers): "
+              + ', '.join(str(m.items) for _, m in sorted(pool.worker_metrics.items())))
+
+
+if __name__ == "__main__":
+    main()
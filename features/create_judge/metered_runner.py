@@ -0,0 +1,77 @@
+"""Runner wrapper that accumulates latency and token usage across calls."""
+
+import dataclasses
+import time
+from typing import Any, Callable, Dict, Optional
+
+from ldai import Judge
+from ldai.providers import Runner, RunnerResult
+from ldai.providers.types import LDAIMetrics
+
+
+class MeteredRunner:
+    """
+    Wraps a :class:`~ldai.providers.Runner` and records every invocation.
+
+    The judge tracks its own metrics to LaunchDarkly but does not return them
+    to the caller. Wrapping its runner lets the examples report latency and
+    token usage per judge without changing what gets tracked.
+
+    ``on_metrics``, if given, is also called with each call's metrics,
+    with the measured duration filled in if the runner did not report one.
+    """
+
+    def __init__(self, runner: Runner, on_metrics: Optional[Callable[[LDAIMetrics], None]] = None):
+        self._runner = runner
+        self._on_metrics = on_metrics
+        self.calls = 0
+        self.duration_ms = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.total_tokens = 0
+
+    async def run(
+        self,
+        input: str,
+        output_type: Optional[Dict[str, Any]] = None,
+    ) -> RunnerResult:
+        start_ns = time.perf_counter_ns()
+        try:
+            result = await self._runner.run(input, output_type=output_type)
+        finally:
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+            self.calls += 1
+            self.duration_ms += duration_ms
+
+        tokens = result.metrics.tokens
+        if tokens:
+            self.input_tokens += tokens.input
+            self.output_tokens += tokens.output
+            self.total_tokens += tokens.total
+        if self._on_metrics is not None:
+            metrics = result.metrics
+            if metrics.duration_ms is None:
+                metrics = dataclasses.replace(metrics, duration_ms=duration_ms)
+            self._on_metrics(metrics)
+        return result
+
+    @property
+    def mean_duration_ms(self) -> float:
+        """Mean wall-clock latency per call in milliseconds."""
+        return self.duration_ms / self.calls if self.calls else 0.0
+
+
+def metered_judge(judge: Judge, on_metrics: Optional[Callable[[LDAIMetrics], None]] = None) -> Judge:
+    """
+    Return a copy of ``judge`` whose model runner is a :class:`MeteredRunner`.
+
+    :param judge: A judge returned by ``create_judge``.
+    :param on_metrics: Optional callback for each call's metrics.
+    :return: A judge with the same config and sample rate; read the counters
+        from ``get_model_runner()``.
+    """
+    return Judge(
+        judge.get_ai_config(),
+        MeteredRunner(judge.get_model_runner(), on_metrics),
+        sample_rate=judge.sample_rate,
+    )
@@ -4,39 +4,20 @@ from dotenv import load_dotenv
 import asyncio
 import ldclient
 from ldclient import Context
-from ldclient.config import Config
-from ldai import LDAIClient, AICompletionConfigDefault
-from ldobserve import ObservabilityConfig, ObservabilityPlugin
+from ldai import AICompletionConfigDefault
+from ld_bootstrap import bootstrap
 
 load_dotenv()
 
 logging.basicConfig()
 logging.getLogger('ldclient').setLevel(logging.WARNING)
 
-# Set sdk_key to your LaunchDarkly SDK key.
-sdk_key = os.getenv('LAUNCHDARKLY_SDK_KEY')
-
 # Set config_key to the AI Config key you want to evaluate.
 ai_config_key = os.getenv('LAUNCHDARKLY_COMPLETION_KEY', 'sample-completion')
 
 
 async def async_main():
-    if not sdk_key:
-        print("*** Please set the LAUNCHDARKLY_SDK_KEY env first")
-        exit()
-
-    ldclient.set_config(Config(sdk_key, plugins=[
-        ObservabilityPlugin(ObservabilityConfig(
-            service_name='hello-python-ai-managed-model',
-        ))
-    ]))
-
-    if not ldclient.get().is_initialized():
-        print("*** SDK failed to initialize. Please check your internet connection and SDK credential for any typo.")
-        exit()
-
-    aiclient = LDAIClient(ldclient.get())
-    print("*** SDK successfully initialized")
+    aiclient = bootstrap('hello-python-ai-managed-model').aiclient
 
     # Set up the evaluation context. This context should appear on your
     # LaunchDarkly contexts dashboard soon after you run the demo.
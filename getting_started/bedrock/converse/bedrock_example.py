@@ -3,11 +3,9 @@ import logging
 from dotenv import load_dotenv
 import ldclient
 from ldclient import Context
-from ldclient.config import Config
-from ldai import LDAIClient
 from ldai.tracker import TokenUsage
 from ldai.providers import LDAIMetrics
-from ldobserve import ObservabilityConfig, ObservabilityPlugin
+from ld_bootstrap import bootstrap
 import boto3
 
 load_dotenv()
@@ -36,32 +34,15 @@ def get_bedrock_metrics(response):
 
     return LDAIMetrics(success=success, tokens=usage, duration_ms=duration_ms)
 
-# Set sdk_key to your LaunchDarkly SDK key.
-sdk_key = os.getenv('LAUNCHDARKLY_SDK_KEY')
-
 # Set config_key to the AI Config key you want to evaluate.
 ai_config_key = os.getenv('LAUNCHDARKLY_COMPLETION_KEY', 'sample-completion')
 
 def main():
-    if not sdk_key:
-        print("*** Please set the LAUNCHDARKLY_SDK_KEY env first")
-        exit()
     if not ai_config_key:
         print("*** Please set the LAUNCHDARKLY_COMPLETION_KEY env first")
         exit()
 
-    ldclient.set_config(Config(sdk_key, plugins=[
-        ObservabilityPlugin(ObservabilityConfig(
-            service_name='hello-python-ai-bedrock',
-        ))
-    ]))
-
-    if not ldclient.get().is_initialized():
-        print("*** SDK failed to initialize. Please check your internet connection and SDK credential for any typo.")
-        exit()
-
-    aiclient = LDAIClient(ldclient.get())
-    print("*** SDK successfully initialized")
+    aiclient = bootstrap('hello-python-ai-bedrock').aiclient
 
     # Set up the evaluation context. This context should appear on your
     # LaunchDarkly contexts dashboard soon after you run the demo.
@@ -3,10 +3,9 @@ import logging
 from dotenv import load_dotenv
 import ldclient
 from ldclient import Context
-from ldclient.config import Config
-from ldai import LDAIClient, LDMessage
+from ldai import LDMessage
 from ldai.tracker import TokenUsage
-from ldobserve import ObservabilityConfig, ObservabilityPlugin
+from ld_bootstrap import bootstrap
 from google import genai
 from google.genai import types
 from typing import List, Optional, Tuple
@@ -16,9 +15,6 @@ load_dotenv()
 logging.basicConfig()
 logging.getLogger('ldclient').setLevel(logging.WARNING)
 
-# Set sdk_key to your LaunchDarkly SDK key.
-sdk_key = os.getenv('LAUNCHDARKLY_SDK_KEY')
-
 # Set config_key to the AI Config key you want to evaluate.
 ai_config_key = os.getenv('LAUNCHDARKLY_COMPLETION_KEY', 'sample-completion')
 
@@ -89,9 +85,6 @@ def track_genai_metrics(tracker, func):
     return result
 
 def main():
-    if not sdk_key:
-        print("*** Please set the LAUNCHDARKLY_SDK_KEY env first")
-        exit()
     if not ai_config_key:
         print("*** Please set the LAUNCHDARKLY_COMPLETION_KEY env first")
         exit()
@@ -99,18 +92,7 @@ def main():
         print("*** Please set the GOOGLE_API_KEY env first")
         exit()
 
-    ldclient.set_config(Config(sdk_key, plugins=[
-        ObservabilityPlugin(ObservabilityConfig(
-            service_name='hello-python-ai-gemini',
-        ))
-    ]))
-    aiclient = LDAIClient(ldclient.get())
-
-    if not ldclient.get().is_initialized():
-        print("*** SDK failed to initialize. Please check your internet connection and SDK credential for any typo.")
-        exit()
-
-    print("*** SDK successfully initialized")
+    aiclient = bootstrap('hello-python-ai-gemini').aiclient
 
     # Set up the evaluation context. This context should appear on your
     # LaunchDarkly contexts dashboard soon after you run the demo.
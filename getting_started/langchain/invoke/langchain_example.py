@@ -4,20 +4,16 @@ from dotenv import load_dotenv
 import asyncio
 import ldclient
 from ldclient import Context
-from ldclient.config import Config
-from ldai import LDAIClient
-from ldai_langchain import get_ai_metrics_from_response
-from ldobserve import ObservabilityConfig, ObservabilityPlugin
-from langchain.chat_models import init_chat_model
+from ld_bootstrap import bootstrap
+
+# LangChain is imported where it is first used so that starting the process
+# does not pay for loading it up front.
 
 load_dotenv()
 
 logging.basicConfig()
 logging.getLogger('ldclient').setLevel(logging.WARNING)
 
-# Set sdk_key to your LaunchDarkly SDK key.
-sdk_key = os.getenv('LAUNCHDARKLY_SDK_KEY')
-
 # Set config_key to the AI Config key you want to evaluate.
 ai_config_key = os.getenv('LAUNCHDARKLY_COMPLETION_KEY', 'sample-completion')
 
@@ -31,24 +27,11 @@ def map_provider_to_langchain(provider_name):
     return provider_mapping.get(lower_provider, lower_provider)
 
 async def async_main():
-    if not sdk_key:
-        print("*** Please set the LAUNCHDARKLY_SDK_KEY env first")
-        exit()
     if not ai_config_key:
         print("*** Please set the LAUNCHDARKLY_COMPLETION_KEY env first")
         exit()
 
-    ldclient.set_config(Config(sdk_key, plugins=[
-        ObservabilityPlugin(ObservabilityConfig(
-            service_name='hello-python-ai-langchain',
-        ))
-    ]))
-    if not ldclient.get().is_initialized():
-        print("*** SDK failed to initialize. Please check your internet connection and SDK credential for any typo.")
-        exit()
-
-    aiclient = LDAIClient(ldclient.get())
-    print("*** SDK successfully initialized")
+    aiclient = bootstrap('hello-python-ai-langchain').aiclient
 
     # Set up the evaluation context. This context should appear on your
     # LaunchDarkly contexts dashboard soon after you run the demo.
@@ -83,6 +66,9 @@ async def async_main():
     tracker = config_value.create_tracker()
 
     try:
+        from langchain.chat_models import init_chat_model
+        from ldai_langchain import get_ai_metrics_from_response
+
         langchain_provider = map_provider_to_langchain(config_value.provider.name)
         llm = init_chat_model(
             model=config_value.model.name,
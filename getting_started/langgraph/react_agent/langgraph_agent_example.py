@@ -3,22 +3,17 @@ import logging
 from dotenv import load_dotenv
 import ldclient
 from ldclient import Context
-from ldclient.config import Config
-from ldai import LDAIClient
 from ldai.providers import LDAIMetrics
-from ldai_langchain import sum_token_usage_from_messages
-from ldobserve import ObservabilityConfig, ObservabilityPlugin
-from langchain.chat_models import init_chat_model
-from langgraph.prebuilt import create_react_agent
+from ld_bootstrap import bootstrap
+
+# LangChain and LangGraph are imported where they are first used so that
+# starting the process does not pay for loading them up front.
 
 load_dotenv()
 
 logging.basicConfig()
 logging.getLogger('ldclient').setLevel(logging.WARNING)
 
-# Set sdk_key to your LaunchDarkly SDK key.
-sdk_key = os.getenv('LAUNCHDARKLY_SDK_KEY')
-
 # Set config key for the agent
 agent_config_key = os.getenv('LAUNCHDARKLY_AGENT_KEY', 'sample-agent')
 
@@ -32,6 +27,8 @@ def map_provider_to_langchain(provider_name):
 
 def get_langgraph_metrics(response):
     """Extract aggregated metrics from a LangGraph agent response."""
+    from ldai_langchain import sum_token_usage_from_messages
+
     messages = response.get("messages", [])
     return LDAIMetrics(success=True, tokens=sum_token_usage_from_messages(messages))
 
@@ -40,21 +37,7 @@ def get_weather(city: str) -> str:
     return f"The weather in {city} is sunny."
 
 def main():
-    if not sdk_key:
-        print("*** Please set the LAUNCHDARKLY_SDK_KEY env first")
-        exit()
-
-    ldclient.set_config(Config(sdk_key, plugins=[
-        ObservabilityPlugin(ObservabilityConfig(
-            service_name='hello-python-ai-langgraph-agent',
-        ))
-    ]))
-    if not ldclient.get().is_initialized():
-        print("*** SDK failed to initialize. Please check your internet connection and SDK credential for any typo.")
-        exit()
-
-    aiclient = LDAIClient(ldclient.get())
-    print("*** SDK successfully initialized")
+    aiclient = bootstrap('hello-python-ai-langgraph-agent').aiclient
 
     # Set up the evaluation context
     context = (
@@ -80,7 +63,10 @@ def main():
     if not agent_config.enabled:
         print(f"AI config '{agent_config_key}' is disabled. Verify the config key exists in your LaunchDarkly project and is not targeting a disabled variation.")
         return
-    
+
+    from langchain.chat_models import init_chat_model
+    from langgraph.prebuilt import create_react_agent
+
     langchain_provider = map_provider_to_langchain(agent_config.provider.name)
     llm = init_chat_model(
         model=agent_config.model.name,
@@ -1,31 +1,36 @@
+from __future__ import annotations
+
 import os
 import logging
+import time
 from dotenv import load_dotenv
+import asyncio
 import ldclient
 from ldclient import Context
-from ldclient.config import Config
-from ldai import LDAIClient
 from ldai.tracker import TokenUsage
-from ldai_langchain import get_ai_metrics_from_response
-from ldobserve import ObservabilityConfig, ObservabilityPlugin
-from langchain.chat_models import init_chat_model
-from langgraph.prebuilt import create_react_agent
-from langgraph.graph import StateGraph, END
-from langgraph.types import Command
+from ld_bootstrap import bootstrap
+from ld_deadline import Deadline, DeadlineExceeded, run_with_deadline, track_cancelled
+from typing import TYPE_CHECKING
 from typing_extensions import TypedDict
 
+# LangChain and LangGraph are imported where they are first used so that
+# starting the process does not pay for loading them up front.
+if TYPE_CHECKING:
+    from langgraph.types import Command
+
 load_dotenv()
 
 logging.basicConfig()
 logging.getLogger('ldclient').setLevel(logging.WARNING)
 
-# Set sdk_key to your LaunchDarkly SDK key.
-sdk_key = os.getenv('LAUNCHDARKLY_SDK_KEY')
-
 # Set config keys for the two agents
 analyzer_config_key = os.getenv('LAUNCHDARKLY_ANALYZER_KEY', 'code-review-analyzer')
 documentation_config_key = os.getenv('LAUNCHDARKLY_DOCUMENTATION_KEY', 'code-review-documentation')
 
+# Set REQUEST_TIMEOUT_MS to cancel in-flight agent calls once the whole
+# review has taken this many milliseconds.
+request_timeout_ms = int(os.getenv('REQUEST_TIMEOUT_MS', '0'))
+
 # Custom state class for the code review workflow
 class CodeReviewState(TypedDict):
     messages: list
@@ -41,12 +46,26 @@ def map_provider_to_langchain(provider_name):
     lower_provider = provider_name.lower()
     return provider_mapping.get(lower_provider, lower_provider)
 
-def track_langgraph_metrics(tracker, func, prev_message_count=0):
+async def track_langgraph_metrics(tracker, func, prev_message_count=0, deadline=None):
     """
     Track LangGraph agent operations with LaunchDarkly metrics.
+
+    If the ``deadline`` passes first, the operation is cancelled and
+    ``DeadlineExceeded`` is raised without tracking anything; the caller
+    records the cancellation, duration included, with ``track_cancelled``.
     """
+    from ldai_langchain import get_ai_metrics_from_response
+
+    start_ns = time.perf_counter_ns()
     try:
-        result = tracker.track_duration_of(func)
+        try:
+            result = await run_with_deadline(func, deadline)
+        except DeadlineExceeded:
+            raise
+        except Exception:
+            tracker.track_duration((time.perf_counter_ns() - start_ns) // 1_000_000)
+            raise
+        tracker.track_duration((time.perf_counter_ns() - start_ns) // 1_000_000)
         tracker.track_success()
 
         total_input_tokens = 0
@@ -68,6 +87,8 @@ def track_langgraph_metrics(tracker, func, prev_message_count=0):
                     total=total_tokens,
                 )
             )
+    except DeadlineExceeded:
+        raise
     except Exception:
         tracker.track_error()
         raise
@@ -90,7 +111,10 @@ def create_agent_with_config(aiclient, config_key, context):
 
     if not agent_config.enabled:
         return None, None, True
-    
+
+    from langchain.chat_models import init_chat_model
+    from langgraph.prebuilt import create_react_agent
+
     langchain_provider = map_provider_to_langchain(agent_config.provider.name)
     llm = init_chat_model(
         model=agent_config.model.name,
@@ -102,15 +126,24 @@ def create_agent_with_config(aiclient, config_key, context):
     
     return agent, agent_config.create_tracker(), False
 
-def ai_node(
+async def ai_node(
     state: CodeReviewState, 
     aiclient, 
     context, 
     config_key: str, 
     state_key: str,
-    next_step: str
+    next_step: str,
+    deadline=None
 ) -> Command:
-    """Unified function to process code with AI agents (analysis or documentation)."""
+    """
+    Unified function to process code with AI agents (analysis or documentation).
+
+    ``deadline`` is the request's ``Deadline``; if it passes, the node
+    cancels its agent call and ends the workflow.
+    """
+    from langgraph.graph import END
+    from langgraph.types import Command
+
     print(f"\nStarting node for {config_key}...")
     
     try:
@@ -129,7 +162,13 @@ def ai_node(
         
         # Track and execute the AI operation
         prev_message_count = len(state["messages"])
-        completion = track_langgraph_metrics(tracker, lambda: agent.invoke({"messages": state["messages"]}), prev_message_count)
+        call_start_ns = time.perf_counter_ns()
+        completion = await track_langgraph_metrics(
+            tracker,
+            lambda: agent.ainvoke({"messages": state["messages"]}),
+            prev_message_count,
+            deadline,
+        )
 
         # Extract the content from the agent's response
         content = ""
@@ -147,6 +186,16 @@ def ai_node(
             }
         )
         
+    except DeadlineExceeded:
+        print(f"Deadline passed in node for {config_key}; cancelling the request.")
+        track_cancelled(
+            ldclient.get(), context, (time.perf_counter_ns() - call_start_ns) // 1_000_000, tracker=tracker,
+        )
+        return Command(
+            goto=END,
+            update={state_key: "Cancelled: the request deadline passed."}
+        )
+
     except Exception as e:
         # In production, sanitize before logging — provider errors may include credentials.
         print(f"Error in node for {config_key}: {e}")
@@ -160,6 +209,9 @@ def ai_node(
 
 def create_final_report(state: CodeReviewState) -> Command:
     """Combine analysis and documentation into a final report."""
+    from langgraph.graph import END
+    from langgraph.types import Command
+
     print("\nCreating final report...")
     
     # Use the stored analysis and documentation from state
@@ -186,22 +238,8 @@ def create_final_report(state: CodeReviewState) -> Command:
         }
     )
 
-def main():
-    if not sdk_key:
-        print("*** Please set the LAUNCHDARKLY_SDK_KEY env first")
-        exit()
-
-    ldclient.set_config(Config(sdk_key, plugins=[
-        ObservabilityPlugin(ObservabilityConfig(
-            service_name='hello-python-ai-langgraph-multi-agent',
-        ))
-    ]))
-    if not ldclient.get().is_initialized():
-        print("*** SDK failed to initialize. Please check your internet connection and SDK credential for any typo.")
-        exit()
-
-    aiclient = LDAIClient(ldclient.get())
-    print("*** SDK successfully initialized")
+async def async_main():
+    aiclient = bootstrap('hello-python-ai-langgraph-multi-agent').aiclient
 
     # Set up the evaluation context
     context = (
@@ -239,12 +277,23 @@ def calculate_average(numbers):
     print(f"Using analyzer config: {analyzer_config_key}")
     print(f"Using documentation config: {documentation_config_key}")
 
+    from langgraph.graph import StateGraph
+
     # Create the workflow graph with custom state
     workflow = StateGraph(CodeReviewState)
     
+    # The deadline covers the whole workflow; each node gets the time remaining.
+    deadline = Deadline(request_timeout_ms) if request_timeout_ms > 0 else None
+
     # Add nodes with proper function signatures
-    workflow.add_node("analyze", lambda state: ai_node(state, aiclient, context, analyzer_config_key, "analysis", "document"))
-    workflow.add_node("document", lambda state: ai_node(state, aiclient, context, documentation_config_key, "documentation", "finalize"))
+    async def analyze(state):
+        return await ai_node(state, aiclient, context, analyzer_config_key, "analysis", "document", deadline)
+
+    async def document(state):
+        return await ai_node(state, aiclient, context, documentation_config_key, "documentation", "finalize", deadline)
+
+    workflow.add_node("analyze", analyze)
+    workflow.add_node("document", document)
     workflow.add_node("finalize", create_final_report)
     
     # Define the workflow
@@ -268,7 +317,7 @@ def calculate_average(numbers):
     
     # Execute the workflow
     try:
-        result = app.invoke(initial_state)
+        result = await app.ainvoke(initial_state)
         
         print("\n" + "="*80)
         print("FINAL CODE REVIEW REPORT")
@@ -288,5 +337,9 @@ def calculate_average(numbers):
     ldclient.get().flush()
     ldclient.get().close()
 
+def main():
+    """Synchronous entry point for Poetry script."""
+    asyncio.run(async_main())
+
 if __name__ == "__main__":
     main()
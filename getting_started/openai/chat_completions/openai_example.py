@@ -3,10 +3,8 @@ import logging
 from dotenv import load_dotenv
 import ldclient
 from ldclient import Context
-from ldclient.config import Config
-from ldai import LDAIClient
 from ldai_openai import get_ai_metrics_from_response
-from ldobserve import ObservabilityConfig, ObservabilityPlugin
+from ld_bootstrap import bootstrap
 from openai import OpenAI
 
 load_dotenv()
@@ -16,33 +14,16 @@ logging.getLogger('ldclient').setLevel(logging.WARNING)
 
 openai_client = OpenAI()
 
-# Set sdk_key to your LaunchDarkly SDK key.
-sdk_key = os.getenv('LAUNCHDARKLY_SDK_KEY')
-
 # Set config_key to the AI Config key you want to evaluate.
 ai_config_key = os.getenv('LAUNCHDARKLY_COMPLETION_KEY', 'sample-completion')
 
 
 def main():
-    if not sdk_key:
-        print("*** Please set the LAUNCHDARKLY_SDK_KEY env first")
-        exit()
     if not ai_config_key:
         print("*** Please set the LAUNCHDARKLY_COMPLETION_KEY env first")
         exit()
 
-    ldclient.set_config(Config(sdk_key, plugins=[
-        ObservabilityPlugin(ObservabilityConfig(
-            service_name='hello-python-ai-openai',
-        ))
-    ]))
-    aiclient = LDAIClient(ldclient.get())
-
-    if not ldclient.get().is_initialized():
-        print("*** SDK failed to initialize. Please check your internet connection and SDK credential for any typo.")
-        exit()
-
-    print("*** SDK successfully initialized")
+    aiclient = bootstrap('hello-python-ai-openai').aiclient
 
     # Set up the evaluation context. This context should appear on your
     # LaunchDarkly contexts dashboard soon after you run the demo.
@@ -0,0 +1,118 @@
+"""Shared LaunchDarkly client setup for the examples, with an offline mode."""
+
+import base64
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import ldclient
+from ldclient import LDClient
+from ldclient.config import Config
+from ldclient.integrations import Files
+from ldclient.integrations.test_data import TestData
+from ldai import LDAIClient
+
+FLAG_DATA_FILE_ENV = 'LAUNCHDARKLY_FLAG_DATA_FILE'
+"""Environment variable naming a JSON or YAML flag data file for offline mode."""
+
+OFFLINE_SDK_KEY = 'offline-sdk-key'
+"""Placeholder SDK key used in offline mode when no real key is set."""
+
+
+def resumption_data(token: Optional[str]) -> Dict[str, Any]:
+    """
+    Decode a tracker's resumption token.
+
+    AI Configs do not expose the variation they were evaluated with, but
+    the resumption token of their trackers carries it, along with the run
+    ID, config key and version.
+
+    :param token: ``tracker.resumption_token``, or ``None``.
+    :return: The token's ``runId``, ``configKey``, ``variationKey`` and
+        ``version``, or an empty dict if there is no token or it is invalid.
+    """
+    if not token:
+        return {}
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('utf-8')))
+    except ValueError:
+        return {}
+
+
+@dataclass
+class Bootstrap:
+    """The initialized clients and how long initialization took."""
+
+    ld_client: LDClient
+    aiclient: LDAIClient
+    init_ms: float
+    """Milliseconds spent configuring and initializing the SDK."""
+    offline: bool
+    """Whether flags come from local data rather than LaunchDarkly."""
+
+
+def bootstrap(service_name: str, test_data: Optional[TestData] = None) -> Bootstrap:
+    """
+    Configure the LaunchDarkly client and create the AI client.
+
+    By default the SDK streams flags from LaunchDarkly using
+    ``LAUNCHDARKLY_SDK_KEY``, with the observability plugin enabled.
+
+    When ``test_data`` is given, or ``LAUNCHDARKLY_FLAG_DATA_FILE`` names a
+    flag data file, the SDK runs offline instead: flags come from local data,
+    no events are sent, and initialization does not touch the network. The
+    file uses the SDK's file data source format, in JSON or YAML (YAML needs
+    ``pyyaml``). AI Config variations go under ``flagValues``.
+
+    Exits the process with a message if the SDK key is missing or the SDK
+    fails to initialize, like the examples always have.
+
+    :param service_name: Service name reported to LaunchDarkly observability.
+    :param test_data: Optional ``TestData`` source, for benchmarks and tests.
+    :return: The initialized clients and the initialization time.
+    """
+    sdk_key = os.getenv('LAUNCHDARKLY_SDK_KEY')
+    flag_data_file = os.getenv(FLAG_DATA_FILE_ENV)
+    offline = test_data is not None or bool(flag_data_file)
+
+    if not sdk_key and not offline:
+        print("*** Please set the LAUNCHDARKLY_SDK_KEY env first")
+        exit()
+
+    source = 'test data' if test_data is not None else flag_data_file
+    start = time.perf_counter()
+    if offline:
+        data_source = test_data if test_data is not None else Files.new_data_source(paths=[flag_data_file])
+        config = Config(
+            sdk_key or OFFLINE_SDK_KEY,
+            update_processor_class=data_source,
+            send_events=False,
+            diagnostic_opt_out=True,
+        )
+    else:
+        # Imported here so offline runs do not pay for the observability stack.
+        from ldobserve import ObservabilityConfig, ObservabilityPlugin
+
+        config = Config(sdk_key, plugins=[
+            ObservabilityPlugin(ObservabilityConfig(
+                service_name=service_name,
+            ))
+        ])
+
+    ldclient.set_config(config)
+    ld_client = ldclient.get()
+    if not ld_client.is_initialized():
+        if offline:
+            print(f"*** SDK failed to load flag data. Please check {source}.")
+        else:
+            print("*** SDK failed to initialize. Please check your internet connection and SDK credential for any typo.")
+        exit()
+
+    aiclient = LDAIClient(ld_client)
+    init_ms = (time.perf_counter() - start) * 1000
+    print(f"*** SDK successfully initialized in {init_ms:.0f}ms" + (f" (offline: {source})" if offline else ''))
+
+    return Bootstrap(ld_client=ld_client, aiclient=aiclient, init_ms=init_ms, offline=offline)
@@ -0,0 +1,163 @@
+"""Request deadlines that cancel agent runs, graph runs and tool calls."""
+
+import asyncio
+import contextvars
+import functools
+import time
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from ldclient import Context, LDClient
+from ldai import ToolRegistry
+from ldai.models import AIConfig
+from ldai.tracker import LDAIConfigTracker
+
+from ld_bootstrap import resumption_data
+
+T = TypeVar('T')
+
+CANCELLED_EVENT_KEY = 'ai-generation-cancelled'
+"""Custom event tracked once for every run abandoned at its deadline."""
+
+_current_deadline: contextvars.ContextVar[Optional['Deadline']] = contextvars.ContextVar(
+    '_current_deadline', default=None,
+)
+
+
+class DeadlineExceeded(Exception):
+    """The request deadline passed before the work finished."""
+
+
+class Deadline:
+    """A point in time after which a request's remaining work is abandoned."""
+
+    def __init__(self, timeout_ms: int):
+        """
+        Start the clock.
+
+        :param timeout_ms: Milliseconds from now until the deadline.
+        """
+        self.timeout_ms = timeout_ms
+        self._start_ns = time.perf_counter_ns()
+
+    def elapsed_ms(self) -> int:
+        return (time.perf_counter_ns() - self._start_ns) // 1_000_000
+
+    def remaining_ms(self) -> int:
+        return max(self.timeout_ms - self.elapsed_ms(), 0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining_ms() == 0
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the deadline of the request being processed, if any."""
+    return _current_deadline.get()
+
+
+async def run_with_deadline(func: Callable[[], Awaitable[T]], deadline: Optional[Deadline]) -> T:
+    """
+    Await ``func()`` and cancel it if the deadline passes first.
+
+    The deadline is visible to everything ``func`` calls through
+    :func:`current_deadline`, including tools wrapped by :func:`deadline_tools`.
+    Cancelling the task also cancels in-flight provider requests made with
+    async clients.
+
+    :param func: Zero-argument callable returning the awaitable to run,
+        e.g. ``lambda: agent.run(question)``.
+    :param deadline: The request deadline, or ``None`` to run without one.
+    :return: The result of ``func()``.
+    :raises DeadlineExceeded: If the deadline passed first.
+    """
+    if deadline is None:
+        return await func()
+    if deadline.expired:
+        raise DeadlineExceeded(f'Deadline of {deadline.timeout_ms}ms passed before the run started')
+
+    token = _current_deadline.set(deadline)
+    try:
+        # wait_for runs func in a task created here, so it inherits the deadline.
+        return await asyncio.wait_for(func(), deadline.remaining_ms() / 1000)
+    except asyncio.TimeoutError as exc:
+        raise DeadlineExceeded(f'Deadline of {deadline.timeout_ms}ms passed') from exc
+    finally:
+        _current_deadline.reset(token)
+
+
+def deadline_tools(tools: ToolRegistry) -> ToolRegistry:
+    """
+    Wrap tools so they respect the deadline of the request that calls them.
+
+    A tool called after the deadline raises :class:`DeadlineExceeded` instead
+    of running. Async tools are also cancelled when the deadline passes while
+    they run; sync tools cannot be interrupted and run to completion.
+
+    :param tools: Registry mapping tool names to callables.
+    :return: Registry with the same names and signatures.
+    """
+    return {name: _deadline_tool(tool) for name, tool in tools.items()}
+
+
+def _deadline_tool(tool: Any) -> Any:
+    if not callable(tool):
+        return tool
+
+    def check(deadline: Optional[Deadline]) -> None:
+        if deadline is not None and deadline.expired:
+            raise DeadlineExceeded(f'Deadline passed before tool {tool.__name__} ran')
+
+    if asyncio.iscoroutinefunction(tool):
+        @functools.wraps(tool)
+        async def bounded_async(*args, **kwargs):
+            deadline = current_deadline()
+            check(deadline)
+            if deadline is None:
+                return await tool(*args, **kwargs)
+            try:
+                return await asyncio.wait_for(tool(*args, **kwargs), deadline.remaining_ms() / 1000)
+            except asyncio.TimeoutError as exc:
+                raise DeadlineExceeded(f'Deadline passed while tool {tool.__name__} ran') from exc
+        return bounded_async
+
+    @functools.wraps(tool)
+    def bounded(*args, **kwargs):
+        check(current_deadline())
+        return tool(*args, **kwargs)
+    return bounded
+
+
+def track_cancelled(
+    ld_client: LDClient,
+    context: Context,
+    elapsed_ms: int,
+    config: Optional[AIConfig] = None,
+    graph_key: Optional[str] = None,
+    tracker: Optional[LDAIConfigTracker] = None,
+) -> None:
+    """
+    Record a run abandoned at its deadline.
+
+    A cancelled run never reaches the SDK's success or error tracking, so it
+    is recorded as its own outcome: the time spent before cancellation is
+    tracked as the config's duration, and a :data:`CANCELLED_EVENT_KEY`
+    event is sent with the config or graph key.
+
+    :param ld_client: The LaunchDarkly client.
+    :param context: The evaluation context of the request.
+    :param elapsed_ms: Time spent on the run before it was cancelled.
+    :param config: The AI Config of a cancelled agent run.
+    :param graph_key: The key of a cancelled agent graph run.
+    :param tracker: The tracker of the cancelled run, if the caller already
+        has one; otherwise a tracker is created from ``config``.
+    """
+    data: dict = {'durationMs': elapsed_ms}
+    if tracker is None and config is not None:
+        tracker = config.create_tracker()
+    if tracker is not None:
+        tracker.track_duration(elapsed_ms)
+        # The resumption token carries the run's config key, variation and version.
+        data.update(resumption_data(tracker.resumption_token))
+    if graph_key is not None:
+        data['graphKey'] = graph_key
+    ld_client.track(CANCELLED_EVENT_KEY, context, data, 1)
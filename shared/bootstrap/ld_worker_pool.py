@@ -0,0 +1,329 @@
+"""Run async AI work across worker processes, each with its own LaunchDarkly client."""
+
+import asyncio
+import inspect
+import math
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
+
+from ldai import LDAIClient
+from ldclient import LDClient
+
+from ld_bootstrap import bootstrap
+
+DEFAULT_CONCURRENCY = 8
+"""Items each worker runs at once on its event loop."""
+
+
+@dataclass
+class WorkerMetrics:
+    """Items handled by a worker and the model calls recorded while handling them."""
+
+    worker: Optional[int] = None
+    """Worker index, or ``None`` for metrics merged across workers."""
+    items: int = 0
+    failed: int = 0
+    """Items whose handler raised."""
+    calls: int = 0
+    successes: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    durations_ms: List[int] = field(default_factory=list)
+    """Duration of each recorded call that reported one."""
+    elapsed_s: float = 0.0
+    """Wall time from the worker's first item to its last; the longest worker's when merged."""
+
+    def record(self, metrics: Any) -> None:
+        """
+        Add one model call.
+
+        :param metrics: The ``LDAIMetrics`` from a ``RunnerResult``, or an
+            ``LDAIMetricSummary`` from a tracker or ``ManagedResult``.
+        """
+        self.calls += 1
+        self.successes += bool(metrics.success)
+        tokens = metrics.tokens
+        if tokens:
+            self.input_tokens += tokens.input
+            self.output_tokens += tokens.output
+            self.total_tokens += tokens.total
+        if metrics.duration_ms is not None:
+            self.durations_ms.append(int(metrics.duration_ms))
+
+    def merge(self, other: 'WorkerMetrics') -> None:
+        self.items += other.items
+        self.failed += other.failed
+        self.calls += other.calls
+        self.successes += other.successes
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.total_tokens += other.total_tokens
+        self.durations_ms += other.durations_ms
+        self.elapsed_s = max(self.elapsed_s, other.elapsed_s)
+
+    def percentile_ms(self, pct: float) -> float:
+        """Nearest-rank percentile of the recorded call durations; 0 if there are none."""
+        if not self.durations_ms:
+            return 0.0
+        ordered = sorted(self.durations_ms)
+        return float(ordered[max(math.ceil(pct / 100 * len(ordered)), 1) - 1])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'worker': self.worker,
+            'items': self.items,
+            'failed': self.failed,
+            'calls': self.calls,
+            'successes': self.successes,
+            'tokens': {'input': self.input_tokens, 'output': self.output_tokens, 'total': self.total_tokens},
+            'duration_ms': {'p50': self.percentile_ms(50), 'p95': self.percentile_ms(95)},
+            'elapsed_s': round(self.elapsed_s, 3),
+        }
+
+
+class WorkerContext:
+    """What a handler gets in its worker process."""
+
+    def __init__(self, index: int, aiclient: LDAIClient, ld_client: LDClient):
+        self.index = index
+        self.aiclient = aiclient
+        self.ld_client = ld_client
+        self.state: Any = None
+        """The value returned by the pool's ``setup`` function in this worker."""
+        self.metrics = WorkerMetrics(worker=index)
+
+    def record(self, metrics: Any) -> None:
+        """Record a model call's metrics; see :meth:`WorkerMetrics.record`."""
+        self.metrics.record(metrics)
+
+
+@dataclass
+class WorkResult:
+    """The outcome of one input item."""
+
+    index: int
+    """Position of the item in the input."""
+    value: Any = None
+    error: Optional[str] = None
+    """``Type: message`` of the exception the handler raised, if it failed."""
+    worker: Optional[int] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+Handler = Callable[[WorkerContext, Any], Awaitable[Any]]
+Setup = Callable[[WorkerContext], Any]
+
+
+async def _serve(worker: WorkerContext, handler: Handler, setup: Optional[Setup], tasks, results, concurrency: int):
+    if setup is not None:
+        state = setup(worker)
+        worker.state = await state if inspect.isawaitable(state) else state
+
+    local: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    started: List[float] = []
+
+    async def fetch():
+        while True:
+            chunk = await asyncio.to_thread(tasks.get)
+            if chunk is None:
+                for _ in range(concurrency):
+                    await local.put(None)
+                return
+            for entry in chunk:
+                await local.put(entry)
+
+    async def consume():
+        while (entry := await local.get()) is not None:
+            index, item = entry
+            if not started:
+                started.append(time.perf_counter())
+            try:
+                # Pickle here so a result that cannot be sent fails this item instead of the queue's feeder thread.
+                payload, error = pickle.dumps(await handler(worker, item)), None
+            except Exception as exc:
+                payload, error = None, f'{type(exc).__name__}: {exc}'
+                worker.metrics.failed += 1
+            worker.metrics.items += 1
+            results.put(('result', index, payload, error, worker.index))
+
+    await asyncio.gather(fetch(), *(consume() for _ in range(concurrency)))
+    if started:
+        worker.metrics.elapsed_s = time.perf_counter() - started[0]
+
+
+def _worker_main(index: int, service_name: str, handler: Handler, setup: Optional[Setup], tasks, results,
+                 concurrency: int) -> None:
+    boot = bootstrap(service_name)
+    worker = WorkerContext(index, boot.aiclient, boot.ld_client)
+    try:
+        asyncio.run(_serve(worker, handler, setup, tasks, results, concurrency))
+    except BaseException as exc:
+        results.put(('failed', index, f'{type(exc).__name__}: {exc}'))
+        raise
+    finally:
+        boot.ld_client.flush()
+        boot.ld_client.close()
+    results.put(('done', index, worker.metrics))
+
+
+class WorkerPool:
+    """
+    Runs an async handler over many items in several worker processes.
+
+    One process runs Python on one core at a time, so a batch job that
+    spends real CPU time per item (parsing provider responses, converting
+    messages, LangGraph state updates) stops getting faster at one core no
+    matter how many requests it has in flight. The pool starts ``workers``
+    processes, each with its own ``LDAIClient`` from
+    :func:`~ld_bootstrap.bootstrap` and its own event loop running up to
+    ``concurrency`` items at once.
+
+    Items are sent to the workers through one shared queue in chunks of
+    ``chunk_size``, so a worker that finishes early takes more work and a
+    slow item does not hold up the rest of its shard. Results come back as
+    they finish, or in input order with ``ordered=True``, which holds
+    finished results until every earlier item is done.
+
+    Workers are started with ``spawn``, so the handler and ``setup`` must
+    be functions defined at module level, and items and results must be
+    picklable. Each worker reads the same environment as the parent,
+    including ``LAUNCHDARKLY_FLAG_DATA_FILE`` for offline mode.
+
+    Handlers call :meth:`WorkerContext.record` with the metrics of each
+    model call; after :meth:`map` finishes, :attr:`metrics` holds them
+    merged across workers and :attr:`worker_metrics` per worker.
+    """
+
+    def __init__(
+        self,
+        service_name: str,
+        handler: Handler,
+        setup: Optional[Setup] = None,
+        workers: Optional[int] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        chunk_size: int = 1,
+        ordered: bool = False,
+    ):
+        """
+        Initialize the pool.
+
+        :param service_name: Service name each worker passes to ``bootstrap``.
+        :param handler: ``async def handler(worker, item)`` returning the item's result.
+        :param setup: Optional function, sync or async, called once per
+            worker before its first item; its return value is ``worker.state``.
+            Use it to create judges, models or agents once per worker.
+        :param workers: Number of processes; defaults to the number of CPUs.
+        :param concurrency: Items each worker runs at once.
+        :param chunk_size: Items taken from the queue at a time.
+        :param ordered: Yield results in input order instead of as they finish.
+        """
+        self.service_name = service_name
+        self.handler = handler
+        self.setup = setup
+        self.workers = workers or os.cpu_count() or 1
+        self.concurrency = max(concurrency, 1)
+        self.chunk_size = max(chunk_size, 1)
+        self.ordered = ordered
+        self.worker_metrics: Dict[int, WorkerMetrics] = {}
+        self.metrics = WorkerMetrics()
+        self.elapsed_s = 0.0
+        """Wall time of the last :meth:`map`, including starting the workers."""
+
+    def _feed(self, items: Iterable[Any], tasks, stop: threading.Event) -> None:
+        chunk = []
+        for entry in enumerate(items):
+            chunk.append(entry)
+            if len(chunk) == self.chunk_size:
+                tasks.put(chunk)
+                chunk = []
+            if stop.is_set():
+                return
+        if chunk:
+            tasks.put(chunk)
+        for _ in range(self.workers):
+            tasks.put(None)
+
+    def map(self, items: Iterable[Any]) -> Iterator[WorkResult]:
+        """
+        Run the handler on every item and yield a :class:`WorkResult` for each.
+
+        :raises RuntimeError: If a worker fails to start or exits early.
+        """
+        context = multiprocessing.get_context('spawn')
+        tasks = context.Queue(maxsize=self.workers * 2)
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=_worker_main,
+                args=(index, self.service_name, self.handler, self.setup, tasks, results, self.concurrency),
+                name=f'ld-worker-{index}',
+                daemon=True,
+            )
+            for index in range(self.workers)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        stop = threading.Event()
+        feeder = threading.Thread(target=self._feed, args=(items, tasks, stop), daemon=True)
+        feeder.start()
+
+        self.worker_metrics = {}
+        held: Dict[int, WorkResult] = {}
+        next_index = 0
+        try:
+            while len(self.worker_metrics) < self.workers:
+                message = self._next_message(results, processes)
+                if message[0] == 'failed':
+                    raise RuntimeError(f'Worker {message[1]} failed: {message[2]}')
+                if message[0] == 'done':
+                    self.worker_metrics[message[1]] = message[2]
+                    continue
+                _, index, payload, error, worker = message
+                result = WorkResult(index, pickle.loads(payload) if payload is not None else None, error, worker)
+                if not self.ordered:
+                    yield result
+                    continue
+                held[index] = result
+                while next_index in held:
+                    yield held.pop(next_index)
+                    next_index += 1
+        finally:
+            stop.set()
+            for process in processes:
+                if process.is_alive() and len(self.worker_metrics) < self.workers:
+                    process.terminate()
+            for process in processes:
+                process.join()
+            tasks.cancel_join_thread()
+            self.elapsed_s = time.perf_counter() - start
+
+        self.metrics = WorkerMetrics()
+        for metrics in self.worker_metrics.values():
+            self.metrics.merge(metrics)
+
+    def _next_message(self, results, processes) -> tuple:
+        while True:
+            try:
+                return results.get(timeout=0.5)
+            except queue.Empty:
+                pass
+            for index, process in enumerate(processes):
+                if not process.is_alive() and index not in self.worker_metrics:
+                    # The worker may have sent its last messages just before exiting.
+                    try:
+                        return results.get(timeout=1)
+                    except queue.Empty:
+                        raise RuntimeError(
+                            f'Worker {index} exited with code {process.exitcode} before finishing'
+                        ) from None